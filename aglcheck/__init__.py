@@ -1,10 +1,15 @@
 from __future__ import absolute_import
 from .stringdata import read_stringdata, StringData
 from ._examples import examplestringdata, get_examplestringdata
+from . import tokenencoding
 from . import stringcomparison
 from . import stringsetcomparison
 from . import plotting
 from . import htmltables
+from . import resultcache
+from . import tiledanalysis
+from . import nearestneighbours
+from . import ngramindex
 
 from numpy.testing import Tester
 test = Tester().test
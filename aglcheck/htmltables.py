@@ -1,11 +1,20 @@
-import numpy as np
-from .stringcomparison import longestsharedsubstrings, crosscorrelate, startswith, \
-                        issubstring, commonstart
+import gzip
+import json
+import os
+
+from .stringcomparison import longestsharedsubstrings, \
+    crosscorrelationmaxmatches, startswith, issubstring, commonstart, \
+    _checkpositiveint
+from .tokenencoding import tokenize
 from .stringsetcomparison import _analyze_stringbystring
 
 __all__ = ['availableanalysisfunctions', 'crosscorrelationmaxtable',
-           'htmltable', 'issubstringtable', 'longestsharedsubstringstable',
-           'save_html', 'startswithtable']
+           'htmltable', 'issubstringtable', 'iter_htmltable',
+           'longestsharedsubstringstable', 'save_html', 'save_htmlviewer',
+           'startswithtable']
+
+_viewerdir = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                          'viewer')
 
 
 def htmlcolor_string(s, color='#FF4500'):
@@ -26,100 +35,262 @@ def htmlcolor_substrings(ss, s, position=None, color='#FF4500'):
             p3 = ''
         return '{}<span style="color:{}">{}</span>{}'.format(p1, color, p2, p3)
 
-def save_html(htmlcode, filename, include_doctags=True):
-    with open(filename, 'w', encoding='utf-8') as f:
-        if include_doctags:
-            header = '<!DOCTYPE html>' \
-                     '<html>' \
-                     '<head>' \
-                     '<meta charset="UTF-8">' \
-                     '<title></title>' \
-                     '</head>' \
-                     '<body>'
-            f.write(header)
+_header = '<!DOCTYPE html>' \
+          '<html>' \
+          '<head>' \
+          '<meta charset="UTF-8">' \
+          '<title></title>' \
+          '</head>' \
+          '<body>'
+
+_footer = '</body>'
+
+
+def save_html(htmlcode, filename, include_doctags=True, compress=None):
+    """
+    Writes HTML code to a file.
+
+    Parameters
+    ----------
+    htmlcode : str or iterable of str
+        HTML code, or chunks of HTML code, such as those yielded by
+        `iter_htmltable`, which are written one at a time so that the whole
+        document is never held in memory.
+    filename : str or file object
+        Name of the file, or a file object opened for writing text.
+    include_doctags : bool, default True
+        Whether to wrap the code in a minimal HTML document.
+    compress : bool, optional
+        Whether to write a gzip-compressed file. By default, files are
+        compressed if `filename` ends with '.gz'.
+
+    """
+    if hasattr(filename, 'write'):
+        _write_html(htmlcode, filename, include_doctags)
+        return
+    if compress is None:
+        compress = str(filename).endswith('.gz')
+    if compress:
+        f = gzip.open(filename, 'wt', encoding='utf-8')
+    else:
+        f = open(filename, 'w', encoding='utf-8')
+    with f:
+        _write_html(htmlcode, f, include_doctags)
+
+
+def _write_html(htmlcode, f, include_doctags):
+    if include_doctags:
+        f.write(_header)
+    if isinstance(htmlcode, str):
         f.write(htmlcode)
-        if include_doctags:
-            footer = '</body>'
-            f.write(footer)
+    else:
+        for chunk in htmlcode:
+            f.write(chunk)
+    if include_doctags:
+        f.write(_footer)
+
+
+def _tablelayout(comparisontable, transpose, formatcell=None):
+    """
+    Returns the column labels and row labels of a table of a comparison, and
+    a function that takes a row label and a column label and returns the
+    entries of their cell (see `iter_htmltable`).
+
+    """
+    ct = comparisontable
+    stringdict = ct.stringdata.stringdict
+
+    def cell(xstringlabel, ystringlabel):
+        value = ct.get_value(xstringlabel, ystringlabel)
+        if formatcell is None:
+            return value
+        return formatcell(stringdict[xstringlabel], stringdict[ystringlabel],
+                          value)
+
+    if transpose:
+        return ct.ystringlabels, ct.xstringlabels, cell
+
+    # rows correspond to ystringlabels
+    def getcell(rowlabel, collabel):
+        return cell(collabel, rowlabel)
+
+    return ct.xstringlabels, ct.ystringlabels, getcell
+
+
+def iter_htmltable(comparisontable, title=None, transpose=False,
+                   formatcell=None):
+    """
+    Generates the HTML code of `htmltable` in chunks: the table head, and
+    then one chunk per table row. Cell values are obtained one row at a
+    time, so that large tables can be written to a file (see `save_html`)
+    without building the whole document in memory. The table functions of
+    this module, such as `longestsharedsubstringstable`, return these chunks
+    if called with stream=True.
+
+    A cell shows the entries of a list. By default the comparison values
+    are such lists; otherwise `formatcell` makes them from a value when its
+    cell is rendered. It takes the two strings of a pair (in the order of
+    the comparison) and their value.
+
+    """
+    ct = comparisontable
+    if title is None:
+        title = ct.title
+    labelcolors = ct.stringdata.stringlabelcolors
+    stringdict = ct.stringdata.stringdict
+    xstringlabels, ystringlabels, getcell = _tablelayout(ct, transpose,
+                                                         formatcell)
+    yield '<style>thead {align:center;}' \
+          'tbody {color:black;}' \
+          'table, th, td {border: 1px solid black; border-collapse: ' \
+          'collapse;} th, td {padding: 15px;}' \
+          '</style>'
+    yield '<table><caption>{}</caption><thead><tr><th></th>'.format(title)
+    yield ''.join(['<th scope="col"><span style="color:{}">{}</span>'
+                   '<br>{}</th>'.format(labelcolors[xs], xs, stringdict[xs])
+                   for xs in xstringlabels])
+    yield '</tr></thead>'
+    for sl in ystringlabels:
+        rowtext = ['<tr>',
+                   '<th scope="row"><span style="color:{}">{}</span>'
+                   '<br>{}</th>'.format(labelcolors[sl], sl, stringdict[sl])]
+        for xs in xstringlabels:
+            rowtext.append('<td>')
+            rowtext.extend(['{}<br>'.format(entry)
+                            for entry in getcell(sl, xs)])
+            rowtext.append('</td>')
+        rowtext.append('</tr>')
+        yield ''.join(rowtext)
+    yield '</table>'
+
+
+def htmltable(comparisontable, title=None, transpose=False,
+              formatcell=None):
+    """Returns the HTML code of a table with the values of a comparison."""
+    return ''.join(iter_htmltable(comparisontable, title=title,
+                                  transpose=transpose, formatcell=formatcell))
+
+
+def _jsondumps(obj):
+    # compact JSON that can be embedded in a script element
+    return json.dumps(obj, ensure_ascii=False,
+                      separators=(',', ':')).replace('</', '<\\/')
+
+
+def save_htmlviewer(comparisontable, filename, title=None, transpose=False,
+                    rowsperchunk=50, formatcell=None):
+    """
+    Writes a table of a comparison as an HTML page with a viewer that only
+    renders the cells in view (virtual scrolling), for tables that are too
+    large to be shown as a single HTML table (see `htmltable`).
+
+    The cell data are written as separate JavaScript files with
+    `rowsperchunk` rows each, in a directory next to the page, named after
+    it (e.g. 'table_files' for 'table.html'). The viewer loads these files
+    only when their rows come into view, and also works for pages opened
+    from the local file system, without a web server. The page and the
+    directory should be kept together.
+
+    The table functions of this module, such as
+    `longestsharedsubstringstable`, write a viewer if called with a
+    filename as `viewer`. See `iter_htmltable` for `formatcell`.
+
+    """
+    ct = comparisontable
+    if title is None:
+        title = ct.title
+    _checkpositiveint(rowsperchunk)
+    labelcolors = ct.stringdata.stringlabelcolors
+    stringdict = ct.stringdata.stringdict
+    xstringlabels, ystringlabels, getcell = _tablelayout(ct, transpose,
+                                                         formatcell)
+    datadir = '{}_files'.format(os.path.splitext(filename)[0])
+    os.makedirs(datadir, exist_ok=True)
+    for k, start in enumerate(range(0, len(ystringlabels), rowsperchunk)):
+        rows = [[[str(entry) for entry in getcell(sl, xs)] or 0
+                 for xs in xstringlabels]
+                for sl in ystringlabels[start:start + rowsperchunk]]
+        chunkname = os.path.join(datadir, 'rows_{:05d}.js'.format(k))
+        with open(chunkname, 'w', encoding='utf-8') as f:
+            f.write('aglcheckrows({},{});\n'.format(k, _jsondumps(rows)))
+    meta = {'title': str(title),
+            'datadir': os.path.basename(datadir),
+            'rowsperchunk': rowsperchunk,
+            'columns': [[str(l), labelcolors[l], stringdict[l]]
+                        for l in xstringlabels],
+            'rows': [[str(l), labelcolors[l], stringdict[l]]
+                     for l in ystringlabels]}
+    with open(os.path.join(_viewerdir, 'tableviewer.html'),
+              encoding='utf-8') as f:
+        page = f.read()
+    page = page.replace('/*AGLCHECKMETA*/null', _jsondumps(meta))
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(page)
 
 
-def htmltable(comparisontable, title=None, transpose=False):
+def _tableoutput(comparisontable, transpose, stream, viewer, formatcell):
+    # output of the table functions below, which store compact records of
+    # the matches of every pair, and only make the HTML code of a cell when
+    # it is rendered
+    if viewer is not None:
+        save_htmlviewer(comparisontable, viewer, transpose=transpose,
+                        formatcell=formatcell)
+        return None
+    if stream:
+        return iter_htmltable(comparisontable, transpose=transpose,
+                              formatcell=formatcell)
+    return htmltable(comparisontable, transpose=transpose,
+                     formatcell=formatcell)
 
-        ct = comparisontable
-        if title is None:
-            title = ct.title
-        matrix = ct.get_matrix()
-        xstringlabels = ct.xstringlabels
-        ystringlabels = ct.ystringlabels
-        if not transpose:
-            matrix = [list(i) for i in zip(*matrix)]  # we have to transpose
-        else:
-            xstringlabels, ystringlabels = ystringlabels, xstringlabels
-        htmltext = '<style>thead {align:center;}' \
-                   'tbody {color:black;}' \
-                   'table, th, td {border: 1px solid black; border-collapse: '\
-                   'collapse;} th, td {padding: 15px;}' \
-                   '</style>'
-        htmltext += '<table>'
-        htmltext += '<caption>{}</caption>'.format(title)
-        htmltext += '<thead><tr><th></th>'
-        t = ['<th scope="col"><span style="color:{}">{}</span>'
-             '<br>{}</th>'.format(ct.stringdata.stringlabelcolors[xs], xs,
-                                  ct.stringdata.stringdict[xs])
-            for xs in xstringlabels]
-        htmltext += ''.join(t)
-        htmltext += '</tr></thead>'
-        for rown, row in enumerate(matrix):
-            htmltext += '<tr>'
-            sl = ystringlabels[rown]
-            htmltext += '<th scope="row"><span style="color:{}">{}</span>' \
-                        '<br>{}</th>'.format(ct.stringdata.stringlabelcolors[sl], sl,
-                                             ct.stringdata.stringdict[sl])
-            for coln, cell in enumerate(row):
-                htmltext += '<td>'
-                for entry in cell:
-                    htmltext += '{}<br>'.format(entry)
-                htmltext += '</td>'
-            htmltext += '</tr>'
-        htmltext += '</table>'
-        return htmltext
 
 # FIXME refactor this
 def longestsharedsubstringstable(stringdata, minlen=1, comparison=('All', 'All'),
                                  title='Longest shared substrings',
-                                 transpose=False):
+                                 transpose=False, stream=False, viewer=None):
 
     hc = htmlcolor_substrings
+    rf = stringdata.readingframe
 
     def analysisf(s1, s2, readingframe):
-        if transpose:
-            return ['{}&nbsp;&nbsp;{}'.format(hc(ss, s1, position=pos[0]*readingframe),
-                                              hc(ss, s2, position=pos[1]*readingframe))
-                    for (ss, positions) in
-                    longestsharedsubstrings(s1, s2, readingframe)
-                    for pos in positions if len(ss) >= minlen]
-        else:
-            return ['{}&nbsp;&nbsp;{}'.format(hc(ss, s2, position=pos[1]*readingframe),
-                                              hc(ss, s1, position=pos[0]*readingframe))
-                    for (ss, positions) in longestsharedsubstrings(s1, s2, readingframe)
-                    for pos in positions if len(ss) >= minlen]
+        # records of the length of a substring and its positions
+        return tuple((len(ss), positions) for (ss, positions) in
+                     longestsharedsubstrings(s1, s2, readingframe)
+                     if len(ss) >= minlen)
+
+    def formatcell(s1, s2, records):
+        entries = []
+        for length, positions in records:
+            for pos in positions:
+                ss = s1[pos[0]*rf:pos[0]*rf + length]
+                h1 = hc(ss, s1, position=pos[0]*rf)
+                h2 = hc(ss, s2, position=pos[1]*rf)
+                if transpose:
+                    entries.append('{}&nbsp;&nbsp;{}'.format(h1, h2))
+                else:
+                    entries.append('{}&nbsp;&nbsp;{}'.format(h2, h1))
+        return entries
 
     def dataaccessfunc(items):
         return items
 
     cm = _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
                                  title=title, comparison=comparison)
-    return htmltable(cm, transpose=transpose)
+    return _tableoutput(cm, transpose, stream, viewer, formatcell)
 
 
 def commonstartsubstringstable(stringdata, comparison=('All', 'All'),
-                           title='Shared start substring matches', transpose=False):
+                           title='Shared start substring matches', transpose=False,
+                           stream=False, viewer=None):
 
     hc = htmlcolor_substrings
 
     def analysisf(s1, s2, readingframe):
-        ss = commonstart(s1, s2, readingframe)
-        if ss:
+        # record of the length of the common start
+        return len(commonstart(s1, s2, readingframe))
+
+    def formatcell(s1, s2, length):
+        if length:
+            ss = s1[:length]
             if transpose:
                 return ['{}&nbsp;&nbsp;{}'.format(hc(ss, s1, position=0),
                                                   hc(ss, s2, position=0))]
@@ -127,47 +298,63 @@ def commonstartsubstringstable(stringdata, comparison=('All', 'All'),
                 return ['{}&nbsp;&nbsp;{}'.format(hc(ss, s2, position=0),
                                                   hc(ss, s1, position=0))]
         else:
-            return ''
+            return []
 
     def dataaccessfunc(items):
         return items
 
     cm = _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
                                  title=title, comparison=comparison)
-    return htmltable(cm, transpose=transpose)
+    return _tableoutput(cm, transpose, stream, viewer, formatcell)
 
 
 
 def crosscorrelationmaxtable(stringdata, minlen=1, mismatchchar='_',
                              comparison=('All', 'All'),
                              title='Maximum crosscorrelation substring',
-                             transpose=False):
+                             transpose=False, stream=False, viewer=None):
     hcs = htmlcolor_string
+    rf = stringdata.readingframe
+    # mismatching tokens are shown as this, truncated to the token width
+    mismatchtoken = (mismatchchar * rf)[:rf]
 
     def analysisf(s1, s2, readingframe):
-        f, s = crosscorrelate(s1, s2, readingframe)
-        matches = [np.array(m) for m in np.array(s)[f == np.max(f)]]
+        # records of the matching token positions of s1 at every lag with
+        # the maximum number of matches
+        records = []
+        for m in crosscorrelationmaxmatches(s1, s2, readingframe):
+            positions = tuple(i for i, token in enumerate(m) if token)
+            if len(positions) >= minlen:
+                records.append(positions)
+        return tuple(records)
+
+    def formatcell(s1, s2, records):
+        tokens = tokenize(s1, readingframe=rf)
         css = []
-        for letters in matches:
-            if sum(letters != '') >= minlen:
-                letters[letters == ''] = mismatchchar * readingframe
-                css.append(hcs(''.join(letters).strip(mismatchchar)))
+        for positions in records:
+            letters = [mismatchtoken] * len(tokens)
+            for i in positions:
+                letters[i] = tokens[i]
+            css.append(hcs(''.join(letters).strip(mismatchchar)))
         return css
 
     def dataaccessfunc(items): return items
 
     cm = _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
                                  title=title, comparison=comparison)
-    return htmltable(cm, transpose=transpose)
+    return _tableoutput(cm, transpose, stream, viewer, formatcell)
 
 def startswithtable(stringdata, comparison=('All', 'All'),
                     title=None,
-                    transpose=False):
+                    transpose=False, stream=False, viewer=None):
 
     hc = htmlcolor_substrings
 
     def analysisf(s1, s2, readingframe):
-        if startswith(s1, s2, readingframe):
+        return startswith(s1, s2, readingframe)
+
+    def formatcell(s1, s2, match):
+        if match:
             if transpose:
                 return ['{}&nbsp;&nbsp;{}'.format(hc(s2, s1, position=0),
                                                   hc(s2, s2, position=0))]
@@ -175,7 +362,7 @@ def startswithtable(stringdata, comparison=('All', 'All'),
                 return ['{}&nbsp;&nbsp;{}'.format(hc(s2, s2, position=0),
                                                   hc(s2, s1, position=0))]
         else:
-            return ''
+            return []
 
 
     def dataaccessfunc(items): return items
@@ -188,23 +375,26 @@ def startswithtable(stringdata, comparison=('All', 'All'),
 
     cm = _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
                                  title=title, comparison=comparison)
-    return htmltable(cm, transpose=transpose)
+    return _tableoutput(cm, transpose, stream, viewer, formatcell)
 
 
 
 def issubstringtable(stringdata, comparison=('All', 'All'), title=None,
-                     transpose=False):
+                     transpose=False, stream=False, viewer=None):
 
     hc = htmlcolor_substrings
 
     def analysisf(s1, s2, readingframe):
-        if issubstring(s1, s2, readingframe):
+        return issubstring(s1, s2, readingframe)
+
+    def formatcell(s1, s2, match):
+        if match:
             if transpose:
                 return ['{}&nbsp;&nbsp;{}'.format(hc(s1, s1),hc(s1, s2))]
             else:
                 return ['{}&nbsp;&nbsp;{}'.format(hc(s1, s2), hc(s1, s1))]
         else:
-            return ''
+            return []
 
     def dataaccessfunc(item): return item
 
@@ -216,7 +406,7 @@ def issubstringtable(stringdata, comparison=('All', 'All'), title=None,
 
     cm = _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
                                  title=title, comparison=comparison)
-    return htmltable(cm, transpose=transpose)
+    return _tableoutput(cm, transpose, stream, viewer, formatcell)
 
 
 availableanalysisfunctions = {
@@ -0,0 +1,364 @@
+from functools import partial
+
+import numpy as np
+
+from . import stringcomparison as alg
+from .ngramindex import NgramIndex
+
+__all__ = ['BKTree', 'nearest', 'nearestmetrics']
+
+
+class BKTree(object):
+    """
+    Burkhard-Keller tree of items under a metric distance, such as the
+    Levenshtein distance. Every child of a node is stored under its distance
+    to that node, so that the triangle inequality rules out whole subtrees
+    when searching for the nearest items to a query.
+
+    Parameters
+    ----------
+    items : sequence
+        Items to index.
+    distancef : function
+        Distance between two items, a non-negative int that satisfies the
+        triangle inequality.
+
+    Examples
+    --------
+    >>> from aglcheck.nearestneighbours import BKTree
+    >>> from aglcheck.stringcomparison import levenshtein
+    >>> tree = BKTree(['abcd', 'abdc', 'dcba', 'abc'], levenshtein)
+    >>> tree.nearest('abce', k=2)
+    [(1, 0), (1, 3)]
+
+    """
+
+    def __init__(self, items, distancef):
+        self.items = list(items)
+        self.distancef = distancef
+        # a node is a two-list of an item index and a dict that maps
+        # distances to child nodes
+        self.root = None
+        for i in range(len(self.items)):
+            self._insert(i)
+
+    def _insert(self, i):
+        node = [i, {}]
+        if self.root is None:
+            self.root = node
+            return
+        parent = self.root
+        while True:
+            d = self.distancef(self.items[i], self.items[parent[0]])
+            child = parent[1].get(d)
+            if child is None:
+                parent[1][d] = node
+                return
+            parent = child
+
+    def nearest(self, query, k=1, exclude=None):
+        """
+        Returns a list with the k items that are nearest to `query`, as
+        (distance, index) two-tuples, ranked by distance and then by index.
+        `exclude` is an optional index of an item that is not returned.
+
+        """
+        best = []
+        tau = np.inf
+        stack = [] if self.root is None else [self.root]
+        while stack:
+            i, children = stack.pop()
+            d = self.distancef(query, self.items[i])
+            if d <= tau and i != exclude:
+                best.append((d, i))
+                best.sort()
+                del best[k:]
+                if len(best) == k:
+                    tau = best[-1][0]
+            # subtrees with items at distance e from this node only contain
+            # items at distance >= |d - e| from the query; the closest
+            # distances are pushed last, so that they are searched first
+            for e in sorted(children, key=lambda e: -abs(d - e)):
+                if abs(d - e) <= tau:
+                    stack.append(children[e])
+        return best
+
+
+def _tokencounts(tokenlists, ncodes):
+    counts = np.zeros((len(tokenlists), ncodes), dtype=np.int32)
+    for row, tokens in zip(counts, tokenlists):
+        row += np.bincount(tokens, minlength=ncodes).astype(np.int32)
+    return counts
+
+
+def _longestsharedsubstringlength(s1, s2, readingframe):
+    return max(alg._matchlengths(alg._tokenlist(s1, readingframe),
+                                 alg._stringsuffixautomaton(s2, readingframe)))
+
+
+def _levenshteinkeys(s, strings, readingframe):
+    return alg.levenshtein_matrix([s], strings, readingframe=readingframe)[0]
+
+
+def _similaritykeys(similarityf, s, strings, readingframe):
+    return [-similarityf(s, t, readingframe) for t in strings]
+
+
+def _groupindices(values):
+    """
+    Returns the distinct values in the array `values` and, for each of
+    them, the array of the indices at which it occurs.
+
+    """
+    order = np.argsort(values, kind='stable')
+    values, starts = np.unique(values[order], return_index=True)
+    return values, np.split(order, starts[1:])
+
+
+def _bucketedsearch(keysf, boundsf, buckets, k, ncandidates, exclude=None):
+    """
+    Returns the k candidates with the smallest keys, as a list of (key,
+    index) two-tuples ranked by key and then by index. Candidates are
+    indices in range(ncandidates).
+
+    `buckets` is a list of (bucketbound, indices) two-tuples in order of
+    increasing bucketbound, which is a lower bound on the keys of all
+    candidates in indices. indices can also be a function that returns
+    them, so that they are only generated when needed. When a bucket is
+    opened, `boundsf`, which takes an array of candidate indices, gives
+    another lower bound for each of its candidates, and the larger of both
+    bounds is used. Candidates are evaluated by `keysf`, which takes a list
+    of candidate indices, in batches of growing size and in order of
+    increasing bound, and the next bucket is only opened when fewer than a
+    batch of pending candidates have bounds up to its bound. The search
+    stops as soon as no pending candidate or unopened bucket can enter the
+    top k, so that buckets with large bounds are never bounded or
+    evaluated.
+
+    """
+    best = []
+    # pending candidates are kept sorted by bound and then by index, as
+    # bound * size + index, so that merging an opened bucket is one sort of
+    # two sorted runs
+    size = max(1, ncandidates)
+    pending = np.empty(0, dtype=np.int64)
+    batchsize = max(k, 64)
+    b = 0
+    while True:
+        if b < len(buckets):
+            nextbound = buckets[b][0]
+            nready = np.searchsorted(pending, (nextbound + 1) * size)
+        else:
+            nextbound = np.inf
+            nready = len(pending)
+        minbound = pending[0] // size if len(pending) else np.inf
+        if len(best) == k and min(nextbound, minbound) > best[-1][0]:
+            break
+        # candidates with bounds up to that of the next bucket are ranked
+        # before any candidate in it; buckets are opened until there is a
+        # full batch of those
+        if b < len(buckets) and nready < batchsize:
+            indices = buckets[b][1]
+            b += 1
+            if callable(indices):
+                indices = indices()
+            if exclude is not None:
+                indices = indices[indices != exclude]
+            bounds = np.maximum(boundsf(indices), buckets[b - 1][0])
+            keys = bounds.astype(np.int64) * size + indices
+            pending = np.sort(np.concatenate([pending, np.sort(keys)]),
+                              kind='stable')
+            continue
+        if not nready:
+            break
+        batch = (pending[:min(batchsize, nready)] % size).tolist()
+        pending = pending[len(batch):]
+        best.extend(zip(keysf(batch), batch))
+        best.sort()
+        del best[k:]
+        batchsize = min(2 * batchsize, 4096)
+    return [(int(key), j) for key, j in best]
+
+
+# Similarity metrics that `nearest` supports besides the Levenshtein
+# distance. Both are at most the number of tokens that two strings share as
+# multisets.
+_similarityfunctions = {
+    'longestsharedsubstringlength': _longestsharedsubstringlength,
+    'crosscorrelationmax': alg.crosscorrelationmax
+}
+
+# Length of the substrings in the inverted index that generates the
+# candidates for 'longestsharedsubstringlength'
+_ngramlength = 4
+
+nearestmetrics = ('crosscorrelationmax', 'levenshtein',
+                  'longestsharedsubstringlength')
+
+
+def nearest(stringdata, metric, comparison=('All', 'All'), k=5,
+            excludeself=False, method='bounds'):
+    """
+    Finds, for every string in the first category of `comparison`, the k
+    most similar strings in the second category, without computing the full
+    comparison matrix.
+
+    Candidates are evaluated in order of a bound on their score, and the
+    search stops as soon as no remaining candidate can enter the top k.
+    Candidates are generated in buckets with a common bound, and only the
+    buckets that can still contain a string in the top k are opened:
+
+    - 'levenshtein': buckets of strings of the same length, as the distance
+      is at least the length difference.
+    - 'longestsharedsubstringlength': buckets from an inverted index of
+      substrings of 4 tokens (see `ngramindex.NgramIndex`). A shared
+      substring of m >= 4 tokens covers m - 3 positions of the query at
+      which an indexed substring starts, so that strings that share no
+      such substring with the query are only listed when the top k scores
+      are below 4.
+    - 'crosscorrelationmax': buckets of strings of the same length, as the
+      score is at most the length of the shorter string.
+
+    Within an opened bucket, the bounds are tightened with the number of
+    tokens that a candidate shares with the query as multisets:
+    'longestsharedsubstringlength' and 'crosscorrelationmax' are at most
+    that number, and the Levenshtein distance is at least the larger number
+    of unshared tokens of the two strings. Levenshtein distances are
+    evaluated in vectorized batches (see
+    `stringcomparison.levenshtein_matrix`). Alternatively, with
+    method='bktree', the strings of the second category are indexed in a
+    `BKTree`, which prunes better when the distances between strings are
+    spread out.
+
+    Pruning depends on the data. Strings within the k-th distance of the
+    length of the query, or, for 'crosscorrelationmax', strings at least
+    as long as the k-th score, are all bounded, so with strings of similar
+    lengths the bounds are still computed for most pairs, at a cost
+    proportional to the size of the alphabet.
+
+    Parameters
+    ----------
+    stringdata : StringData
+    metric : {'levenshtein', 'longestsharedsubstringlength',
+              'crosscorrelationmax'}
+        Levenshtein distances are ranked from small to large, the other
+        metrics from large to small.
+    comparison : two-tuple of category names, default ('All', 'All')
+    k : positive int, default 5
+    excludeself : bool, default False
+        Whether a string with the same label as the query is left out, which
+        is useful when the categories of `comparison` overlap.
+    method : {'bounds', 'bktree'}, default 'bounds'
+        Search method for 'levenshtein'.
+
+    Returns
+    -------
+    A dictionary that maps every label of the first category to a list of at
+    most k (label, score) two-tuples, ranked by score and then by the order
+    of the labels in the second category.
+
+    Examples
+    --------
+    >>> from aglcheck import StringData
+    >>> from aglcheck.nearestneighbours import nearest
+    >>> sd = StringData([{'E1': 'abcd'}, {'E2': 'abdc'}, {'E3': 'dcba'},
+    ...                  {'T1': 'abce'}],
+    ...                 stringcategories={'Exposure': ['E1', 'E2', 'E3'],
+    ...                                   'Test': ['T1']})
+    >>> nearest(sd, 'levenshtein', comparison=('Test', 'Exposure'), k=2)
+    {'T1': [('E1', 1), ('E2', 2)]}
+    >>> nearest(sd, 'longestsharedsubstringlength',
+    ...         comparison=('Test', 'Exposure'), k=2)
+    {'T1': [('E1', 3), ('E2', 2)]}
+
+    """
+    if metric not in nearestmetrics:
+        raise ValueError('metric should be one of {}'.format(nearestmetrics))
+    if method not in ('bounds', 'bktree'):
+        raise ValueError("method should be 'bounds' or 'bktree'")
+    alg._checkpositiveint(k)
+    rf = stringdata.readingframe
+    stringdict = stringdata.stringdict
+    labels0 = list(stringdata.stringcategories[comparison[0]])
+    labels1 = list(stringdata.stringcategories[comparison[1]])
+    strings1 = [stringdict[l] for l in labels1]
+    for s in strings1:
+        alg._checkstring(s, readingframe=rf)
+    positions1 = {}
+    for j, l in enumerate(labels1):
+        positions1.setdefault(l, j)
+    results = {}
+    if metric == 'levenshtein' and method == 'bktree':
+        tokenlists = [alg._tokenlist(s, rf) for s in strings1]
+        tree = BKTree(tokenlists, alg._levenshtein_bitparallel)
+        for l in labels0:
+            exclude = positions1.get(l) if excludeself else None
+            query = alg._tokenlist(stringdict[l], rf)
+            best = tree.nearest(query, k=k, exclude=exclude)
+            results[l] = [(labels1[j], d) for d, j in best]
+        return results
+
+    tokenlists0 = [alg._tokenlist(stringdict[l], rf) for l in labels0]
+    tokenlists1 = [alg._tokenlist(s, rf) for s in strings1]
+    ncodes = 1 + max([max(t) for t in tokenlists0 + tokenlists1 if t] + [0])
+    counts1 = _tokencounts(tokenlists1, ncodes)
+    lengths1 = counts1.sum(axis=1)
+    bucketlengths, bucketindices = _groupindices(lengths1)
+    if metric == 'longestsharedsubstringlength':
+        index = NgramIndex(strings1, n=_ngramlength, readingframe=rf)
+    strings1 = np.array(strings1, dtype=object)
+    for l, tokens in zip(labels0, tokenlists0):
+        s = stringdict[l]
+        n = len(tokens)
+        query = np.bincount(tokens, minlength=ncodes).astype(np.int32)
+
+        def shared(indices):
+            # number of tokens that the candidates share with the query as
+            # multisets
+            return np.minimum(counts1[indices], query).sum(axis=1)
+
+        if metric == 'levenshtein':
+            # the larger number of unshared tokens, which is at least the
+            # length difference
+            buckets = list(zip(np.abs(bucketlengths - n), bucketindices))
+
+            def boundsf(indices):
+                return np.maximum(n, lengths1[indices]) - shared(indices)
+
+            def keysf(batch):
+                return _levenshteinkeys(s, strings1[batch].tolist(), rf)
+        else:
+            # similarities are at most the length of the shorter string
+            buckets = list(zip(-np.minimum(bucketlengths, n), bucketindices))
+            similarityf = _similarityfunctions[metric]
+
+            def boundsf(indices):
+                return -shared(indices)
+
+            def keysf(batch):
+                return _similaritykeys(similarityf, s,
+                                       strings1[batch].tolist(), rf)
+
+        if metric == 'longestsharedsubstringlength':
+            # a shared substring of m >= _ngramlength tokens covers
+            # m - _ngramlength + 1 positions of the query at which a shared
+            # substring of _ngramlength tokens starts, so that candidates
+            # that share none are only listed when they are needed
+            sharing, matches = index.sharingcounts(s)
+            caps = np.minimum(np.minimum(lengths1[sharing], n),
+                              matches + _ngramlength - 1)
+            capvalues, capindices = _groupindices(caps)
+            buckets = list(zip(-capvalues, [sharing[i] for i in capindices]))
+            buckets.append((-min(n, _ngramlength - 1),
+                            partial(np.setdiff1d, np.arange(len(strings1)),
+                                    sharing, assume_unique=True)))
+
+        buckets.sort(key=lambda bucket: bucket[0])
+        exclude = positions1.get(l) if excludeself else None
+        best = _bucketedsearch(keysf, boundsf, buckets, k, len(strings1),
+                               exclude=exclude)
+        if metric == 'levenshtein':
+            results[l] = [(labels1[j], key) for key, j in best]
+        else:
+            results[l] = [(labels1[j], -key) for key, j in best]
+    return results
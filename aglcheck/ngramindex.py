@@ -0,0 +1,376 @@
+from collections import Counter
+
+import numpy as np
+
+from . import stringcomparison as alg
+
+__all__ = ['NgramIndex', 'sharedlengthnsubstringcount_matrix',
+           'novellengthnsubstringcount_matrix', 'novelsubstrings',
+           'novelsubstringcounts']
+
+_keydtype = np.dtype(np.int64)
+
+
+class NgramIndex(object):
+    """
+    Inverted index from every length-n substring of a set of strings to its
+    postings: the strings in which it occurs, with the number of times and
+    the token positions at which it occurs in each of them.
+
+    Counts of shared or novel length-n substrings of other strings with
+    all indexed strings follow from a single join of the substrings of those
+    strings with the postings, so that the work is proportional to the
+    number of (substring, string) matches rather than to the number of
+    string pairs.
+
+    Parameters
+    ----------
+    strings : sequence of strings
+        Token strings to index.
+    n : positive int
+        Length of the substrings, in tokens.
+    readingframe : positive int, default 1
+        The number of characters that make up one string token.
+    labels : sequence, optional
+        Label of every string, as used by `postings`. By default the strings
+        themselves.
+
+    Examples
+    --------
+    >>> from aglcheck.ngramindex import NgramIndex
+    >>> index = NgramIndex(['abcab', 'cabd', 'dab'], n=2,
+    ...                    labels=['E1', 'E2', 'E3'])
+    >>> index.postings('ab')
+    [('E1', (0, 3)), ('E2', (1,)), ('E3', (1,))]
+    >>> index.sharedcounts(['abd', 'dd'])
+    array([[2, 2, 1],
+           [0, 0, 0]])
+
+    """
+
+    def __init__(self, strings, n, readingframe=1, labels=None):
+        alg._checkpositiveint(readingframe)
+        alg._checkpositiveint(n)
+        self.strings = list(strings)
+        self.labels = self.strings if labels is None else list(labels)
+        self.n = n
+        self.readingframe = readingframe
+        for s in self.strings:
+            alg._checkstring(s, readingframe=readingframe)
+            alg._tokenarray(s, readingframe=readingframe)
+        self.gramids = {}
+        gramids = self.gramids
+        occurrencegrams = []
+        occurrencestrings = []
+        occurrencepositions = []
+        # number of length-n substrings of every string
+        self.ngramcounts = np.zeros(len(self.strings), dtype=np.int64)
+        for j, s in enumerate(self.strings):
+            keys = self._keys(s)
+            self.ngramcounts[j] = len(keys)
+            occurrencegrams.extend([gramids.setdefault(key, len(gramids))
+                                    for key in keys])
+            occurrencestrings.extend([j] * len(keys))
+            occurrencepositions.extend(range(len(keys)))
+        grams = np.array(occurrencegrams, dtype=np.int64)
+        stringindices = np.array(occurrencestrings, dtype=np.int64)
+        positions = np.array(occurrencepositions, dtype=np.int64)
+        order = np.lexsort((positions, stringindices, grams))
+        self.positions = positions[order]
+        # one posting per combination of substring and string, in order of
+        # substring id and then string index
+        combined = grams[order] * max(1, len(self.strings)) \
+            + stringindices[order]
+        combined, self.postingstarts, self.postingcounts = np.unique(
+            combined, return_index=True, return_counts=True)
+        self.postinggrams = combined // max(1, len(self.strings))
+        self.postingstrings = combined % max(1, len(self.strings))
+        # postings of substring g are postinggrams[gramstarts[g]:
+        # gramstarts[g + 1]]
+        self.gramstarts = np.searchsorted(
+            self.postinggrams, np.arange(len(gramids) + 1))
+
+    @classmethod
+    def from_stringdata(cls, stringdata, n, category='All'):
+        """
+        Returns an index of the strings of a category of a StringData
+        instance, labeled by their string labels.
+
+        """
+        labels = list(stringdata.stringcategories[category])
+        stringdict = stringdata.stringdict
+        return cls([stringdict[l] for l in labels], n=n,
+                   readingframe=stringdata.readingframe, labels=labels)
+
+    def _keys(self, s):
+        # keys are made from a fixed dtype, so that they remain comparable
+        # when strings with new tokens widen the dtype of the token encoder
+        return alg._stringngramkeys(s, self.n, self.readingframe,
+                                    _keydtype)
+
+    def __len__(self):
+        return len(self.gramids)
+
+    def postings(self, substring):
+        """
+        Returns a list with a (label, positions) two-tuple for every indexed
+        string in which `substring` occurs, with the token positions at
+        which it occurs.
+
+        """
+        alg._checkstring(substring, readingframe=self.readingframe)
+        key = self._keys(substring)
+        if len(key) != 1 or key[0] not in self.gramids:
+            return []
+        g = self.gramids[key[0]]
+        result = []
+        for p in range(self.gramstarts[g], self.gramstarts[g + 1]):
+            start = self.postingstarts[p]
+            positions = self.positions[start:start + self.postingcounts[p]]
+            result.append((self.labels[self.postingstrings[p]],
+                           tuple(positions.tolist())))
+        return result
+
+    def _expand(self, grams):
+        # for an array of substring ids, returns the index in grams of every
+        # one of their postings, and the postings themselves
+        starts = self.gramstarts[grams]
+        lengths = self.gramstarts[grams + 1] - starts
+        entries = np.repeat(np.arange(len(grams)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths)
+        return entries, starts[entries] + offsets
+
+    def sharingcounts(self, s):
+        """
+        Returns an array with the indices of the indexed strings that share
+        at least one length-n substring with `s`, in increasing order, and
+        an array with, for each of them, the number of positions in s at
+        which a length-n substring starts that occurs in it.
+
+        """
+        alg._checkstring(s, readingframe=self.readingframe)
+        gramids = self.gramids
+        grams, weights = [], []
+        for key, count in Counter(self._keys(s)).items():
+            g = gramids.get(key)
+            if g is not None:
+                grams.append(g)
+                weights.append(count)
+        entries, postings = self._expand(np.array(grams, dtype=np.int64))
+        indices, inverse = np.unique(self.postingstrings[postings],
+                                     return_inverse=True)
+        counts = np.bincount(inverse, weights=np.array(weights)[entries],
+                             minlength=len(indices))
+        return indices, np.rint(counts).astype(np.int64)
+
+    def _join(self, strings, weightf):
+        """
+        Returns a matrix with, for every string in `strings` and every
+        indexed string, the sum over their shared substrings of
+        weightf(count in the string) times the count in the indexed string.
+
+        """
+        rows, grams, weights = [], [], []
+        gramids = self.gramids
+        for s in strings:
+            alg._checkstring(s, readingframe=self.readingframe)
+            alg._tokenarray(s, readingframe=self.readingframe)
+        for i, s in enumerate(strings):
+            for key, count in Counter(self._keys(s)).items():
+                g = gramids.get(key)
+                if g is not None:
+                    rows.append(i)
+                    grams.append(g)
+                    weights.append(weightf(count))
+        shape = (len(strings), len(self.strings))
+        if not rows:
+            return np.zeros(shape, dtype=np.int64)
+        rows = np.array(rows, dtype=np.int64)
+        grams = np.array(grams, dtype=np.int64)
+        weights = np.array(weights, dtype=np.int64)
+        # expand every (string, substring) entry to the postings of the
+        # substring
+        entries, postings = self._expand(grams)
+        cells = rows[entries] * shape[1] + self.postingstrings[postings]
+        values = weights[entries] * self.postingcounts[postings]
+        counts = np.bincount(cells, weights=values, minlength=shape[0] *
+                             shape[1])
+        return np.rint(counts).astype(np.int64).reshape(shape)
+
+    def sharedcounts(self, strings):
+        """
+        Returns a matrix with, for every string s in `strings` (rows) and
+        every indexed string t (columns), the number of length-n substrings
+        of s that occur in t, counted once for every occurrence in t, as in
+        `stringcomparison.sharedlengthnsubstrings`.
+
+        """
+        return self._join(list(strings), weightf=lambda count: count)
+
+    def novelcounts(self, strings):
+        """
+        Returns a matrix with, for every string s in `strings` (rows) and
+        every indexed string t (columns), the number of length-n substrings
+        of t that do not occur in s, as in
+        `stringcomparison.novellengthnsubstrings(t, s, n)`.
+
+        """
+        strings = list(strings)
+        shared = self._join(strings, weightf=lambda count: 1)
+        return self.ngramcounts[None, :] - shared
+
+
+def sharedlengthnsubstringcount_matrix(strings_a, strings_b, n,
+                                       readingframe=1):
+    """
+    Number of length-n shared substrings of every string in `strings_a`
+    (rows) with every string in `strings_b` (columns), from an `NgramIndex`
+    of `strings_b`.
+
+    """
+    index = NgramIndex(strings_b, n=n, readingframe=readingframe)
+    return index.sharedcounts(strings_a)
+
+
+def novellengthnsubstringcount_matrix(strings_a, strings_b, n,
+                                      readingframe=1):
+    """
+    Number of length-n substrings of every string in `strings_b` (columns)
+    that do not occur in every string in `strings_a` (rows), from an
+    `NgramIndex` of `strings_b`.
+
+    """
+    index = NgramIndex(strings_b, n=n, readingframe=readingframe)
+    return index.novelcounts(strings_a)
+
+
+def _ngramwindows(arrays, n):
+    """
+    Returns three arrays with an item for every length-n substring of the
+    token arrays in `arrays`: a key (a void scalar of the substring's
+    tokens), the index of the array, and the position in the array.
+
+    """
+    keys, indices, positions = [], [], []
+    for i, a in enumerate(arrays):
+        if len(a) < n:
+            continue
+        windows = np.lib.stride_tricks.sliding_window_view(a, n)
+        keys.append(np.ascontiguousarray(windows).view(
+            np.dtype((np.void, n * a.itemsize))).ravel())
+        indices.append(np.full(len(windows), i, dtype=np.int64))
+        positions.append(np.arange(len(windows), dtype=np.int64))
+    if not keys:
+        return (np.empty(0, dtype=np.dtype((np.void, n * _keydtype.itemsize))),
+                np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    return (np.concatenate(keys), np.concatenate(indices),
+            np.concatenate(positions))
+
+
+def _novelsubstringmasks(stringdata, n, comparison):
+    """
+    Yields, for every n, a two-tuple of n and a 3-tuple with the string
+    indices and positions of all length-n substrings of the strings in the
+    first category of `comparison`, and a boolean array that is True for
+    those that occur in no string of the second category.
+
+    """
+    ns = (n,) if np.ndim(n) == 0 else tuple(n)
+    for m in ns:
+        alg._checkpositiveint(m)
+    rf = stringdata.readingframe
+    stringdict = stringdata.stringdict
+    arrays = []
+    for category in comparison:
+        labels = stringdata.stringcategories[category]
+        strings = [stringdict[l] for l in labels]
+        for s in strings:
+            alg._checkstring(s, readingframe=rf)
+        arrays.append([alg._tokenarray(s, readingframe=rf).astype(_keydtype)
+                       for s in strings])
+    for m in ns:
+        keys1 = np.unique(_ngramwindows(arrays[1], m)[0])
+        keys0, indices, positions = _ngramwindows(arrays[0], m)
+        yield m, (indices, positions, ~np.isin(keys0, keys1))
+
+
+def novelsubstrings(stringdata, n, comparison=('All', 'All')):
+    """
+    Finds, for every string in the first category of `comparison`, the
+    length-n substrings that occur in none of the strings of the second
+    category (e.g. substrings of test strings that are absent from the whole
+    exposure set).
+
+    The substrings of the second category are collected once per n, and the
+    substrings of all strings of the first category are looked up in them
+    at once, so that the strings are not compared pair by pair.
+
+    Parameters
+    ----------
+    stringdata : StringData
+    n : positive int, or sequence of positive ints
+        Length(s) of the substrings, in tokens.
+    comparison : two-tuple of category names, default ('All', 'All')
+
+    Returns
+    -------
+    A dictionary that maps every n to a dictionary that maps every label of
+    the first category to a tuple of hits. Each hit is a two-tuple of a
+    novel substring and its token position, as in
+    `stringcomparison.novellengthnsubstrings`.
+
+    Examples
+    --------
+    >>> from aglcheck import StringData
+    >>> from aglcheck.ngramindex import novelsubstrings
+    >>> sd = StringData([{'E1': 'abcd'}, {'E2': 'bcda'}, {'T1': 'abda'}],
+    ...                 stringcategories={'Exposure': ['E1', 'E2'],
+    ...                                   'Test': ['T1']})
+    >>> novelsubstrings(sd, [2, 3], comparison=('Test', 'Exposure'))
+    {2: {'T1': (('bd', 1),)}, 3: {'T1': (('abd', 0), ('bda', 1))}}
+
+    """
+    rf = stringdata.readingframe
+    stringdict = stringdata.stringdict
+    labels = list(stringdata.stringcategories[comparison[0]])
+    results = {}
+    for m, (indices, positions, novel) in _novelsubstringmasks(
+            stringdata, n, comparison):
+        hits = {l: [] for l in labels}
+        for i, pos in zip(indices[novel].tolist(), positions[novel].tolist()):
+            s = stringdict[labels[i]]
+            hits[labels[i]].append((s[pos * rf:(pos + m) * rf], pos))
+        results[m] = {l: tuple(hits[l]) for l in labels}
+    return results
+
+
+def novelsubstringcounts(stringdata, n, comparison=('All', 'All')):
+    """
+    Counts, for every string in the first category of `comparison`, the
+    length-n substrings that occur in none of the strings of the second
+    category. See `novelsubstrings`.
+
+    Returns
+    -------
+    A dictionary that maps every n to a dictionary that maps every label of
+    the first category to a count.
+
+    Examples
+    --------
+    >>> from aglcheck import StringData
+    >>> from aglcheck.ngramindex import novelsubstringcounts
+    >>> sd = StringData([{'E1': 'abcd'}, {'E2': 'bcda'}, {'T1': 'abda'}],
+    ...                 stringcategories={'Exposure': ['E1', 'E2'],
+    ...                                   'Test': ['T1']})
+    >>> novelsubstringcounts(sd, (1, 2, 3), comparison=('Test', 'Exposure'))
+    {1: {'T1': 0}, 2: {'T1': 1}, 3: {'T1': 2}}
+
+    """
+    labels = list(stringdata.stringcategories[comparison[0]])
+    results = {}
+    for m, (indices, positions, novel) in _novelsubstringmasks(
+            stringdata, n, comparison):
+        counts = np.bincount(indices[novel], minlength=len(labels))
+        results[m] = dict(zip(labels, counts.tolist()))
+    return results
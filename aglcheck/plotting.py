@@ -2,20 +2,166 @@ import numpy as np
 
 __all__ = ['plot_comparison', 'plot_comparisons']
 
+_reducefunctions = {'mean': np.add, 'max': np.maximum}
+
+
+def _checkaggregate(aggregate):
+    if aggregate not in _reducefunctions:
+        raise ValueError("aggregate should be 'mean' or 'max'")
+
+
+def _comparisonarray(comparisonmatrix):
+    """
+    Returns the values of a comparison (a ComparisonMatrix or an array like
+    the matrix of one) as an array with a row for every string of the second
+    category, as it is plotted. Dense values are not copied.
+
+    """
+    if not hasattr(comparisonmatrix, 'get_matrix'):
+        return np.asarray(comparisonmatrix).T
+    if comparisonmatrix.values is not None:
+        return comparisonmatrix.values.T
+    return np.array(comparisonmatrix.get_matrix()).T
+
+
+def _blockreduce(matrix, maxsize, aggregate):
+    """
+    Reduces blocks of neighbouring values of a 2D array, so that the result
+    has at most `maxsize` rows and columns. Blocks have the same shape,
+    except at the last row and column.
+
+    """
+    ufunc = _reducefunctions[aggregate]
+    if aggregate == 'mean':
+        matrix = matrix.astype(np.float64)
+    for axis in (0, 1):
+        n = matrix.shape[axis]
+        step = -(-n // maxsize)
+        if step == 1:
+            continue
+        starts = np.arange(0, n, step)
+        matrix = ufunc.reduceat(matrix, starts, axis=axis)
+        if aggregate == 'mean':
+            sizes = np.diff(np.append(starts, n))
+            matrix /= sizes.reshape((-1, 1) if axis == 0 else (1, -1))
+    return matrix
+
+
+def _categoryreduce(matrix, xstringlabels, ystringlabels, stringcategories,
+                    categories, aggregate):
+    """
+    Reduces the values of a 2D array, with rows corresponding to
+    `ystringlabels` and columns to `xstringlabels`, to one value for every
+    pair of categories. Pairs of categories without strings are NaN.
+
+    """
+    def indicators(labels):
+        positions = {}
+        for i, l in enumerate(labels):
+            positions.setdefault(l, []).append(i)
+        ind = np.zeros((len(categories), len(labels)), dtype=bool)
+        for c, category in enumerate(categories):
+            for l in stringcategories[category]:
+                ind[c, positions.get(l, [])] = True
+        return ind
+
+    yind = indicators(ystringlabels)
+    xind = indicators(xstringlabels)
+    if aggregate == 'mean':
+        matrix = matrix.astype(np.float64)
+        with np.errstate(invalid='ignore'):
+            return (yind @ matrix @ xind.T) / np.outer(yind.sum(axis=1),
+                                                       xind.sum(axis=1))
+    result = np.full((len(categories), len(categories)), np.nan)
+    for i, yrows in enumerate(yind):
+        if not yrows.any():
+            continue
+        rowmax = matrix[yrows].max(axis=0)
+        for j, xcols in enumerate(xind):
+            if xcols.any():
+                result[i, j] = rowmax[xcols].max()
+    return result
+
+
 def plot_comparison(comparisonmatrix, cmap=None,
                     colorbarorientation='vertical',
                     colorbarshrink=1., clim=None, colorbarlabel='',
-                    title=None):
+                    title=None, categories=None, aggregate=None,
+                    maxsize=None, maxticklabels=100):
+    """
+    Plots the values of a comparison as a heatmap, with a column for every
+    string of the first category of the comparison and a row for every
+    string of the second category. The comparison is a ComparisonMatrix,
+    or a precomputed 2D array like its matrix (see
+    `ComparisonMatrix.get_matrix`), which is plotted without tick labels.
+
+    Large comparisons can be plotted in less time, and more readably, by
+    aggregating values per pair of string categories (`categories`) or per
+    block of neighbouring strings (`maxsize`). Tick labels are only shown,
+    in the label colors of the strings, if there are at most
+    `maxticklabels` of them on an axis.
+
+    Parameters
+    ----------
+    comparisonmatrix : ComparisonMatrix
+    cmap, colorbarorientation, colorbarshrink, clim, colorbarlabel, title
+        Properties of the heatmap and the color bar.
+    categories : sequence of category names, optional
+        Categories to aggregate values by, on both axes, so that the heatmap
+        has a row and column for every category.
+    aggregate : {'mean', 'max'}, optional
+        How values are aggregated, by default 'mean'.
+    maxsize : int, optional
+        Maximum number of rows and columns of the heatmap. Blocks of
+        neighbouring values are aggregated to reduce larger comparisons.
+    maxticklabels : int, default 100
 
+    """
+    return _plot_comparison(comparisonmatrix,
+                            _comparisonarray(comparisonmatrix), cmap=cmap,
+                            colorbarorientation=colorbarorientation,
+                            colorbarshrink=colorbarshrink, clim=clim,
+                            colorbarlabel=colorbarlabel, title=title,
+                            categories=categories, aggregate=aggregate,
+                            maxsize=maxsize, maxticklabels=maxticklabels)
+
+
+def _plot_comparison(comparisonmatrix, matrix, cmap, colorbarorientation,
+                     colorbarshrink, clim, colorbarlabel, title,
+                     categories=None, aggregate=None, maxsize=None,
+                     maxticklabels=100):
+    # plot_comparison, with the plotted values of comparisonmatrix already
+    # in `matrix`
     import matplotlib.pyplot as plt
 
-    if title is None:
-        title = comparisonmatrix.title
+    if hasattr(comparisonmatrix, 'get_matrix'):
         if title is None:
-            title = ''
-    matrix = np.array(comparisonmatrix.get_matrix()).T
-    mmin, mmax = matrix.min(), matrix.max()
-    if np.issubdtype(matrix.dtype, np.int):
+            title = comparisonmatrix.title
+        xticklabels = comparisonmatrix.xstringlabels
+        yticklabels = comparisonmatrix.ystringlabels
+        labelcolors = comparisonmatrix.stringdata.stringlabelcolors
+    else:
+        xticklabels = yticklabels = labelcolors = None
+        if categories is not None:
+            raise ValueError('values can only be aggregated by category for '
+                             'a ComparisonMatrix')
+    if title is None:
+        title = ''
+    if categories is not None or maxsize is not None:
+        aggregate = 'mean' if aggregate is None else aggregate
+        _checkaggregate(aggregate)
+    if categories is not None:
+        categories = list(categories)
+        matrix = _categoryreduce(matrix, xticklabels, yticklabels,
+                                 comparisonmatrix.stringdata.stringcategories,
+                                 categories, aggregate)
+        xticklabels = yticklabels = categories
+        labelcolors = None
+    if maxsize is not None and max(matrix.shape) > maxsize:
+        matrix = _blockreduce(matrix, maxsize, aggregate)
+        xticklabels = yticklabels = None
+    mmin, mmax = np.nanmin(matrix), np.nanmax(matrix)
+    if np.issubdtype(matrix.dtype, np.integer):
         intcolors = True
     else:
         intcolors = False
@@ -40,15 +186,17 @@ def plot_comparison(comparisonmatrix, cmap=None,
         cmap = plt.cm.get_cmap(cmap, lut)
     ax = plt.gca()
     plt.imshow(matrix, interpolation='nearest', cmap=cmap, clim=clim)
-    plt.xticks(np.arange(len(comparisonmatrix.xstringlabels)), comparisonmatrix.xstringlabels)
-    plt.yticks(np.arange(len(comparisonmatrix.ystringlabels)), comparisonmatrix.ystringlabels)
-    plt.xticks(rotation=70)
-    for xticklabel in ax.get_xticklabels():
-        color = comparisonmatrix.stringdata.stringlabelcolors[xticklabel.get_text()]
-        xticklabel.set_color(color)
-    for yticklabel in ax.get_yticklabels():
-        color = comparisonmatrix.stringdata.stringlabelcolors[yticklabel.get_text()]
-        yticklabel.set_color(color)
+    if xticklabels is not None and len(xticklabels) <= maxticklabels:
+        plt.xticks(np.arange(len(xticklabels)), xticklabels)
+        plt.xticks(rotation=70)
+        if labelcolors is not None:
+            for xticklabel, l in zip(ax.get_xticklabels(), xticklabels):
+                xticklabel.set_color(labelcolors[l])
+    if yticklabels is not None and len(yticklabels) <= maxticklabels:
+        plt.yticks(np.arange(len(yticklabels)), yticklabels)
+        if labelcolors is not None:
+            for yticklabel, l in zip(ax.get_yticklabels(), yticklabels):
+                yticklabel.set_color(labelcolors[l])
     plt.title(title)
     plt.colorbar(orientation=colorbarorientation,
                  ticks=ticks,
@@ -58,22 +206,25 @@ def plot_comparison(comparisonmatrix, cmap=None,
 
 def plot_comparisons(*args, clim=None, colorbarorientation='vertical',
                      colorbarshrink=1.,colorbarlabel=''):
+    """
+    Plots comparisons side by side (see `plot_comparison`), with the same
+    color limits, by default the lowest and highest value of all of them.
+    Comparisons are ComparisonMatrix instances or precomputed arrays, whose
+    values are materialized once, for both the color limits and the plots.
 
+    """
     import matplotlib.pyplot as plt
 
-    low = np.inf
-    high = -np.inf
-    for comparisonmatrix in args:
-        ar = np.array(comparisonmatrix.get_matrix())
-        low = min(low, ar.min())
-        high = max(high, ar.max())
-        clim = (low, high)
+    matrices = [_comparisonarray(c) for c in args]
+    if clim is None:
+        clim = (min(np.nanmin(matrix) for matrix in matrices),
+                max(np.nanmax(matrix) for matrix in matrices))
     axes = []
-    for i,comparisonmatrix in enumerate(args, 1):
+    for i, (comparisonmatrix, matrix) in enumerate(zip(args, matrices), 1):
         plt.subplot(1,len(args),i)
-        axes.append(plot_comparison(comparisonmatrix, cmap=None,
-                                    colorbarorientation=colorbarorientation,
-                                    colorbarshrink=colorbarshrink, clim=clim,
-                                    colorbarlabel=colorbarlabel,
-                                    title=None))
+        axes.append(_plot_comparison(comparisonmatrix, matrix, cmap=None,
+                                     colorbarorientation=colorbarorientation,
+                                     colorbarshrink=colorbarshrink, clim=clim,
+                                     colorbarlabel=colorbarlabel,
+                                     title=None))
     return axes
\ No newline at end of file
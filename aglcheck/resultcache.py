@@ -0,0 +1,169 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+__all__ = ['ResultCache']
+
+
+def _jsondefault(o):
+    # NumPy scalars, as returned by the array-based algorithms
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError('{!r} cannot be stored in a ResultCache'.format(o))
+
+
+def _jsondumps(o, **kwargs):
+    return json.dumps(o, ensure_ascii=False, separators=(',', ':'),
+                      default=_jsondefault, **kwargs)
+
+
+class ResultCache(object):
+    """
+    Persistent cache of the outcomes of string pair analyses, stored in a
+    local SQLite file.
+
+    Outcomes are content-addressed: they are stored under a hash of the two
+    strings, the analysis (metric name and parameters), the readingframe and
+    the aglcheck version. Re-running an analysis on a data set in which only
+    some strings or categories changed therefore only computes the pairs
+    that are new. When the total size of the stored outcomes exceeds
+    `maxbytes`, the least recently used outcomes are evicted.
+
+    Outcomes are stored as JSON text, so they should be numbers, booleans,
+    strings, or lists or tuples of those; tuples are read back as lists.
+
+    A cache is used by passing it as the `cache` argument of the functions
+    in `stringsetcomparison`.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the SQLite file. It is created if it does not exist.
+    maxbytes : int, default 2**30
+        Maximum total size in bytes of the JSON-encoded outcomes in the
+        cache.
+
+    Examples
+    --------
+    >>> from aglcheck import get_examplestringdata
+    >>> from aglcheck.resultcache import ResultCache
+    >>> from aglcheck.stringsetcomparison import levenshtein
+    >>> sd = get_examplestringdata('wilsonetal_ejn_2015')
+    >>> import os, tempfile
+    >>> tempdir = tempfile.TemporaryDirectory()
+    >>> cache = ResultCache(os.path.join(tempdir.name, 'cache.sqlite'))
+    >>> cm = levenshtein(sd, cache=cache)  # computes and stores outcomes
+    >>> cm = levenshtein(sd, cache=cache)  # reads them from the cache
+    >>> cache.close()
+    >>> tempdir.cleanup()
+
+    """
+
+    def __init__(self, filename, maxbytes=2**30):
+        from ._version import get_versions
+        self.filename = filename
+        self.maxbytes = maxbytes
+        self.version = get_versions()['version']
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS outcomes ('
+                                'key BLOB PRIMARY KEY, '
+                                'value BLOB NOT NULL, '
+                                'size INTEGER NOT NULL, '
+                                'lastused REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS lastused_index '
+                                'ON outcomes (lastused)')
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM outcomes').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def makekey(self, s1, s2, analysis, readingframe):
+        """
+        Returns the key of the outcome of `analysis` on strings s1 and s2.
+        `analysis` identifies the analysis and its parameters, e.g.
+        ('sharedlengthnsubstringcount', {'n': 2}); it should be
+        JSON-serializable and change whenever the outcome may change. Dict
+        keys are sorted, so the order of parameters does not matter.
+
+        """
+        description = _jsondumps([s1, s2, analysis, readingframe,
+                                  self.version], sort_keys=True)
+        return hashlib.sha1(description.encode('utf-8')).digest()
+
+    def get_many(self, keys, chunksize=500):
+        """
+        Returns a dictionary with the cached outcomes of those keys that are
+        in the cache, and marks them as recently used.
+
+        """
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), chunksize):
+            chunk = keys[i:i + chunksize]
+            query = 'SELECT key, value FROM outcomes WHERE key IN ({})'.format(
+                ', '.join('?' * len(chunk)))
+            for key, value in self.connection.execute(query, chunk):
+                found[bytes(key)] = json.loads(value)
+        if found:
+            now = time.time()
+            self.connection.executemany(
+                'UPDATE outcomes SET lastused = ? WHERE key = ?',
+                ((now, key) for key in found))
+            self.connection.commit()
+        return found
+
+    def set_many(self, items):
+        """
+        Stores (key, outcome) items, after which the least recently used
+        outcomes are evicted if the cache is larger than `maxbytes`.
+
+        """
+        now = time.time()
+        rows = []
+        for key, outcome in items:
+            value = _jsondumps(outcome)
+            rows.append((key, value, len(value.encode('utf-8')), now))
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO outcomes (key, value, size, lastused) '
+            'VALUES (?, ?, ?, ?)', rows)
+        self.connection.commit()
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used outcomes until the total size is at
+        most `maxbytes`.
+
+        """
+        totalsize = self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM outcomes').fetchone()[0]
+        if totalsize <= self.maxbytes:
+            return
+        evicted = []
+        for key, size in self.connection.execute(
+                'SELECT key, size FROM outcomes ORDER BY lastused'):
+            evicted.append((key,))
+            totalsize -= size
+            if totalsize <= self.maxbytes:
+                break
+        self.connection.executemany('DELETE FROM outcomes WHERE key = ?',
+                                    evicted)
+        self.connection.commit()
+
+    def clear(self):
+        """Removes all outcomes from the cache."""
+        self.connection.execute('DELETE FROM outcomes')
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
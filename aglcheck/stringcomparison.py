@@ -1,10 +1,18 @@
+import functools
+from bisect import bisect_left
+
 import numpy as np
 
+from .tokenencoding import tokenarray, tokenize
+
 __all__ = ['commonstart', 'commonstartlength', 'commonstartduration',
-           'crosscorrelate', 'crosscorrelationmax', 'sharedlengthnsubstrings',
+           'crosscorrelate', 'crosscorrelationcounts', 'crosscorrelationmax',
+           'crosscorrelationmaxmatches', 'sharedlengthnsubstrings',
            'longestsharedsubstrings', 'longestsharedsubstringduration',
            'novellengthnsubstrings', 'samestart', 'samestart',
-           'sharedsubstrings']
+           'sharedsubstrings', 'levenshtein', 'levenshtein_matrix',
+           'commonstartlength_matrix', 'commonstartduration_matrix',
+           'cumulativedurations', 'memoinfo', 'clearmemo']
 
 
 # Notations:
@@ -14,11 +22,57 @@ __all__ = ['commonstart', 'commonstartlength', 'commonstartduration',
 # ss1, ss2, ..., ssn : sharedsubstrings
 
 
+# Memoization of per-string data
+# ------------------------------
+# In a set comparison every string is compared with many partner strings.
+# Data that only depend on one string (its validation, token array, n-grams,
+# suffix automaton) are therefore memoized, in LRU caches of at most
+# MEMOSIZE entries each. Memoized values are shared between calls and should
+# not be modified.
+
+MEMOSIZE = 2 ** 14
+
+_memos = {}
+
+
+def _memoize(f):
+    memo = functools.lru_cache(maxsize=MEMOSIZE)(f)
+    _memos[f.__name__] = memo
+    return memo
+
+
+def memoinfo():
+    """
+    Returns a dictionary with, for every memo of per-string data, a named
+    tuple with its hits, misses, maxsize and current size (see
+    `functools.lru_cache`).
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import clearmemo, memoinfo, \\
+    ...     levenshtein
+    >>> clearmemo()
+    >>> levenshtein('abcd', 'abdc')
+    2
+    >>> memoinfo()['_tokenlist']
+    CacheInfo(hits=0, misses=2, maxsize=16384, currsize=2)
+
+    """
+    return {name: memo.cache_info() for name, memo in _memos.items()}
+
+
+def clearmemo():
+    """Removes all memoized per-string data."""
+    for memo in _memos.values():
+        memo.cache_clear()
+
+
 def _checkpositiveint(i):
     if not (isinstance(i, int) and (i > 0)):
         raise ValueError("i ({}) should be an int > 0".format(i))
 
 
+@_memoize
 def _checkstring(s, readingframe=1):
     if not (isinstance(s, str) and len(s) >= readingframe):
         raise TypeError("s1 and s2 should be strings with at least one "
@@ -28,6 +82,21 @@ def _checkstring(s, readingframe=1):
             raise ValueError('string "{}" not comatible with '
                              'readingframe of {}'.format(s, readingframe))
 
+
+@_memoize
+def _tokenarray(s, readingframe=1):
+    """Read-only version of `tokenencoding.tokenarray`."""
+    a = tokenarray(s, readingframe=readingframe)
+    a.setflags(write=False)
+    return a
+
+
+@_memoize
+def _tokenlist(s, readingframe=1):
+    """Token codes of s as a tuple of ints."""
+    return tuple(_tokenarray(s, readingframe=readingframe).tolist())
+
+
 def lengthnsubstrings(s, n, readingframe=1):
     """
     Returns a tuple of consecutive length-n substrings of s.
@@ -60,12 +129,84 @@ def lengthnsubstrings(s, n, readingframe=1):
     _checkpositiveint(readingframe)
     _checkstring(s, readingframe=readingframe)
     _checkpositiveint(n)
+    return _lengthnsubstrings(s, n, readingframe)
+
+
+@_memoize
+def _lengthnsubstrings(s, n, readingframe):
     # how many length-n substrings exist in in s1?
     nss1 = int(len(s) / readingframe) - n + 1
     return tuple(s[i:i + n * readingframe]
                  for i in range(0, nss1 * readingframe, readingframe))
 
 
+def _tokenarrays(s1, s2, readingframe=1):
+    """
+    Returns the token arrays of s1 and s2 (see `tokenencoding.tokenarray`),
+    with a common dtype so that their elements and bytes can be compared.
+
+    """
+    a1 = _tokenarray(s1, readingframe=readingframe)
+    a2 = _tokenarray(s2, readingframe=readingframe)
+    if a1.dtype != a2.dtype:
+        dtype = np.promote_types(a1.dtype, a2.dtype)
+        a1, a2 = a1.astype(dtype), a2.astype(dtype)
+    return a1, a2
+
+
+def _ngramkeys(a, n):
+    """
+    Returns a list with hashable keys (bytes) for the consecutive length-n
+    substrings of token array a. Keys of arrays with the same dtype are equal
+    if and only if the substrings are equal.
+
+    """
+    b = a.tobytes()
+    w = a.itemsize
+    return [b[i:i + n * w] for i in range(0, (len(a) - n + 1) * w, w)]
+
+
+def _lengthnsubstringindex(a, n):
+    """
+    Returns a dictionary that maps the key (see `_ngramkeys`) of every
+    length-n substring of token array a to a list with the token positions at
+    which it occurs in a, in increasing order. The index is built in one pass
+    over a, so that looking up where a substring occurs does not require
+    rescanning a.
+
+    """
+    index = {}
+    for pos, key in enumerate(_ngramkeys(a, n)):
+        index.setdefault(key, []).append(pos)
+    return index
+
+
+# The n-gram keys of a string depend on the dtype of its token array, which
+# grows with the alphabet of the shared encoder. The memos below therefore
+# take the dtype in which the keys are to be made.
+
+@_memoize
+def _stringngramkeys(s, n, readingframe, dtype):
+    """Tuple with the keys of the length-n substrings of s (`_ngramkeys`)."""
+    a = _tokenarray(s, readingframe=readingframe).astype(dtype, copy=False)
+    return tuple(_ngramkeys(a, n))
+
+
+@_memoize
+def _stringngramset(s, n, readingframe, dtype):
+    """Frozenset with the keys of the length-n substrings of s."""
+    return frozenset(_stringngramkeys(s, n, readingframe, dtype))
+
+
+@_memoize
+def _stringngramindex(s, n, readingframe, dtype):
+    """`_lengthnsubstringindex` of s, with tuples of positions."""
+    index = {}
+    for pos, key in enumerate(_stringngramkeys(s, n, readingframe, dtype)):
+        index.setdefault(key, []).append(pos)
+    return {key: tuple(positions) for key, positions in index.items()}
+
+
 def sharedlengthnsubstrings(s1, s2, n, readingframe=1):
     """
     Finds length-n shared substrings of s1 in s2.
@@ -106,15 +247,15 @@ def sharedlengthnsubstrings(s1, s2, n, readingframe=1):
     _checkstring(s1, readingframe=readingframe)
     _checkstring(s2, readingframe=readingframe)
     _checkpositiveint(n)
-    s1ss = lengthnsubstrings(s1, n=n, readingframe=readingframe)
+    a1, a2 = _tokenarrays(s1, s2, readingframe=readingframe)
+    s2index = _stringngramindex(s2, n, readingframe, a2.dtype)
     matches = []
-    for pos, substring in enumerate(s1ss):
-        positions = []
-        for i in range(0, len(s2), readingframe):
-            if substring == s2[i:i + n * readingframe]:
-                positions.append((pos, int(i/readingframe)))
-        if len(positions) > 0:
-            matches.append((substring, tuple(positions)))
+    for pos, key in enumerate(_stringngramkeys(s1, n, readingframe,
+                                               a1.dtype)):
+        s2positions = s2index.get(key)
+        if s2positions is not None:
+            substring = s1[pos * readingframe:(pos + n) * readingframe]
+            matches.append((substring, tuple((pos, i) for i in s2positions)))
     return tuple(matches)
 
 
@@ -153,16 +294,90 @@ def sharedsubstrings(s1, s2, readingframe=1):
     """
 
     matches = [sharedlengthnsubstrings(s1, s2, n, readingframe)
-               for n in range(1, len(s1) + 1)]
+               for n in range(1, len(s1) // readingframe + 1)]
     # remove empty 'matches'
     return tuple(match for match in matches if match)
 
 
+def _suffixautomaton(tokens):
+    """
+    Builds a suffix automaton of a token sequence in linear time.
+
+    The automaton recognizes every substring of `tokens`. It is returned as a
+    tuple of three lists, indexed by state: the transition dicts (token ->
+    state), the suffix links, and the length of the longest substring that
+    ends in each state. State 0 is the initial state.
+
+    """
+    transitions = [{}]
+    links = [-1]
+    lengths = [0]
+    last = 0
+    for token in tokens:
+        current = len(lengths)
+        transitions.append({})
+        links.append(0)
+        lengths.append(lengths[last] + 1)
+        state = last
+        while state != -1 and token not in transitions[state]:
+            transitions[state][token] = current
+            state = links[state]
+        if state != -1:
+            nextstate = transitions[state][token]
+            if lengths[state] + 1 == lengths[nextstate]:
+                links[current] = nextstate
+            else:
+                clone = len(lengths)
+                transitions.append(dict(transitions[nextstate]))
+                links.append(links[nextstate])
+                lengths.append(lengths[state] + 1)
+                while state != -1 and \
+                        transitions[state].get(token) == nextstate:
+                    transitions[state][token] = clone
+                    state = links[state]
+                links[nextstate] = clone
+                links[current] = clone
+        last = current
+    return transitions, links, lengths
+
+
+@_memoize
+def _stringsuffixautomaton(s, readingframe=1):
+    """Suffix automaton of the token codes of s."""
+    return _suffixautomaton(_tokenlist(s, readingframe))
+
+
+def _matchlengths(tokens, automaton):
+    """
+    Returns, for every position in `tokens`, the length of the longest
+    substring ending at that position that is recognized by `automaton`, as
+    produced by `_suffixautomaton`.
+
+    """
+    transitions, links, lengths = automaton
+    state = 0
+    length = 0
+    matchlengths = []
+    for token in tokens:
+        while state != 0 and token not in transitions[state]:
+            state = links[state]
+            length = lengths[state]
+        if token in transitions[state]:
+            state = transitions[state][token]
+            length += 1
+        matchlengths.append(length)
+    return matchlengths
+
+
 def longestsharedsubstrings(s1, s2, readingframe=1):
     """
     Finds longest shared substrings of s1 in s2. If there are multiple
     matches, return every match.
 
+    The longest match length is found in linear time by running s1 through a
+    suffix automaton of s2, after which only substrings of that length are
+    looked up in s2.
+
     Parameters
     ----------
     s1 : string
@@ -193,15 +408,28 @@ def longestsharedsubstrings(s1, s2, readingframe=1):
     (('a1a2', ((0, 2),)),)
     
     """
-    for n in range(len(s1)//readingframe, 0, -1):
-        matches = sharedlengthnsubstrings(s1, s2, n, readingframe)
-        if matches:
-            return matches
-    return ()
+    _checkpositiveint(readingframe)
+    _checkstring(s1, readingframe=readingframe)
+    _checkstring(s2, readingframe=readingframe)
+    a1, a2 = _tokenarrays(s1, s2, readingframe=readingframe)
+    matchlengths = _matchlengths(_tokenlist(s1, readingframe),
+                                 _stringsuffixautomaton(s2, readingframe))
+    n = max(matchlengths)
+    if n == 0:
+        return ()
+    s2index = _stringngramindex(s2, n, readingframe, a2.dtype)
+    matches = []
+    for end, matchlength in enumerate(matchlengths):
+        if matchlength == n:
+            pos = end - n + 1
+            substring = s1[pos * readingframe:(end + 1) * readingframe]
+            s2positions = s2index[a1[pos:end + 1].tobytes()]
+            matches.append((substring, tuple((pos, i) for i in s2positions)))
+    return tuple(matches)
 
 
 def longestsharedsubstringduration(s1, s2, tokendurations, isiduration,
-                                   readingframe=1):
+                                   readingframe=1, cumdurations=None):
     """
         Finds longest shared substrings of s1 in s2, and calculates their 
         duration.
@@ -222,6 +450,9 @@ def longestsharedsubstringduration(s1, s2, tokendurations, isiduration,
             so that, e.g. the string "abcd" has 4 tokens. However if there exist
             many tokens, these can be coded with multiple ascii symbols. E.g., if
             readingframe is 2, then "a1a2" has two tokens, namely "a1" and "a2".
+        cumdurations: dict, optional
+            A dictionary that maps strings to their `cumulativedurations`, so
+            that these need not be computed for every pair.
 
         Returns
         -------
@@ -234,14 +465,72 @@ def longestsharedsubstringduration(s1, s2, tokendurations, isiduration,
         3.2
         
     """
-    durations = [0.]
-    for s, positions in longestsharedsubstrings(s1=s1, s2=s2,
-                                                readingframe=readingframe):
-        elements = [s[i:i + readingframe] for i in
-                    range(0, len(s), readingframe)]
-        sounddur = sum([tokendurations[el] for el in elements])
-        durations.append(sounddur + (len(elements) - 1) * isiduration)
-    return float(np.max(durations))
+    _checkpositiveint(readingframe)
+    _checkstring(s1, readingframe=readingframe)
+    _checkstring(s2, readingframe=readingframe)
+    matchlengths = np.array(_matchlengths(
+        _tokenlist(s1, readingframe), _stringsuffixautomaton(s2, readingframe)))
+    n = int(matchlengths.max())
+    if n == 0:
+        return 0.
+    starts = np.flatnonzero(matchlengths == n) - n + 1
+    durations = _spandurations(s1, starts, n, tokendurations,
+                               readingframe=readingframe,
+                               cumdurations=cumdurations)
+    return float(durations.max() + (n - 1) * isiduration)
+
+
+def cumulativedurations(s, tokendurations, readingframe=1):
+    """
+    Returns an array c with the cumulative durations of the tokens of s, in
+    which c[k] is the summed duration of the first k tokens. The duration of
+    the n tokens starting at position i, including the n - 1 inter-stimulus
+    intervals between them, is then c[i + n] - c[i] + (n - 1) * isiduration.
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import cumulativedurations
+    >>> cumulativedurations('abca', {'a': 1., 'b': 2., 'c': .5})
+    array([0. , 1. , 3. , 3.5, 4.5])
+
+    """
+    return np.cumsum([0.] + [tokendurations[token] for token in
+                             tokenize(s, readingframe=readingframe)])
+
+
+def _spandurations(s, starts, n, tokendurations, readingframe=1,
+                   cumdurations=None):
+    """
+    Returns an array with the summed token durations of the n tokens from
+    every position in `starts`, from the `cumulativedurations` of s in the
+    dictionary `cumdurations` if it has them. Otherwise only the tokens in
+    the spans need to be in `tokendurations`.
+
+    """
+    starts = np.asarray(starts)
+    c = None if cumdurations is None else cumdurations.get(s)
+    if c is not None:
+        return c[starts + n] - c[starts]
+    tokens = tokenize(s, readingframe=readingframe)
+    return np.array([sum([tokendurations[token] for token in tokens[i:i + n]])
+                     for i in starts.tolist()], dtype=np.float64)
+
+
+def _matchesduration(s1, matches, tokendurations, isiduration,
+                     readingframe=1, cumdurations=None):
+    """
+    Returns the maximum duration of the substrings in `matches`, as returned
+    by e.g. `longestsharedsubstrings` for s1, or 0. if there are none.
+
+    """
+    if not matches:
+        return 0.
+    n = len(matches[0][0]) // readingframe
+    starts = [positions[0][0] for s, positions in matches]
+    durations = _spandurations(s1, starts, n, tokendurations,
+                               readingframe=readingframe,
+                               cumdurations=cumdurations)
+    return float(durations.max() + (n - 1) * isiduration)
 
 
 def novellengthnsubstrings(s1, s2, n, readingframe=1):
@@ -283,10 +572,12 @@ def novellengthnsubstrings(s1, s2, n, readingframe=1):
     _checkstring(s1, readingframe=readingframe)
     _checkstring(s2, readingframe=readingframe)
     _checkpositiveint(n)
-    # which length-n substrings exist in in s1?
-    s1ss = lengthnsubstrings(s1, n=n, readingframe=readingframe)
-    s2ss = set(lengthnsubstrings(s2, n=n, readingframe=readingframe))
-    return tuple((ss, pos) for pos, ss in enumerate(s1ss) if ss not in s2ss)
+    a1, a2 = _tokenarrays(s1, s2, readingframe=readingframe)
+    s2keys = _stringngramset(s2, n, readingframe, a2.dtype)
+    s1keys = _stringngramkeys(s1, n, readingframe, a1.dtype)
+    return tuple((s1[pos * readingframe:(pos + n) * readingframe], pos)
+                 for pos, key in enumerate(s1keys)
+                 if key not in s2keys)
 
 
 
@@ -324,11 +615,23 @@ def commonstart(s1, s2, readingframe=1):
     _checkstring(s2, readingframe=readingframe)
     _checkpositiveint(readingframe)
 
-    i = sum([s2.startswith(s1[:i]) for i in
-             range(readingframe, len(s1) + 1, readingframe)])
+    i = _commonprefixlength(*_tokenarrays(s1, s2, readingframe=readingframe))
     return s1[:i * readingframe]
 
 
+def _commonprefixlength(a1, a2):
+    """
+    Returns the number of tokens that token arrays a1 and a2 share from the
+    beginning, by locating their first mismatch.
+
+    """
+    m = min(len(a1), len(a2))
+    mismatches = np.flatnonzero(a1[:m] != a2[:m])
+    if mismatches.size:
+        return int(mismatches[0])
+    return m
+
+
 def commonstartlength(s1, s2, readingframe=1):
     """
     Counts the length of the substring that both s1 and s2 start with.
@@ -338,42 +641,331 @@ def commonstartlength(s1, s2, readingframe=1):
                            readingframe=readingframe)) // readingframe
 
 
-def commonstartduration(s1, s2, tokendurations, isiduration, readingframe=1):
-    s = commonstart(s1=s1, s2=s2, readingframe=readingframe)
-    elements = [s[i:i + readingframe] for i in range(0, len(s), readingframe)]
-    sounddur = np.sum([tokendurations[el] for el in elements])
-    if len(elements) > 0:
-        return sounddur + (len(elements) - 1) * isiduration
-    else:
+def commonstartduration(s1, s2, tokendurations, isiduration, readingframe=1,
+                        cumdurations=None):
+    """
+    Calculates the duration of the substring that both s1 and s2 start with.
+    `cumdurations` optionally maps strings to their `cumulativedurations`.
+
+    """
+    n = commonstartlength(s1=s1, s2=s2, readingframe=readingframe)
+    return _startduration(s1, n, tokendurations=tokendurations,
+                          isiduration=isiduration, readingframe=readingframe,
+                          cumdurations=cumdurations)
+
+
+def _startduration(s, n, tokendurations, isiduration, readingframe=1,
+                   cumdurations=None):
+    """Returns the duration of the first n tokens of s."""
+    if n == 0:
         return 0.
+    duration, = _spandurations(s, [0], n, tokendurations,
+                               readingframe=readingframe,
+                               cumdurations=cumdurations)
+    return float(duration + (n - 1) * isiduration)
+
+
+def commonstartlength_matrix(strings_a, strings_b, readingframe=1):
+    """
+    Lengths of the substrings that every string in `strings_a` shares from
+    the beginning with every string in `strings_b` (see `commonstartlength`).
+
+    The distinct strings of `strings_b` are sorted once, and every string of
+    `strings_a` is placed among them with a binary search. In sorted order,
+    the common start length of two strings is the minimum of the common
+    start lengths of all neighbours between them, so that only neighbouring
+    strings need to be compared and every row of the result follows from a
+    cumulative minimum.
+
+    Parameters
+    ----------
+    strings_a : sequence of strings
+        Token strings, one per row of the result.
+    strings_b : sequence of strings
+        Token strings, one per column of the result.
+    readingframe : positive int, default 1
+        The number of characters that make up one string token.
+
+    Returns
+    -------
+    2D int array of shape (len(strings_a), len(strings_b)).
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import commonstartlength_matrix
+    >>> commonstartlength_matrix(['abcd', 'abd'], ['abce', 'b', 'abd'])
+    array([[3, 0, 2],
+           [2, 0, 3]])
+
+    """
+    _checkpositiveint(readingframe)
+    strings_a = list(strings_a)
+    for s in strings_a:
+        _checkstring(s, readingframe=readingframe)
+    return _commonstartlengths(_sortedstarts(strings_b, readingframe),
+                               strings_a, readingframe=readingframe)
+
+
+def _sortedstarts(strings_b, readingframe):
+    """
+    Returns the sorted distinct strings of strings_b, an array with the
+    common start length of every one of them with the one before it, and
+    an array with the rank of every string of strings_b. The common start
+    lengths of other strings with strings_b follow from these with
+    `_commonstartlengths`.
+
+    """
+    strings_b = list(strings_b)
+    for s in strings_b:
+        _checkstring(s, readingframe=readingframe)
+    # with tokens of equal length, the order of python strings is a
+    # lexicographic order of token strings
+    distinct = sorted(set(strings_b))
+    ranks = {s: r for r, s in enumerate(distinct)}
+    neighbourlengths = np.zeros(len(distinct), dtype=np.int64)
+    for r in range(1, len(distinct)):
+        neighbourlengths[r] = _commonprefixlength(
+            *_tokenarrays(distinct[r - 1], distinct[r],
+                          readingframe=readingframe))
+    columns = np.array([ranks[s] for s in strings_b], dtype=np.intp)
+    return distinct, neighbourlengths, columns
+
+
+def _commonstartlengths(sortedstarts, strings_a, readingframe):
+    """
+    Returns the common start lengths of every string in `strings_a` with
+    every string of the strings_b of `sortedstarts` (see `_sortedstarts`).
+
+    """
+    distinct, neighbourlengths, columns = sortedstarts
+    lengths = np.zeros((len(strings_a), len(columns)), dtype=np.int64)
+    if not distinct:
+        return lengths
+    rows = {}
+    for i, s in enumerate(strings_a):
+        if s not in rows:
+            # the common start length of s with a string is the minimum of
+            # the common start lengths of all neighbours between them in
+            # sorted order, with s in its place
+            r = bisect_left(distinct, s)
+            row = np.empty(len(distinct), dtype=np.int64)
+            if r < len(distinct) and distinct[r] == s:
+                row[r] = len(s) // readingframe
+                row[r + 1:] = np.minimum.accumulate(neighbourlengths[r + 1:])
+                before = neighbourlengths[r:0:-1]
+            else:
+                # s lies between distinct[r - 1] and distinct[r]
+                a = _tokenarray(s, readingframe=readingframe)
+
+                def startlength(j):
+                    return _commonprefixlength(
+                        a, _tokenarray(distinct[j], readingframe=readingframe))
+
+                before = np.concatenate([[startlength(r - 1)],
+                                         neighbourlengths[r - 1:0:-1]]) \
+                    if r else neighbourlengths[:0]
+                if r < len(distinct):
+                    row[r:] = np.minimum.accumulate(np.concatenate(
+                        [[startlength(r)], neighbourlengths[r + 1:]]))
+            row[:r] = np.minimum.accumulate(before)[::-1]
+            rows[s] = row[columns]
+        lengths[i] = rows[s]
+    return lengths
+
+
+def commonstartduration_matrix(strings_a, strings_b, tokendurations,
+                               isiduration, readingframe=1, cumdurations=None):
+    """
+    Durations of the substrings that every string in `strings_a` shares from
+    the beginning with every string in `strings_b` (see
+    `commonstartduration`), based on `commonstartlength_matrix`.
+    `cumdurations` optionally maps strings to their `cumulativedurations`.
+
+    """
+    strings_a = list(strings_a)
+    for s in strings_a:
+        _checkstring(s, readingframe=readingframe)
+    return _commonstartdurations(_sortedstarts(strings_b, readingframe),
+                                 strings_a, tokendurations, isiduration,
+                                 readingframe=readingframe,
+                                 cumdurations=cumdurations)
+
+
+def _commonstartdurations(sortedstarts, strings_a, tokendurations,
+                          isiduration, readingframe, cumdurations=None):
+    """
+    Returns the common start durations of every string in `strings_a` with
+    every string of the strings_b of `sortedstarts` (see `_sortedstarts`).
+
+    """
+    lengths = _commonstartlengths(sortedstarts, strings_a,
+                                  readingframe=readingframe)
+    durations = np.zeros(lengths.shape, dtype=np.float64)
+    for i, s in enumerate(strings_a):
+        c = None if cumdurations is None else cumdurations.get(s)
+        if c is None:
+            # only the tokens of the longest common start need a duration
+            tokens = tokenize(s, readingframe=readingframe)
+            c = np.cumsum([0.] + [tokendurations[token] for token in
+                                  tokens[:lengths[i].max(initial=0)]])
+        startdurations = c + isiduration * np.arange(-1, len(c) - 1)
+        startdurations[0] = 0.
+        durations[i] = startdurations[lengths[i]]
+    return durations
+
+
+def _crosscorrelationmatches(a1, a2):
+    """
+    Returns the positions (k, l) of all token matches a1[k] == a2[l], as two
+    arrays, together with the crosscorrelation lag index of every match.
+    Lag index m - 1 (m = len(a1)) corresponds to the alignment in which a1
+    and a2 start at the same position.
+
+    """
+    k, l = np.nonzero(a1[:, None] == a2[None, :])
+    return k, l, l - k + len(a1) - 1
+
+
+def _crosscorrelationslice(m, full):
+    if full or m == 1:
+        return slice(None)
+    return slice(m - 1, -(m - 1))
+
+
+def crosscorrelationcounts(s1, s2, readingframe=1, full=True):
+    """
+    Counts the number of matching tokens of s1 and s2 for every lag at which
+    they can be aligned. This is the first element returned by
+    `crosscorrelate`, but computed in one vectorized step on token arrays,
+    without building the matched substrings.
+
+    Parameters
+    ----------
+    s1 : string
+        Token string
+    s2 : string
+        Token string
+    readingframe : positive int, default 1
+        The number of characters that make up one string token. Normally 1,
+        so that, e.g. the string "abcd" has 4 tokens. However if there exist
+        many tokens, these can be coded with multiple ascii symbols. E.g., if
+        readingframe is 2, then "a1a2" has two tokens, namely "a1" and "a2".
+    full : bool, default True
+        If True, all lags at which s1 and s2 overlap are considered. If False,
+        only lags at which s1 lies completely within s2.
+
+    Returns
+    -------
+    int array with the number of matching tokens per lag.
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import crosscorrelationcounts
+    >>> crosscorrelationcounts('abc', 'xbcab')
+    array([0, 0, 2, 0, 0, 2, 0])
+    >>> crosscorrelationcounts('abc', 'xbcab', full=False)
+    array([2, 0, 0])
+
+    """
+    _checkstring(s1, readingframe=readingframe)
+    _checkstring(s2, readingframe=readingframe)
+    _checkpositiveint(readingframe)
+    a1, a2 = _tokenarrays(s1, s2, readingframe=readingframe)
+    k, l, lags = _crosscorrelationmatches(a1, a2)
+    ccf = np.bincount(lags, minlength=len(a1) + len(a2) - 1)
+    return ccf[_crosscorrelationslice(len(a1), full)]
 
 
 def crosscorrelate(s1, s2, readingframe=1, full=True):
+    """
+    Crosscorrelates s1 with s2, by sliding s1 along s2 and comparing the
+    tokens at every lag.
+
+    Parameters
+    ----------
+    s1 : string
+        Token string
+    s2 : string
+        Token string
+    readingframe : positive int, default 1
+        The number of characters that make up one string token. Normally 1,
+        so that, e.g. the string "abcd" has 4 tokens. However if there exist
+        many tokens, these can be coded with multiple ascii symbols. E.g., if
+        readingframe is 2, then "a1a2" has two tokens, namely "a1" and "a2".
+    full : bool, default True
+        If True, all lags at which s1 and s2 overlap are considered. If False,
+        only lags at which s1 lies completely within s2.
+
+    Returns
+    -------
+    Two-tuple with an int array containing the number of matching tokens per
+    lag (see `crosscorrelationcounts`), and a list with, for every lag, a
+    list of the tokens of s1 that match, with '' for tokens that do not.
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import crosscorrelate
+    >>> crosscorrelate('abc', 'xbcab', full=False)
+    (array([2, 0, 0]), [['', 'b', 'c'], ['', '', ''], ['', '', '']])
+
+    """
     _checkstring(s1, readingframe=readingframe)
     _checkstring(s2, readingframe=readingframe)
     _checkpositiveint(readingframe)
-    if readingframe > 1:
-        s1 = [s1[i:i + readingframe] for i in range(0, len(s1), readingframe)]
-        s2 = [s2[i:i + readingframe] for i in range(0, len(s2), readingframe)]
-    sa1 = np.array(list(s1))
-    sa2 = np.zeros(2 * len(s1) + len(s2) - 2, dtype=sa1.dtype)
-    sa2[sa1.size - 1:sa1.size + len(s2) - 1] = list(s2)
-    nsteps = len(sa2) - len(sa1)
-    ccp = [(sa1 == sa2[i:i + sa1.size]) for i in range(nsteps + 1)]
-    ccs = [[item if isequal else '' for (isequal, item) in zip(cc, sa1)] for cc
-           in ccp]
-    ccf = np.array([(sa1 == sa2[i:i + sa1.size]).sum()
-                    for i in range(nsteps + 1)])
-
-    if full:
-        return ccf, ccs
-    else:
-        return ccf[sa1.size - 1:-(sa1.size - 1)], \
-               ccs[sa1.size - 1:-(sa1.size - 1)]
+    a1, a2 = _tokenarrays(s1, s2, readingframe=readingframe)
+    tokens = tokenize(s1, readingframe=readingframe)
+    k, l, lags = _crosscorrelationmatches(a1, a2)
+    ccf = np.bincount(lags, minlength=len(a1) + len(a2) - 1)
+    ccs = [[''] * len(a1) for lag in range(len(ccf))]
+    for pos, lag in zip(k.tolist(), lags.tolist()):
+        ccs[lag][pos] = tokens[pos]
+    sl = _crosscorrelationslice(len(a1), full)
+    return ccf[sl], ccs[sl]
+
+
+def crosscorrelationmaxmatches(s1, s2, readingframe=1, full=True):
+    """
+    Returns the matching tokens of s1 (see `crosscorrelate`) only for the
+    lags at which the number of matches is maximal.
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import crosscorrelationmaxmatches
+    >>> crosscorrelationmaxmatches('abc', 'xbcab')
+    [['', 'b', 'c'], ['a', 'b', '']]
+
+    """
+    _checkstring(s1, readingframe=readingframe)
+    _checkstring(s2, readingframe=readingframe)
+    _checkpositiveint(readingframe)
+    a1, a2 = _tokenarrays(s1, s2, readingframe=readingframe)
+    tokens = tokenize(s1, readingframe=readingframe)
+    k, l, lags = _crosscorrelationmatches(a1, a2)
+    ccf = np.bincount(lags, minlength=len(a1) + len(a2) - 1)
+    sl = _crosscorrelationslice(len(a1), full)
+    maxlags = np.arange(len(ccf))[sl][ccf[sl] == ccf[sl].max()]
+    matches = {lag: [''] * len(a1) for lag in maxlags.tolist()}
+    for pos, lag in zip(k.tolist(), lags.tolist()):
+        if lag in matches:
+            matches[lag][pos] = tokens[pos]
+    return [matches[lag] for lag in maxlags.tolist()]
+
 
 def crosscorrelationmax(s1, s2, readingframe=1, full=True):
-    cc = crosscorrelate(s1=s1, s2=s2, readingframe=readingframe, full=full)
-    return max(cc[0])
+    """
+    Returns the maximum number of matching tokens of s1 and s2 over all lags
+    (see `crosscorrelationcounts`).
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import crosscorrelationmax
+    >>> crosscorrelationmax('abcd', 'xbcdab')
+    3
+
+    """
+    return crosscorrelationcounts(s1=s1, s2=s2, readingframe=readingframe,
+                                  full=full).max()
+
 
 def issubstring(s1, s2, *args, **kwargs):
     """Is s1 a substring of s2"""
@@ -389,29 +981,195 @@ def samestart(s1, s2, n, readingframe=1):
     return s1[:n * readingframe] == s2[:n * readingframe]
 
 
-def levenshtein(s1, s2, readingframe=1):
+def _levenshtein_bitparallel(a1, a2, max_distance=None):
+    """
+    Bit-parallel Levenshtein distance between token code sequences a1 and a2
+    (Myers 1999, in the formulation of Hyyro 2001). The columns of the
+    dynamic programming matrix for a1 are encoded as bit vectors of vertical
+    deltas, so that one pass over a2 suffices. Python ints are used as bit
+    vectors, so a1 can have any length.
+
+    If `max_distance` is given, the computation stops as soon as the distance
+    is known to exceed it, and `max_distance + 1` is returned.
+
+    """
+    m = len(a1)
+    n = len(a2)
+    if max_distance is not None and abs(m - n) > max_distance:
+        return max_distance + 1
+    if m == 0 or n == 0:
+        return max(m, n)
+    peq = {}
+    for i, c in enumerate(a1):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    score = m
+    for j, c in enumerate(a2):
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def levenshtein(s1, s2, readingframe=1, max_distance=None):
     """
-    Code adapted from: https://en.wikibooks.org/wiki/Algorithm_Implementation
-    /Strings/Levenshtein_distance#Python
+    Levenshtein (edit) distance between token strings s1 and s2, i.e. the
+    minimum number of token insertions, deletions and substitutions needed
+    to change one into the other.
+
+    Parameters
+    ----------
+    s1 : string
+        Token string
+    s2 : string
+        Token string
+    readingframe : positive int, default 1
+        The number of characters that make up one string token. Normally 1,
+        so that, e.g. the string "abcd" has 4 tokens. However if there exist
+        many tokens, these can be coded with multiple ascii symbols. E.g., if
+        readingframe is 2, then "a1a2" has two tokens, namely "a1" and "a2".
+    max_distance : int, optional
+        If given, stop as soon as the distance is known to be larger than
+        `max_distance`, and return `max_distance + 1` in that case.
+
+    Returns
+    -------
+    int: the edit distance in tokens.
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import levenshtein
+    >>> levenshtein('abcde', 'abde')
+    1
+    >>> levenshtein('a1a2a3', 'a3a2a1', readingframe=2)
+    2
+    >>> levenshtein('abcdefgh', 'hgfedcba', max_distance=3)
+    4
 
     """
     _checkstring(s1, readingframe=readingframe)
     _checkstring(s2, readingframe=readingframe)
     _checkpositiveint(readingframe)
-    if len(s1) < len(s2):
-        return levenshtein(s2, s1)
-    if len(s2) == 0:
-        return len(s1)
-    if readingframe > 1:
-        s1 = [s1[i:i + readingframe] for i in range(0, len(s1), readingframe)]
-        s2 = [s2[i:i + readingframe] for i in range(0, len(s2), readingframe)]
-    previous_row = range(0, len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-    return previous_row[-1]
+    return _levenshtein_bitparallel(_tokenlist(s1, readingframe),
+                                    _tokenlist(s2, readingframe),
+                                    max_distance=max_distance)
+
+
+def levenshtein_matrix(strings_a, strings_b, readingframe=1,
+                       max_distance=None, blocksize=2**20):
+    """
+    Levenshtein distances between every string in `strings_a` and every
+    string in `strings_b`.
+
+    The bit-parallel algorithm of `levenshtein` is run for many pairs at once
+    with NumPy, using 64-bit words. Pairs in which the string from
+    `strings_a` has more than 64 tokens are computed one by one.
+
+    Parameters
+    ----------
+    strings_a : sequence of strings
+        Token strings, one per row of the result.
+    strings_b : sequence of strings
+        Token strings, one per column of the result.
+    readingframe : positive int, default 1
+        The number of characters that make up one string token.
+    max_distance : int, optional
+        If given, distances larger than `max_distance` are returned as
+        `max_distance + 1`, which allows stopping early.
+    blocksize : int, default 2**20
+        Maximum number of pairs that are processed at once, to bound memory
+        use.
+
+    Returns
+    -------
+    2D int array of shape (len(strings_a), len(strings_b)).
+
+    Examples
+    --------
+    >>> from aglcheck.stringcomparison import levenshtein_matrix
+    >>> levenshtein_matrix(['abc', 'abd'], ['abc', 'bd', 'dcba'])
+    array([[0, 2, 3],
+           [1, 1, 3]])
+
+    """
+    _checkpositiveint(readingframe)
+    for s in list(strings_a) + list(strings_b):
+        _checkstring(s, readingframe=readingframe)
+    arrays_a = [_tokenarray(s, readingframe=readingframe) for s in strings_a]
+    arrays_b = [_tokenarray(s, readingframe=readingframe) for s in strings_b]
+    distances = np.zeros((len(arrays_a), len(arrays_b)), dtype=np.int64)
+    if len(arrays_a) == 0 or len(arrays_b) == 0:
+        return distances
+    lengths_a = np.array([len(a) for a in arrays_a])
+    lengths_b = np.array([len(b) for b in arrays_b])
+    # codes that only occur in b share the all-zero column ncodes of peq
+    ncodes = 1 + int(np.concatenate(arrays_a).max())
+
+    # strings in a that do not fit in a 64-bit word
+    for i in np.flatnonzero(lengths_a > 64):
+        for j, b in enumerate(arrays_b):
+            distances[i, j] = _levenshtein_bitparallel(
+                arrays_a[i].tolist(), b.tolist(), max_distance=max_distance)
+    rows = np.flatnonzero(lengths_a <= 64)
+    if rows.size == 0:
+        return distances
+
+    # pattern bit vectors: peq[i, c] has bit k set if token k of a_i is c
+    peq = np.zeros((len(arrays_a), ncodes + 1), dtype=np.uint64)
+    for i in rows:
+        a = arrays_a[i]
+        np.bitwise_or.at(peq[i], a.astype(np.intp),
+                         np.left_shift(np.uint64(1),
+                                       np.arange(len(a), dtype=np.uint64)))
+    # texts, padded with code 0 beyond their length
+    texts = np.zeros((len(arrays_b), lengths_b.max()), dtype=np.intp)
+    for j, b in enumerate(arrays_b):
+        texts[j, :len(b)] = b
+    np.minimum(texts, ncodes, out=texts)
+
+    one = np.uint64(1)
+    nrows = max(1, blocksize // len(arrays_b))
+    for start in range(0, rows.size, nrows):
+        block = rows[start:start + nrows]
+        m = lengths_a[block][:, None].astype(np.uint64)
+        full = np.where(m == 64, ~np.uint64(0), (one << m) - one)
+        last = one << (m - one)
+        peqblock = peq[block]
+        pv = np.repeat(full, len(arrays_b), axis=1)
+        mv = np.zeros_like(pv)
+        score = np.repeat(lengths_a[block][:, None], len(arrays_b), axis=1)
+        for j in range(texts.shape[1]):
+            active = j < lengths_b
+            eq = peqblock[:, texts[:, j]]
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | (~(xh | pv) & full)
+            mh = pv & xh
+            score += active & ((ph & last) != 0)
+            score -= active & ((mh & last) != 0)
+            if max_distance is not None and \
+                    (score - (lengths_b - j - 1) > max_distance).all():
+                break
+            ph = ((ph << one) | one) & full
+            mh = (mh << one) & full
+            pv = mh | (~(xv | ph) & full)
+            mv = ph & xv
+        distances[block] = score
+    if max_distance is not None:
+        np.minimum(distances, max_distance + 1, out=distances)
+    return distances
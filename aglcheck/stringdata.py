@@ -1,23 +1,254 @@
 from __future__ import print_function
+import csv
+import hashlib
+import json
+import os
 import yaml
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from .stringcomparison import cumulativedurations, _tokenarray
+from .tokenencoding import get_tokenencoder, tokenize
 
 __all__ = ['read_stringdata', 'StringData']
 
 
+class _CompactView(object):
+    __slots__ = ('_stringdata',)
+
+    def __init__(self, stringdata):
+        self._stringdata = stringdata
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, list(self))
+
+
+class _StringListView(_CompactView, Sequence):
+    """The strings of a compact StringData, decoded when accessed."""
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self._stringdata.stringlabels)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError('string index out of range')
+        if i < 0:
+            i += n
+        sd = self._stringdata
+        return sd.tokenencoder.decode(sd.get_tokenarray(i).tolist())
+
+
+class _LabelMappingView(_CompactView, Mapping):
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self._stringdata.labelids)
+
+    def __iter__(self):
+        return iter(self._stringdata.labelids)
+
+    def __contains__(self, label):
+        return label in self._stringdata.labelids
+
+
+class _StringDictView(_LabelMappingView):
+    """Maps labels to the strings of a compact StringData."""
+    __slots__ = ()
+
+    def __getitem__(self, label):
+        return self._stringdata.strings[self._stringdata.labelids[label]]
+
+
+class _TokenArrayView(_LabelMappingView):
+    """Maps labels to views of the token buffer of a compact StringData."""
+    __slots__ = ()
+
+    def __getitem__(self, label):
+        sd = self._stringdata
+        return sd.get_tokenarray(sd.labelids[label])
+
+
+class _CumulativeDurationView(Mapping):
+    """
+    Maps labels to the cumulative token durations of their strings (see
+    `stringcomparison.cumulativedurations`), computed when first accessed.
+    Strings with tokens that have no duration are left out; the durations
+    of their substrings are computed from the token durations directly.
+    Durations are kept, except for a compact StringData.
+
+    """
+    __slots__ = ('_stringdata', '_durations')
+
+    def __init__(self, stringdata):
+        self._stringdata = stringdata
+        self._durations = {}
+
+    def _get(self, label):
+        # cumulative durations of label, or None if not all of its tokens
+        # have a duration
+        sd = self._stringdata
+        if sd.compact:
+            durations = sd._durationlookup[
+                sd.get_tokenarray(sd.labelids[label])]
+            if np.isnan(durations).any():
+                return None
+            return np.cumsum(np.concatenate([[0.], durations]))
+        if label not in self._durations:
+            try:
+                self._durations[label] = cumulativedurations(
+                    sd.stringdict[label], sd.tokendurations,
+                    readingframe=sd.readingframe)
+            except KeyError:
+                self._durations[label] = None
+        return self._durations[label]
+
+    def __getitem__(self, label):
+        if label not in self._stringdata.stringdict:
+            raise KeyError(label)
+        durations = self._get(label)
+        if durations is None:
+            raise KeyError(label)
+        return durations
+
+    def __iter__(self):
+        return (l for l in self._stringdata.stringdict
+                if self._get(l) is not None)
+
+    def __len__(self):
+        return sum(1 for l in self)
+
+
+class _SharedTokenArrayView(Mapping):
+    """
+    Maps labels to the token arrays of strings as the string comparison
+    algorithms memoize them, so that they are not stored twice.
+
+    """
+    __slots__ = ('_stringdata',)
+
+    def __init__(self, stringdata):
+        self._stringdata = stringdata
+
+    def __len__(self):
+        return len(self._stringdata.stringdict)
+
+    def __iter__(self):
+        return iter(self._stringdata.stringdict)
+
+    def __getitem__(self, label):
+        sd = self._stringdata
+        return _tokenarray(sd.stringdict[label], readingframe=sd.readingframe)
+
+
+class _CategoryView(_CompactView, Mapping):
+    """Maps categories to lists of labels, from category index arrays."""
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self._stringdata.categoryindices)
+
+    def __iter__(self):
+        return iter(self._stringdata.categoryindices)
+
+    def __getitem__(self, category):
+        sd = self._stringdata
+        stringlabels = sd.stringlabels
+        return [stringlabels[i]
+                for i in sd.categoryindices[category].tolist()]
+
+
+class _LabelColorView(_CompactView, Mapping):
+    """Maps labels to colors, with 'black' for labels without one."""
+    __slots__ = ('_colors',)
+
+    def __init__(self, stringdata, colors):
+        self._stringdata = stringdata
+        self._colors = colors
+
+    def __len__(self):
+        return len(self._stringdata.labelids)
+
+    def __iter__(self):
+        return iter(self._stringdata.labelids)
+
+    def __getitem__(self, label):
+        if label not in self._stringdata.labelids:
+            raise KeyError(label)
+        return self._colors.get(label, 'black')
+
+
 class StringData(object):
+    """
+    Token strings with their labels, string categories, label colors and
+    optionally token durations.
+
+    `tokenarrays` maps labels to the token codes of their strings, as
+    arrays that are shared with the string comparison algorithms.
+
+    With `compact=True`, the strings are stored as one contiguous buffer of
+    token codes (`tokenbuffer`), in which string i occupies
+    `tokenbuffer[offsets[i]:offsets[i + 1]]`, and categories as arrays with
+    the indices of their strings (`categoryindices`). The attributes
+    `strings`, `stringdict`, `tokenarrays`, `stringcategories`,
+    `stringlabelcolors` and `cumulativedurations` are then read-only views
+    that decode or compute their values when accessed. This needs much less
+    memory for large sets of strings.
+
+    """
 
     def __init__(self, strings, readingframe=1, stringcategories=None,
-                 labelcolors=None, tokendurations=None, isiduration=None):
+                 labelcolors=None, tokendurations=None, isiduration=None,
+                 compact=False):
 
-        strings = self._checkstrings(strings)
-        self.stringdict = {l: s for d in strings for l, s in d.items()}
-        self.stringlabels = [l for d in strings for l, s in d.items()]
-        self.strings = [s for d in strings for l, s in d.items()]
-        self.readingframe = readingframe
+        stringlabels, strings = self._checkstrings(strings)
+        self._setup(stringlabels, strings, readingframe=readingframe,
+                    stringcategories=stringcategories,
+                    labelcolors=labelcolors, tokendurations=tokendurations,
+                    isiduration=isiduration, compact=compact)
 
-        self.stringcategories = {} if stringcategories is None else stringcategories
+    def _setup(self, stringlabels, strings, readingframe=1,
+               stringcategories=None, labelcolors=None, tokendurations=None,
+               isiduration=None, compact=False):
+        self.readingframe = readingframe
+        self.compact = compact
+        if readingframe == 1:
+            alphabet = set(''.join(strings))
+        else:
+            alphabet = set()
+            for s in strings:
+                alphabet.update(tokenize(s, readingframe=readingframe))
+        self.alphabet = tuple(sorted(alphabet))
+        # token strings are compared as arrays of integer codes, which the
+        # string comparison algorithms make and memoize per string
+        self.tokenencoder = get_tokenencoder(readingframe)
+        self.tokenencoder.update(self.alphabet)
         self.tokendurations = tokendurations
         self.isiduration = isiduration
+        if compact:
+            self._setupcompact(stringlabels, strings, stringcategories,
+                               labelcolors)
+            return
+        self.stringdict = dict(zip(stringlabels, strings))
+        self.stringlabels = stringlabels
+        self.strings = strings
+        self.tokenarrays = _SharedTokenArrayView(self)
+
+        self.stringcategories = {} if stringcategories is None else stringcategories
+        # cumulative token durations per string, from which the duration of
+        # any substring follows by subtraction
+        if tokendurations is None:
+            self.cumulativedurations = {}
+        else:
+            self.cumulativedurations = _CumulativeDurationView(self)
         labelcolors = {} if labelcolors is None else labelcolors
         self.stringlabelcolors = {}
         for category, color in labelcolors.items():
@@ -30,15 +261,211 @@ class StringData(object):
             l = self.stringlabels
             self.stringcategories.update({'All': l})
 
+    def _setupcompact(self, stringlabels, strings, stringcategories,
+                      labelcolors):
+        rf = self.readingframe
+        self.stringlabels = list(stringlabels)
+        # as in a dict, a label that occurs more than once refers to its
+        # last string
+        self.labelids = {l: i for i, l in enumerate(self.stringlabels)}
+        lengths = np.fromiter((len(s) for s in strings), dtype=np.int64,
+                              count=len(strings))
+        if rf > 1 and (lengths % rf).any():
+            raise ValueError('strings not compatible with readingframe of '
+                             '{}'.format(rf))
+        self.offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        np.cumsum(lengths // rf, out=self.offsets[1:])
+        self.tokenbuffer = self.tokenencoder.encode(''.join(strings))
+        self.tokenbuffer.setflags(write=False)
+        self.strings = _StringListView(self)
+        self.stringdict = _StringDictView(self)
+        self.tokenarrays = _TokenArrayView(self)
+
+        stringcategories = {} if stringcategories is None \
+            else stringcategories
+        self.categoryindices = {
+            category: np.array([self.labelids[l] for l in labels],
+                               dtype=np.intp)
+            for category, labels in stringcategories.items()}
+        if 'All' not in self.categoryindices:
+            self.categoryindices['All'] = np.arange(len(strings),
+                                                    dtype=np.intp)
+        self.stringcategories = _CategoryView(self)
+
+        if self.tokendurations is None:
+            self.cumulativedurations = {}
+        else:
+            self._durationlookup = np.array(
+                [self.tokendurations.get(token, np.nan)
+                 for token in self.tokenencoder.tokens])
+            self.cumulativedurations = _CumulativeDurationView(self)
+
+        colors = {}
+        labelcolors = {} if labelcolors is None else labelcolors
+        for category, color in labelcolors.items():
+            for sl in self.stringcategories[category]:
+                colors[sl] = color
+        self.stringlabelcolors = _LabelColorView(self, colors)
+
+    def get_tokenarray(self, i):
+        """
+        Returns the token codes of the i-th string of a compact StringData,
+        as a read-only view of its token buffer.
+
+        """
+        return self.tokenbuffer[self.offsets[i]:self.offsets[i + 1]]
+
     def _checkstrings(self, strings):
         """
-        Makes sure that 'strings' is a list of dicts. If it is just a
-        sequence of strings, it will return a list with dicts in which keys
-        that are identical to the strings.
+        Returns a list with string labels and a list with strings from
+        'strings', which is a list of dicts that map labels to strings. If it
+        is just a sequence of strings, the labels are identical to the
+        strings.
+
+        """
+        stringlabels = []
+        stringlist = []
+        for si in strings:
+            if isinstance(si, dict):
+                for l, s in si.items():
+                    stringlabels.append(l)
+                    stringlist.append(s)
+            else:
+                stringlabels.append(si)
+                stringlist.append(si)
+        return stringlabels, stringlist
+
+    @classmethod
+    def from_columns(cls, strings, stringlabels=None, categories=None,
+                     stringcategories=None, **kwargs):
+        """
+        Returns a StringData instance built directly from columns, i.e.
+        sequences of equal length, without per-string dictionaries.
+
+        Parameters
+        ----------
+        strings : sequence of strings
+            Token strings.
+        stringlabels : sequence of strings, optional
+            Label of every string. By default the strings themselves.
+        categories : sequence, optional
+            Category of every string. Strings with the same category are
+            grouped into a string category of that name. Missing values
+            (None, or NaN from e.g. pandas) mean no category.
+        stringcategories : dict, optional
+            Additional string categories, as in StringData.
+        **kwargs
+            Other StringData parameters (readingframe, labelcolors,
+            tokendurations, isiduration).
+
+        Examples
+        --------
+        >>> from aglcheck import StringData
+        >>> sd = StringData.from_columns(['abc', 'acb', 'bca'],
+        ...                              stringlabels=['E1', 'E2', 'T1'],
+        ...                              categories=['Exp', 'Exp', 'Test'])
+        >>> sd.stringcategories['Exp']
+        ['E1', 'E2']
+
+        """
+        strings = list(strings)
+        if stringlabels is None:
+            stringlabels = list(strings)
+        else:
+            stringlabels = list(stringlabels)
+            if len(stringlabels) != len(strings):
+                raise ValueError('stringlabels and strings should have the '
+                                 'same length')
+        stringcategories = {} if stringcategories is None \
+            else dict(stringcategories)
+        if categories is not None:
+            categories = list(categories)
+            if len(categories) != len(strings):
+                raise ValueError('categories and strings should have the '
+                                 'same length')
+            grouped = {}
+            for label, category in zip(stringlabels, categories):
+                # NaN is not equal to itself
+                if category is None or category != category:
+                    continue
+                grouped.setdefault(str(category), []).append(label)
+            for category, labels in grouped.items():
+                stringcategories.setdefault(category, []).extend(labels)
+        stringdata = cls.__new__(cls)
+        stringdata._setup(stringlabels, strings,
+                          stringcategories=stringcategories, **kwargs)
+        return stringdata
+
+    @classmethod
+    def from_dataframe(cls, dataframe, stringcolumn='string',
+                       labelcolumn=None, categorycolumn=None, **kwargs):
+        """
+        Returns a StringData instance from a pandas DataFrame with a column
+        of strings and optionally columns with labels and categories. See
+        `from_columns` for the other parameters.
 
         """
-        return [si if isinstance(si, dict) else {si: si}
-                for si in strings]
+        strings = dataframe[stringcolumn].astype(str).tolist()
+        stringlabels = None if labelcolumn is None \
+            else dataframe[labelcolumn].astype(str).tolist()
+        categories = None if categorycolumn is None \
+            else dataframe[categorycolumn].tolist()
+        return cls.from_columns(strings, stringlabels=stringlabels,
+                                categories=categories, **kwargs)
+
+    @classmethod
+    def from_csv(cls, filename, stringcolumn='string', labelcolumn=None,
+                 categorycolumn=None, delimiter=None, **kwargs):
+        """
+        Returns a StringData instance from a CSV or TSV file with a header
+        row, which names its columns. The delimiter is a tab for files
+        ending in '.tsv' or '.tab' and a comma otherwise, unless
+        `delimiter` is given. See `from_columns` for the other parameters.
+
+        """
+        if delimiter is None:
+            istab = filename.lower().endswith(('.tsv', '.tab'))
+            delimiter = '\t' if istab else ','
+        with open(filename, 'r', newline='') as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader)
+            columns = [stringcolumn, labelcolumn, categorycolumn]
+            indices = [None if c is None else header.index(c)
+                       for c in columns]
+            rows = [row for row in reader if row]
+        values = [None if i is None else [row[i] for row in rows]
+                  for i in indices]
+        del rows
+        if values[2] is not None:
+            # empty cells mean no category
+            values[2] = [c if c != '' else None for c in values[2]]
+        strings, stringlabels, categories = values
+        return cls.from_columns(strings, stringlabels=stringlabels,
+                                categories=categories, **kwargs)
+
+    @classmethod
+    def from_arrow(cls, table, stringcolumn='string', labelcolumn=None,
+                   categorycolumn=None, **kwargs):
+        """
+        Returns a StringData instance from a pyarrow Table, or from the
+        name of a Parquet or Arrow IPC (Feather) file. See `from_columns`
+        for the other parameters.
+
+        """
+        if isinstance(table, str):
+            if table.lower().endswith('.parquet'):
+                import pyarrow.parquet as pq
+                table = pq.read_table(table)
+            else:
+                import pyarrow.feather as feather
+                table = feather.read_table(table)
+        strings = [str(s) for s in table.column(stringcolumn).to_pylist()]
+        stringlabels = None if labelcolumn is None \
+            else [str(l) for l in table.column(labelcolumn).to_pylist()]
+        categories = None if categorycolumn is None \
+            else table.column(categorycolumn).to_pylist()
+        return cls.from_columns(strings, stringlabels=stringlabels,
+                                categories=categories, **kwargs)
 
     def __str__(self):
         stringlabels = self.stringcategories['All']
@@ -61,16 +488,93 @@ class StringData(object):
     __repr__ = __str__
 
 
-def read_stringdata(filename):
+def read_stringdata(filename, cache=False):
     """Returns a dictionary with at least a 'strings' key. In addition it may
     contain a 'readingframe' key, a 'comparisons' key and a 'categories' key,
     and anything you defined in that file.
 
-    """
+    The file is parsed with the C-accelerated safe YAML loader when PyYAML
+    was built with it. If `cache` is True, the parsed contents are also
+    stored in a sidecar file with the extension '.aglcache' next to the
+    YAML file, from which they are read as long as the YAML file has not
+    changed (same modification time and size, or otherwise the same
+    contents).
 
-    with open(filename, 'r') as f:
-        d = yaml.load(f)
+    """
+    if cache:
+        d = _read_aglcache(filename)
+    else:
+        d = _read_yaml(filename)
     if 'strings' not in d:
         raise ValueError("No 'strings' entry found")
     return StringData(**d)
 
+
+def _read_yaml(filename):
+    with open(filename, 'r') as f:
+        return yaml.load(f, Loader=_SafeLoader)
+
+
+def _filedigest(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(2 ** 20), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def _read_aglcache(filename):
+    """
+    Returns the parsed contents of YAML file `filename` from its '.aglcache'
+    sidecar file if that is up to date, and parses the file and (re)writes
+    the sidecar otherwise. The sidecar is a JSON object with the
+    modification time, size and SHA-1 digest of the YAML file, and its
+    contents. Contents that JSON cannot represent exactly (e.g. labels that
+    are not strings) are not cached.
+
+    """
+    cachefilename = filename + '.aglcache'
+    stat = os.stat(filename)
+    sidecar = None
+    if os.path.exists(cachefilename):
+        try:
+            with open(cachefilename, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            sidecar = None
+        if not (isinstance(sidecar, dict) and 'data' in sidecar):
+            sidecar = None
+    if sidecar is not None and sidecar.get('size') == stat.st_size:
+        if sidecar.get('mtime') == stat.st_mtime_ns:
+            return sidecar['data']
+        digest = _filedigest(filename)
+        if sidecar.get('sha1') == digest:
+            sidecar['mtime'] = stat.st_mtime_ns
+            _write_aglcache(cachefilename, sidecar)
+            return sidecar['data']
+    else:
+        digest = _filedigest(filename)
+    data = _read_yaml(filename)
+    sidecar = {'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+               'sha1': digest, 'data': data}
+    try:
+        cacheable = json.loads(json.dumps(data)) == data
+    except (TypeError, ValueError):
+        cacheable = False
+    if cacheable:
+        _write_aglcache(cachefilename, sidecar)
+    return data
+
+
+def _write_aglcache(cachefilename, sidecar):
+    # written to a temporary file first, so that an interrupted write does
+    # not leave a corrupt sidecar; a sidecar that cannot be written (e.g. in
+    # a read-only directory) is skipped
+    tempfilename = '{}.{}.tmp'.format(cachefilename, os.getpid())
+    try:
+        with open(tempfilename, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f, ensure_ascii=False)
+        os.replace(tempfilename, cachefilename)
+    except OSError:
+        if os.path.exists(tempfilename):
+            os.remove(tempfilename)
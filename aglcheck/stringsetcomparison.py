@@ -1,54 +1,117 @@
 import inspect
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
 from . import stringcomparison as alg
+from . import ngramindex
 
-__all__ = ['availableanalysisfunctions', 'crosscorrelationmax',
+__all__ = ['analyze_many', 'availableanalysisfunctions', 'metricproperties',
+           'crosscorrelationmax',
            'sharedlengthnsubstringcount', 'longestsharedsubstringlength',
            'longestsharedsubstringduration', 'novellengthnsubstringcount',
            'commonstartduration', 'commonstartlength', 'issubstring', 'issame',
            'samestart', 'levenshtein']
 
 
+def _identity(item):
+    return item
+
+
 class ComparisonMatrix(object):
+    """
+    Outcomes of comparing every string of one category with every string of
+    another category.
+
+    Scalar outcomes (counts, lengths, durations, booleans) are stored in a
+    dense NumPy array, `values`, with rows corresponding to `xstringlabels`
+    and columns to `ystringlabels`. Other outcomes, such as lists of matches,
+    are stored in `resultsdict`, a nested dictionary (resultsdict[xl][yl])
+    from which the matrix values are obtained with `dataaccessfunc`.
+
+    """
+
     def __init__(self, resultsdict, dataaccessfunc,
-                 stringdata, comparison, name, title=None):
+                 stringdata, comparison, name, title=None, values=None):
 
-        self.resultsdict = resultsdict
-        self.dataaccessfunc = dataaccessfunc
         self.stringdata = stringdata
         self.comparison = comparison
         self.name = name
         self.title = title
         self.xstringlabels = stringdata.stringcategories[comparison[0]]
         self.ystringlabels = stringdata.stringcategories[comparison[1]]
+        self.xstringindex = {l: i for i, l in enumerate(self.xstringlabels)}
+        self.ystringindex = {l: i for i, l in enumerate(self.ystringlabels)}
+        if values is not None:
+            values = np.asarray(values)
+            values.flags.writeable = False
+            dataaccessfunc = _identity
+        self.values = values
+        self.dataaccessfunc = dataaccessfunc
+        self._resultsdict = resultsdict
+        self._matrix = values
 
     def __str__(self):
         pass
 
     __repr__ = __str__
 
-    def get_matrix(self):
+    @property
+    def resultsdict(self):
+        if self._resultsdict is None and self.values is not None:
+            self._resultsdict = {
+                xl: dict(zip(self.ystringlabels, row))
+                for xl, row in zip(self.xstringlabels, self.values.tolist())}
+        return self._resultsdict
+
+    @resultsdict.setter
+    def resultsdict(self, resultsdict):
+        self._resultsdict = resultsdict
+        self.values = self._matrix = None
+
+    def get_value(self, xstringlabel, ystringlabel):
+        """Returns the matrix value for one pair of string labels."""
+        if self.values is not None:
+            return self.values[self.xstringindex[xstringlabel],
+                               self.ystringindex[ystringlabel]]
+        return self.dataaccessfunc(
+            self.resultsdict[xstringlabel][ystringlabel])
 
-        matrix = []
-        for xl in self.xstringlabels:
-            cols = []
-            for yl in self.ystringlabels:
-                result = self.dataaccessfunc(self.resultsdict[xl][yl])
-                cols.append(result)
-            matrix.append(cols)
-        return matrix
+    def get_matrix(self):
+        """
+        Returns the matrix values, with rows corresponding to xstringlabels
+        and columns to ystringlabels. For scalar outcomes this is a read-only
+        NumPy array, otherwise a list of lists. The matrix is computed once
+        and cached.
+
+        """
+        if self._matrix is None:
+            matrix = []
+            for xl in self.xstringlabels:
+                cols = []
+                for yl in self.ystringlabels:
+                    result = self.dataaccessfunc(self.resultsdict[xl][yl])
+                    cols.append(result)
+                matrix.append(cols)
+            self._matrix = matrix
+        return self._matrix
 
     def get_pandasseries(self, name=None):
         import pandas as pd
         if name is None:
             name = self.name
         indextuples = []
-        values = []
         c0 = self.comparison[0]
         c1 = self.comparison[1]
         for l0 in self.xstringlabels:
             for l1 in self.ystringlabels:
                 indextuples.append((c0, c1, l0, l1))
-                values.append(self.dataaccessfunc(self.resultsdict[l0][l1]))
+        if self.values is not None:
+            values = self.values.ravel()
+        else:
+            values = [v for row in self.get_matrix() for v in row]
         # names = ['subgroups_{}'.format(c)
         #          for c, s in self.stringdata.stringcategories.items()]
         # names.extend(['strings_{}'.format(l)
@@ -58,8 +121,61 @@ class ComparisonMatrix(object):
         return pd.Series(values, index=index, name=name)
 
 
+def _analyzepairs(analysisf, pairs, readingframe):
+    """
+    Applies analysisf to a chunk of string pairs. This is what runs in the
+    worker processes of a parallel analysis.
+
+    """
+    return [analysisf(s0, s1, readingframe=readingframe) for s0, s1 in pairs]
+
+
+def _analyzeblock(batchf, readingframe, block):
+    """
+    Applies batchf to a block, i.e. a two-tuple with a list of strings from
+    the first set and a list of strings from the second set.
+
+    """
+    strings0, strings1 = block
+    return batchf(strings0, strings1, readingframe=readingframe)
+
+
+def _mapchunks(f, chunks, n_jobs=1, executor=None):
+    """
+    Maps f over chunks, serially, in the given executor, or in a process pool
+    with n_jobs workers. Returns an iterator over the results in chunk order.
+
+    """
+    if executor is not None:
+        return executor.map(f, chunks)
+    elif n_jobs == 1:
+        return map(f, chunks)
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(f, chunks))
+
+
+def _comparisonstringdict(stringdata, comparison):
+    """
+    Returns a dictionary with the strings of the categories in `comparison`,
+    by label. The strings of a compact StringData are decoded here once,
+    rather than for every pair in which they occur.
+
+    """
+    stringdict = stringdata.stringdict
+    strings = {}
+    for c in comparison:
+        for l in stringdata.stringcategories[c]:
+            if l not in strings:
+                strings[l] = stringdict[l]
+    return strings
+
+
 def _analyze_stringbystring(stringdata, analysisf, dataaccessf,
-                            title=None, comparison=('All', 'All')):
+                            title=None, comparison=('All', 'All'),
+                            batchf=None, n_jobs=1, executor=None,
+                            chunksize=None, symmetric=False, diagonal=None,
+                            dtype=None, cache=None, cachekey=None,
+                            stringdict=None):
     """
     Private function that takes string data sets, applies an analysis function
     to each string from the first set in `comparison` with each string from 
@@ -81,6 +197,48 @@ def _analyze_stringbystring(stringdata, analysisf, dataaccessf,
     dataaccessf : a function
     title
     comparison
+    batchf : a function, optional
+        Computes the outcomes of analysisf for all pairs at once. It takes a
+        list of strings from the first set, a list of strings from the second
+        set, and readingframe, and returns a 2D array with outcomes. If
+        given, it is used instead of calling analysisf for every pair.
+    n_jobs : int, default 1
+        Number of worker processes over which the pairs are distributed. 1
+        means no parallel processing, -1 means one worker per CPU. In
+        parallel analyses analysisf (or batchf) has to be picklable, so it
+        should be a module-level function or a functools.partial of one.
+    executor : concurrent.futures.Executor, optional
+        Executor to distribute the pairs over, instead of a process pool
+        that is created for this analysis.
+    chunksize : int, optional
+        Number of pairs (or, with batchf, of strings from the first set) per
+        task in parallel analyses. By default the work is split in about
+        four chunks per worker, to amortize inter-process communication.
+    symmetric : bool, default False
+        Whether analysisf gives the same outcome for (s1, s2) as for (s2, s1).
+        If so, pairs that occur in both orders are analyzed only once. See
+        `metricproperties`.
+    diagonal : a function, optional
+        Gives the outcome of comparing a string with itself. It takes a
+        string and readingframe. If given, it is used instead of analysisf
+        for pairs of a string with itself. See `metricproperties`.
+    dtype : NumPy dtype, optional
+        If given, the outcomes are scalars and dataaccessf is applied to them
+        right away, and the resulting values are stored in a dense array of
+        this dtype instead of in a nested dictionary. With batchf, batchf
+        should then return these values directly.
+    cache : resultcache.ResultCache, optional
+        Persistent cache from which outcomes of pairs that were analyzed
+        before are read, and to which new outcomes are written. With a
+        cache, pairs are always analyzed with analysisf, not with batchf.
+    cachekey : optional
+        Identifies the analysis and its parameters in the cache, e.g.
+        ('sharedlengthnsubstringcount', {'n': 2}). Required if `cache` is
+        given.
+    stringdict : dict, optional
+        The strings of the categories in `comparison`, by label, as returned
+        by `_comparisonstringdict`. Can be given when they were already
+        looked up for the analysis, e.g. for `_durationparams`.
 
     Returns
     -------
@@ -91,66 +249,268 @@ def _analyze_stringbystring(stringdata, analysisf, dataaccessf,
     callingfname = inspect.stack()[1][3]
     stringcategory0 = stringdata.stringcategories[comparison[0]]
     stringcategory1 = stringdata.stringcategories[comparison[1]]
+    if stringdict is None:
+        stringdict = _comparisonstringdict(stringdata, comparison)
     rf = stringdata.readingframe
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if executor is not None:
+        nworkers = os.cpu_count() or 1
+    else:
+        nworkers = n_jobs
+    if cache is not None and cachekey is None:
+        raise ValueError('a cachekey is needed to use a cache')
     results = {}
-    for s0label in stringcategory0:
-        results[s0label] = {}
-        for s1label in stringcategory1:
-            s0 = stringdata.stringdict[s0label]
-            s1 = stringdata.stringdict[s1label]
-            results[s0label][s1label] = analysisf(s0, s1, readingframe=rf)
+    values = None
+    if batchf is not None and cache is None:
+        strings0 = [stringdict[l] for l in stringcategory0]
+        strings1 = [stringdict[l] for l in stringcategory1]
+        # with a symmetric analysis of a set against itself, only blocks on
+        # and above the diagonal are computed and mirrored
+        mirror = symmetric and list(stringcategory0) == list(stringcategory1)
+        if chunksize is None:
+            nchunks = 4 * nworkers if nworkers > 1 else (8 if mirror else 1)
+            chunksize = max(1, -(-len(strings0) // nchunks))
+        starts = range(0, len(strings0), chunksize)
+        if mirror:
+            blocks = [(strings0[i:i + chunksize], strings1[i:])
+                      for i in starts]
+        else:
+            blocks = [(strings0[i:i + chunksize], strings1) for i in starts]
+        f = partial(_analyzeblock, batchf, rf)
+        outcomes = None
+        for i, block in zip(starts, _mapchunks(f, blocks, n_jobs=n_jobs,
+                                                executor=executor)):
+            if outcomes is None:
+                outcomes = np.empty((len(strings0), len(strings1)),
+                                    dtype=block.dtype)
+            if mirror:
+                outcomes[i:i + chunksize, i:] = block
+                outcomes[i:, i:i + chunksize] = block.T
+            else:
+                outcomes[i:i + chunksize] = block
+        if dtype is not None:
+            if outcomes is None:
+                values = np.zeros((len(strings0), len(strings1)), dtype=dtype)
+            else:
+                values = outcomes.astype(dtype, copy=False)
+            results = None
+        elif outcomes is not None:
+            for s0label, row in zip(stringcategory0, outcomes.tolist()):
+                results[s0label] = dict(zip(stringcategory1, row))
+    else:
+        pairs = []
+        scheduled = set()
+        for s0label in stringcategory0:
+            for s1label in stringcategory1:
+                if diagonal is not None and s0label == s1label:
+                    continue
+                if symmetric:
+                    if (s1label, s0label) in scheduled:
+                        continue
+                    scheduled.add((s0label, s1label))
+                pairs.append((s0label, s1label))
+        if cache is not None:
+            keys = [cache.makekey(stringdict[s0label], stringdict[s1label],
+                                  cachekey, rf)
+                    for s0label, s1label in pairs]
+            cached = cache.get_many(keys)
+            computed = {pair: cached[key] for pair, key in zip(pairs, keys)
+                        if key in cached}
+            keys = [key for key in keys if key not in cached]
+            pairs = [pair for pair in pairs if pair not in computed]
+        else:
+            computed = {}
+        if chunksize is None:
+            chunksize = max(1, -(-len(pairs) // (4 * nworkers)))
+        chunks = [[(stringdict[s0label], stringdict[s1label])
+                   for s0label, s1label in pairs[i:i + chunksize]]
+                  for i in range(0, len(pairs), chunksize)]
+        f = partial(_analyzepairs, analysisf, readingframe=rf)
+        outcomes = (outcome for chunkoutcomes in
+                    _mapchunks(f, chunks, n_jobs=n_jobs, executor=executor)
+                    for outcome in chunkoutcomes)
+        if dtype is not None:
+            outcomes = map(dataaccessf, outcomes)
+        outcomes = list(outcomes)
+        computed.update(zip(pairs, outcomes))
+        if cache is not None:
+            cache.set_many(zip(keys, outcomes))
+        for s0label in stringcategory0:
+            results[s0label] = row = {}
+            for s1label in stringcategory1:
+                if diagonal is not None and s0label == s1label:
+                    outcome = diagonal(stringdict[s0label], readingframe=rf)
+                    if dtype is not None:
+                        outcome = dataaccessf(outcome)
+                    row[s1label] = outcome
+                elif (s0label, s1label) in computed:
+                    row[s1label] = computed[(s0label, s1label)]
+                else:
+                    row[s1label] = computed[(s1label, s0label)]
+        if dtype is not None:
+            values = np.array([[results[s0label][s1label]
+                                for s1label in stringcategory1]
+                               for s0label in stringcategory0], dtype=dtype)
+            values = values.reshape(len(stringcategory0),
+                                    len(stringcategory1))
+            results = None
     return ComparisonMatrix(resultsdict=results,
                             dataaccessfunc=dataaccessf,
                             stringdata=stringdata,
                             comparison=comparison,
                             name=callingfname,
-                            title=title)
+                            title=title,
+                            values=values)
+
+
+def _ntokens(s, readingframe):
+    return len(s) // readingframe
+
+
+def _true(s, readingframe):
+    return True
+
+
+def _zero(s, readingframe):
+    return 0
+
+
+# Properties of the analyses that the metric functions below perform, which
+# allow _analyze_stringbystring to skip work and to store outcomes
+# compactly. 'symmetric' means that comparing s1 with s2 has the same value
+# as comparing s2 with s1, 'diagonal' (if not None) is a function of a
+# string and readingframe that gives the outcome of comparing a string with
+# itself, and 'dtype' is the type of the (scalar) values.
+metricproperties = {
+    'crosscorrelationmax': {'symmetric': True, 'diagonal': _ntokens,
+                            'dtype': np.int64},
+    # the matches are listed from the point of view of s1, but their number
+    # does not depend on argument order
+    'sharedlengthnsubstringcount': {'symmetric': True, 'diagonal': None,
+                                    'dtype': np.int64},
+    'longestsharedsubstringlength': {'symmetric': True,
+                                     'diagonal': _ntokens, 'dtype': np.int64},
+    'longestsharedsubstringduration': {'symmetric': True, 'diagonal': None,
+                                       'dtype': np.float64},
+    'novellengthnsubstringcount': {'symmetric': False, 'diagonal': None,
+                                   'dtype': np.int64},
+    'commonstartduration': {'symmetric': True, 'diagonal': None,
+                            'dtype': np.float64},
+    'commonstartlength': {'symmetric': True, 'diagonal': _ntokens,
+                          'dtype': np.int64},
+    'issubstring': {'symmetric': False, 'diagonal': _true, 'dtype': np.bool_},
+    'issame': {'symmetric': True, 'diagonal': _true, 'dtype': np.bool_},
+    'samestart': {'symmetric': True, 'diagonal': _true, 'dtype': np.bool_},
+    'levenshtein': {'symmetric': True, 'diagonal': _zero, 'dtype': np.int64}
+}
 
 
-def longestsharedsubstringlength(stringdata, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe):
-        items = alg.longestsharedsubstrings(s1, s2, readingframe=readingframe)
-        if items:
-            return int(len(items[0][0]) / readingframe)
-        else:
-            return 0
+_titles = {
+    'longestsharedsubstringlength': 'Length longest shared substring',
+    'longestsharedsubstringduration': 'Duration longest shared substring',
+    'crosscorrelationmax': 'Maximum crosscorrelation',
+    'sharedlengthnsubstringcount': 'Number of {n}-length shared substrings',
+    'novellengthnsubstringcount': 'Number of novel {n}-length substrings',
+    'commonstartlength': 'Length of shared start substring',
+    'commonstartduration': 'Duration of shared start substring',
+    'issame': 'Identical strings',
+    'issubstring': 'Is substring',
+    'samestart': 'Has same {n}-length substring start',
+    'levenshtein': 'Levenshtein distance'
+}
+
+
+# The analysis functions below are defined at module level (and
+# parametrized with functools.partial) so that they can be pickled and sent
+# to worker processes in parallel analyses.
+
+def _longestsharedsubstringlength(s1, s2, readingframe):
+    items = alg.longestsharedsubstrings(s1, s2, readingframe=readingframe)
+    if items:
+        return int(len(items[0][0]) / readingframe)
+    else:
+        return 0
+
+
+def _novellengthnsubstrings(s1, s2, n, readingframe):
+    return alg.novellengthnsubstrings(s2, s1, n, readingframe)
+
+
+def _issame(s1, s2, readingframe):
+    return s1 == s2
+
+
+def longestsharedsubstringlength(stringdata, comparison=('All', 'All'),
+                                 n_jobs=1, executor=None, cache=None):
+    analysisf = _longestsharedsubstringlength
 
     def dataaccessfunc(count):
         return count
 
-    title = 'Length longest shared substring'
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['longestsharedsubstringlength']
+    cachekey = ('longestsharedsubstringlength', {})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, n_jobs=n_jobs, executor=executor, cache=cache,
+        cachekey=cachekey, **metricproperties['longestsharedsubstringlength'])
 
 
-def longestsharedsubstringduration(stringdata, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe):
-        return alg.longestsharedsubstringduration(s1, s2,
-                                                  tokendurations=stringdata.tokendurations,
-                                                  isiduration=stringdata.isiduration,
-                                                  readingframe=readingframe)
+def _durationparams(stringdata, stringdict):
+    """
+    Returns the keyword arguments of the duration algorithms for stringdata,
+    including the cumulative durations of the strings in `stringdict` (see
+    `_comparisonstringdict`), by string.
+
+    """
+    cumdurations = {}
+    for l, s in stringdict.items():
+        c = stringdata.cumulativedurations.get(l)
+        if c is not None:
+            cumdurations[s] = c
+    return {'tokendurations': stringdata.tokendurations,
+            'isiduration': stringdata.isiduration,
+            'cumdurations': cumdurations}
+
+
+def longestsharedsubstringduration(stringdata, comparison=('All', 'All'),
+                                   n_jobs=1, executor=None, cache=None):
+    stringdict = _comparisonstringdict(stringdata, comparison)
+    analysisf = partial(alg.longestsharedsubstringduration,
+                        **_durationparams(stringdata, stringdict))
 
     def dataaccessfunc(duration):
         return duration
 
-    title = 'Duration longest shared substring'
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['longestsharedsubstringduration']
+    cachekey = ('longestsharedsubstringduration',
+                {'tokendurations': stringdata.tokendurations,
+                 'isiduration': stringdata.isiduration})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, n_jobs=n_jobs, executor=executor, cache=cache,
+        cachekey=cachekey, stringdict=stringdict,
+        **metricproperties['longestsharedsubstringduration'])
 
 
-def crosscorrelationmax(stringdata, comparison=('All', 'All')):
+def crosscorrelationmax(stringdata, comparison=('All', 'All'), n_jobs=1,
+                        executor=None, cache=None):
     analysisf = alg.crosscorrelationmax
 
     def dataaccessfunc(m): return m
 
-    title = 'Maximum crosscorrelation'
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['crosscorrelationmax']
+    cachekey = ('crosscorrelationmax', {})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, n_jobs=n_jobs, executor=executor, cache=cache,
+        cachekey=cachekey, **metricproperties['crosscorrelationmax'])
 
 
-def sharedlengthnsubstringcount(stringdata, n, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe):
-        return alg.sharedlengthnsubstrings(s1, s2, n, readingframe)
+def sharedlengthnsubstringcount(stringdata, n, comparison=('All', 'All'),
+                                n_jobs=1, executor=None, cache=None):
+    analysisf = partial(alg.sharedlengthnsubstrings, n=n)
+    batchf = partial(ngramindex.sharedlengthnsubstringcount_matrix, n=n)
 
     def dataaccessfunc(item):
         if item != ():
@@ -158,14 +518,19 @@ def sharedlengthnsubstringcount(stringdata, n, comparison=('All', 'All')):
         else:
             return 0
 
-    title = 'Number of {}-length shared substrings'.format(n)
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['sharedlengthnsubstringcount'].format(n=n)
+    cachekey = ('sharedlengthnsubstringcount', {'n': n})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, batchf=batchf, n_jobs=n_jobs,
+        executor=executor, cache=cache, cachekey=cachekey,
+        **metricproperties['sharedlengthnsubstringcount'])
 
 
-def novellengthnsubstringcount(stringdata, n, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe):
-        return alg.novellengthnsubstrings(s2, s1, n, readingframe)
+def novellengthnsubstringcount(stringdata, n, comparison=('All', 'All'),
+                               n_jobs=1, executor=None, cache=None):
+    analysisf = partial(_novellengthnsubstrings, n=n)
+    batchf = partial(ngramindex.novellengthnsubstringcount_matrix, n=n)
 
     def dataaccessfunc(item):
         if item != ():
@@ -173,75 +538,106 @@ def novellengthnsubstringcount(stringdata, n, comparison=('All', 'All')):
         else:
             return 0
 
-    title = 'Number of novel {}-length substrings'.format(n)
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['novellengthnsubstringcount'].format(n=n)
+    cachekey = ('novellengthnsubstringcount', {'n': n})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, batchf=batchf, n_jobs=n_jobs,
+        executor=executor, cache=cache, cachekey=cachekey,
+        **metricproperties['novellengthnsubstringcount'])
 
 
-def commonstartlength(stringdata, comparison=('All', 'All')):
+def commonstartlength(stringdata, comparison=('All', 'All'), n_jobs=1,
+                      executor=None, cache=None):
     analysisf = alg.commonstartlength
+    batchf = alg.commonstartlength_matrix
 
     def dataaccessfunc(item): return item
 
-    title = "Length of shared start substring"
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['commonstartlength']
+    cachekey = ('commonstartlength', {})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, batchf=batchf, n_jobs=n_jobs,
+        executor=executor, cache=cache, cachekey=cachekey,
+        **metricproperties['commonstartlength'])
 
 
-def commonstartduration(stringdata, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe):
-        return alg.commonstartduration(s1, s2,
-                                       tokendurations=stringdata.tokendurations,
-                                       isiduration=stringdata.isiduration,
-                                       readingframe=readingframe)
+def commonstartduration(stringdata, comparison=('All', 'All'), n_jobs=1,
+                        executor=None, cache=None):
+    stringdict = _comparisonstringdict(stringdata, comparison)
+    params = _durationparams(stringdata, stringdict)
+    analysisf = partial(alg.commonstartduration, **params)
+    batchf = partial(alg.commonstartduration_matrix, **params)
 
     def dataaccessfunc(duration): return duration
 
-    title = 'Duration of shared start substring'
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['commonstartduration']
+    cachekey = ('commonstartduration',
+                {'tokendurations': stringdata.tokendurations,
+                 'isiduration': stringdata.isiduration})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, batchf=batchf, n_jobs=n_jobs,
+        executor=executor, cache=cache, cachekey=cachekey,
+        stringdict=stringdict, **metricproperties['commonstartduration'])
 
 
-def issame(stringdata, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe): return s1 == s2
+def issame(stringdata, comparison=('All', 'All'), n_jobs=1, executor=None,
+           cache=None):
+    analysisf = _issame
 
     def dataaccessfunc(item): return item
 
-    title = 'Identical strings'
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['issame']
+    cachekey = ('issame', {})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, n_jobs=n_jobs, executor=executor, cache=cache,
+        cachekey=cachekey, **metricproperties['issame'])
 
 
-def issubstring(stringdata, comparison=('All', 'All')):
+def issubstring(stringdata, comparison=('All', 'All'), n_jobs=1,
+                executor=None, cache=None):
     analysisf = alg.issubstring
 
     def dataaccessfunc(item): return item
 
-    title = 'Is substring'
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title=title, comparison=comparison)
+    title = _titles['issubstring']
+    cachekey = ('issubstring', {})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title=title,
+        comparison=comparison, n_jobs=n_jobs, executor=executor, cache=cache,
+        cachekey=cachekey, **metricproperties['issubstring'])
 
 
-def samestart(stringdata, n, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe):
-        return alg.samestart(s1, s2, n, readingframe)
+def samestart(stringdata, n, comparison=('All', 'All'), n_jobs=1,
+              executor=None, cache=None):
+    analysisf = partial(alg.samestart, n=n)
 
     def dataaccessfunc(item): return item
 
-    title = 'Has same {}-length substring start'.format(n)
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title, comparison=comparison)
+    title = _titles['samestart'].format(n=n)
+    cachekey = ('samestart', {'n': n})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title,
+        comparison=comparison, n_jobs=n_jobs, executor=executor, cache=cache,
+        cachekey=cachekey, **metricproperties['samestart'])
 
 
-def levenshtein(stringdata, comparison=('All', 'All')):
-    def analysisf(s1, s2, readingframe):
-        return alg.levenshtein(s1, s2, readingframe)
+def levenshtein(stringdata, comparison=('All', 'All'), max_distance=None,
+                n_jobs=1, executor=None, cache=None):
+    analysisf = partial(alg.levenshtein, max_distance=max_distance)
+    batchf = partial(alg.levenshtein_matrix, max_distance=max_distance)
 
     def dataaccessfunc(item): return item
 
-    title = 'Levenshtein distance'
-    return _analyze_stringbystring(stringdata, analysisf, dataaccessfunc,
-                                   title, comparison=comparison)
+    title = _titles['levenshtein']
+    cachekey = ('levenshtein', {'max_distance': max_distance})
+    return _analyze_stringbystring(
+        stringdata, analysisf, dataaccessfunc, title, comparison=comparison,
+        batchf=batchf, n_jobs=n_jobs, executor=executor, cache=cache,
+        cachekey=cachekey, **metricproperties['levenshtein'])
 
 
 availableanalysisfunctions = {
@@ -257,3 +653,281 @@ availableanalysisfunctions = {
     'samestart': samestart,
     'levenshtein': levenshtein
 }
+
+
+class _StringPair(object):
+    """
+    Two strings that are compared with several metrics at once (see
+    `analyze_many`). Intermediate results that more than one metric needs,
+    such as token arrays and longest shared substrings, are computed once,
+    when first needed.
+
+    """
+
+    def __init__(self, s1, s2, readingframe):
+        self.s1 = s1
+        self.s2 = s2
+        self.readingframe = readingframe
+        self._intermediates = {}
+
+    def _intermediate(self, key, f, *args):
+        if key not in self._intermediates:
+            self._intermediates[key] = f(*args)
+        return self._intermediates[key]
+
+    def _tokenarrays(self):
+        alg._checkpositiveint(self.readingframe)
+        alg._checkstring(self.s1, readingframe=self.readingframe)
+        alg._checkstring(self.s2, readingframe=self.readingframe)
+        return alg._tokenarrays(self.s1, self.s2,
+                                readingframe=self.readingframe)
+
+    def tokenarrays(self):
+        return self._intermediate('tokenarrays', self._tokenarrays)
+
+    def longestsharedsubstrings(self):
+        return self._intermediate('longestsharedsubstrings',
+                                  alg.longestsharedsubstrings, self.s1,
+                                  self.s2, self.readingframe)
+
+
+# Functions that derive the value of a metric for a _StringPair. Their
+# keyword arguments are the parameters of the metric.
+
+def _pair_crosscorrelationmax(pair):
+    a1, a2 = pair.tokenarrays()
+    k, l, lags = alg._crosscorrelationmatches(a1, a2)
+    return int(np.bincount(lags, minlength=len(a1) + len(a2) - 1).max())
+
+
+def _pair_longestsharedsubstringlength(pair):
+    items = pair.longestsharedsubstrings()
+    if items:
+        return len(items[0][0]) // pair.readingframe
+    return 0
+
+
+def _pair_longestsharedsubstringduration(pair, tokendurations, isiduration,
+                                         cumdurations=None):
+    return alg._matchesduration(pair.s1, pair.longestsharedsubstrings(),
+                                tokendurations=tokendurations,
+                                isiduration=isiduration,
+                                readingframe=pair.readingframe,
+                                cumdurations=cumdurations)
+
+
+def _pair_issubstring(pair):
+    return alg.issubstring(pair.s1, pair.s2)
+
+
+def _pair_issame(pair):
+    return pair.s1 == pair.s2
+
+
+def _pair_samestart(pair, n):
+    return alg.samestart(pair.s1, pair.s2, n, pair.readingframe)
+
+
+_pairmetrics = {
+    'crosscorrelationmax': _pair_crosscorrelationmax,
+    'longestsharedsubstringlength': _pair_longestsharedsubstringlength,
+    'longestsharedsubstringduration': _pair_longestsharedsubstringduration,
+    'issubstring': _pair_issubstring,
+    'issame': _pair_issame,
+    'samestart': _pair_samestart
+}
+
+# metrics that are computed for all pairs at once, and are therefore not
+# included in the shared pass over the pairs of analyze_many
+_batchfunctions = {
+    'commonstartduration': alg.commonstartduration_matrix,
+    'commonstartlength': alg.commonstartlength_matrix,
+    'levenshtein': alg.levenshtein_matrix,
+    'novellengthnsubstringcount':
+        ngramindex.novellengthnsubstringcount_matrix,
+    'sharedlengthnsubstringcount':
+        ngramindex.sharedlengthnsubstringcount_matrix
+}
+_batchmetrics = tuple(sorted(_batchfunctions))
+
+
+def _metricspec(metric):
+    """
+    Returns a two-tuple with the name and a (new) parameter dict of
+    `metric`, which is a metric name or such a two-tuple.
+
+    """
+    if isinstance(metric, str):
+        name, params = metric, {}
+    else:
+        name, params = metric
+        params = dict(params)
+    if name not in metricproperties:
+        raise ValueError('unknown metric "{}"'.format(name))
+    return name, params
+
+
+def _pairblock(strings0, strings1, readingframe, metric, dtype):
+    """
+    Returns an array with the values of `metric` (a name and parameters
+    from `_pairmetrics`) for every string in strings0 with every string in
+    strings1.
+
+    """
+    name, params = metric
+    pairmetric = _pairmetrics[name]
+    block = np.empty((len(strings0), len(strings1)), dtype=dtype)
+    for i, s0 in enumerate(strings0):
+        for j, s1 in enumerate(strings1):
+            block[i, j] = pairmetric(_StringPair(s0, s1, readingframe),
+                                     **params)
+    return block
+
+
+def _rowblock(blockf, strings1, readingframe, strings0):
+    return blockf(strings0, strings1, readingframe=readingframe)
+
+
+def _columnblockfunction(stringdata, metric, stringdict, strings1):
+    """
+    Returns a picklable function that takes a list of strings from
+    `stringdict` (see `_comparisonstringdict`) and returns the array of
+    values of `metric` for them with every string in strings1. For the
+    n-gram and common start metrics, the structures that only depend on
+    strings1 (an `ngramindex.NgramIndex`, the sorted strings) are built
+    here once, so that they are shared by all row blocks.
+
+    """
+    name, params = _metricspec(metric)
+    rf = stringdata.readingframe
+    if 'duration' in name:
+        params.update(_durationparams(stringdata, stringdict))
+    if name == 'sharedlengthnsubstringcount':
+        return ngramindex.NgramIndex(strings1, readingframe=rf,
+                                     **params).sharedcounts
+    elif name == 'novellengthnsubstringcount':
+        return ngramindex.NgramIndex(strings1, readingframe=rf,
+                                     **params).novelcounts
+    elif name == 'commonstartlength':
+        return partial(alg._commonstartlengths,
+                       alg._sortedstarts(strings1, rf), readingframe=rf)
+    elif name == 'commonstartduration':
+        return partial(alg._commonstartdurations,
+                       alg._sortedstarts(strings1, rf), readingframe=rf,
+                       **params)
+    elif name in _batchfunctions:
+        blockf = partial(_batchfunctions[name], **params)
+    else:
+        blockf = partial(_pairblock, metric=(name, params),
+                         dtype=metricproperties[name]['dtype'])
+    return partial(_rowblock, blockf, strings1, rf)
+
+
+def _analyzemany(s1, s2, readingframe, metrics):
+    pair = _StringPair(s1, s2, readingframe)
+    return tuple(_pairmetrics[name](pair, **params)
+                 for name, params in metrics)
+
+
+def _diagonalmany(s, readingframe, diagonals):
+    return tuple(diagonal(s, readingframe=readingframe)
+                 for diagonal in diagonals)
+
+
+def analyze_many(stringdata, metrics, comparison=('All', 'All'), n_jobs=1,
+                 executor=None, cache=None):
+    """
+    Computes several metrics in a single pass over the string pairs of
+    `comparison`. Intermediate results that several metrics share (token
+    arrays, longest shared substrings) are computed only once per pair.
+    Metrics that are computed for all pairs at once, such as 'levenshtein'
+    and the n-gram counts, are computed separately.
+
+    Parameters
+    ----------
+    stringdata : StringData
+    metrics : sequence
+        Names of metrics in `availableanalysisfunctions`, or two-tuples of
+        such a name and a dict with its parameters, e.g.
+        `('sharedlengthnsubstringcount', {'n': 2})`.
+    comparison : two-tuple of category names, default ('All', 'All')
+    n_jobs : int, default 1
+        Number of worker processes, see `_analyze_stringbystring`.
+    executor : concurrent.futures.Executor, optional
+        Executor to distribute the pairs over.
+    cache : ResultCache, optional
+        Persistent cache of pair outcomes, see `aglcheck.resultcache`.
+
+    Returns
+    -------
+    A list with a ComparisonMatrix instance for every metric, in the order
+    of `metrics`.
+
+    Examples
+    --------
+    >>> from aglcheck import StringData
+    >>> from aglcheck.stringsetcomparison import analyze_many
+    >>> sd = StringData(['abcab', 'cabd', 'dab'])
+    >>> lsslength, sscount = analyze_many(sd, ['longestsharedsubstringlength',
+    ...                                        ('sharedlengthnsubstringcount',
+    ...                                         {'n': 2})])
+    >>> lsslength.get_matrix()
+    array([[5, 3, 2],
+           [3, 4, 2],
+           [2, 2, 3]])
+    >>> sscount.get_matrix()
+    array([[6, 3, 2],
+           [3, 3, 1],
+           [2, 1, 2]])
+
+    """
+    specs = [_metricspec(metric) for metric in metrics]
+    results = [None] * len(specs)
+    pairspecs = []
+    for i, (name, params) in enumerate(specs):
+        if name in _batchmetrics:
+            results[i] = availableanalysisfunctions[name](
+                stringdata, comparison=comparison, n_jobs=n_jobs,
+                executor=executor, cache=cache, **params)
+        else:
+            if 'duration' in name:
+                params.update(tokendurations=stringdata.tokendurations,
+                              isiduration=stringdata.isiduration)
+            pairspecs.append((i, name, params))
+    # cumulative durations are passed along with the parameters, but are not
+    # part of the cache key
+    cachekey = ('analyze_many',
+                tuple((name, dict(params)) for i, name, params in pairspecs))
+    if pairspecs:
+        stringdict = _comparisonstringdict(stringdata, comparison)
+        for i, name, params in pairspecs:
+            if 'duration' in name:
+                params.update(_durationparams(stringdata, stringdict))
+        properties = [metricproperties[name] for i, name, params in pairspecs]
+        diagonals = [p['diagonal'] for p in properties]
+        if all(diagonal is not None for diagonal in diagonals):
+            diagonal = partial(_diagonalmany, diagonals=tuple(diagonals))
+        else:
+            diagonal = None
+        pairmetrics = tuple((name, params) for i, name, params in pairspecs)
+        analysisf = partial(_analyzemany, metrics=pairmetrics)
+        cm = _analyze_stringbystring(
+            stringdata, analysisf, _identity, comparison=comparison,
+            n_jobs=n_jobs, executor=executor, diagonal=diagonal,
+            symmetric=all(p['symmetric'] for p in properties), cache=cache,
+            cachekey=cachekey, stringdict=stringdict)
+        for k, (i, name, params) in enumerate(pairspecs):
+            values = np.array([[cm.resultsdict[xl][yl][k]
+                                for yl in cm.ystringlabels]
+                               for xl in cm.xstringlabels],
+                              dtype=properties[k]['dtype'])
+            values = values.reshape(len(cm.xstringlabels),
+                                    len(cm.ystringlabels))
+            results[i] = ComparisonMatrix(resultsdict=None,
+                                          dataaccessfunc=_identity,
+                                          stringdata=stringdata,
+                                          comparison=comparison,
+                                          name=name,
+                                          title=_titles[name].format(**params),
+                                          values=values)
+    return results
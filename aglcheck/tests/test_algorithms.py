@@ -1,7 +1,15 @@
 from unittest import TestCase
 
+import numpy as np
+
 from aglcheck.stringcomparison import sharedlengthnsubstrings, sharedsubstrings, \
-    longestsharedsubstrings, novellengthnsubstrings
+    longestsharedsubstrings, novellengthnsubstrings, levenshtein, \
+    levenshtein_matrix, crosscorrelate, crosscorrelationcounts, \
+    crosscorrelationmax, crosscorrelationmaxmatches, memoinfo, clearmemo, \
+    commonstart, commonstartlength, commonstartlength_matrix, \
+    commonstartduration, commonstartduration_matrix, cumulativedurations, \
+    longestsharedsubstringduration
+from aglcheck.tokenencoding import TokenEncoder
 
 class TestLengthnSubstrings(TestCase):
 
@@ -77,6 +85,14 @@ class TestLengthnSubstrings(TestCase):
         ss = sharedlengthnsubstrings(s1=s1, s2=s2, n=2, readingframe=1)
         self.assertEqual(ss, ((('de', ((1, 0), (1, 2),)),)))
 
+    def test_repeatedinboth(self):
+        s1 = "dede"
+        s2 = "fdedeg"
+        ss = sharedlengthnsubstrings(s1=s1, s2=s2, n=2, readingframe=1)
+        self.assertEqual(ss, (('de', ((0, 1), (0, 3))),
+                              ('ed', ((1, 2),)),
+                              ('de', ((2, 1), (2, 3)))))
+
     def test_readingframe2(self):
         s1 = "cdefgi"
         s2 = "abcdefgh"
@@ -109,6 +125,25 @@ class TestLongestSubstrings(TestCase):
         ss = longestsharedsubstrings(s1=s1, s2=s2, readingframe=1)
         self.assertEqual(ss, (('bcd', ((0, 1),)), ('abc', ((3, 0),))))
 
+    def test_noresult(self):
+        s1 = 'abc'
+        s2 = 'def'
+        ss = longestsharedsubstrings(s1=s1, s2=s2, readingframe=1)
+        self.assertEqual(ss, ())
+
+    def test_repeatedresult(self):
+        s1 = 'abxab'
+        s2 = 'cabcab'
+        ss = longestsharedsubstrings(s1=s1, s2=s2, readingframe=1)
+        self.assertEqual(ss, (('ab', ((0, 1), (0, 4))),
+                              ('ab', ((3, 1), (3, 4)))))
+
+    def test_readingframe2(self):
+        s1 = 'a1a2b1'
+        s2 = 'b1a1a2a1'
+        ss = longestsharedsubstrings(s1=s1, s2=s2, readingframe=2)
+        self.assertEqual(ss, (('a1a2', ((0, 1),)),))
+
 
 class TestNovelLengthnSubstrings(TestCase):
 
@@ -147,3 +182,164 @@ class TestNovelLengthnSubstrings(TestCase):
         s2 = 'abcdfeghij'
         ss = novellengthnsubstrings(s1, s2, n=2, readingframe=2)
         self.assertEqual(ss, (('cdef', 1), ('efgh', 2)))
+
+
+class TestLevenshtein(TestCase):
+
+    def test_result(self):
+        self.assertEqual(levenshtein('kitten', 'sitting'), 3)
+
+    def test_readingframe2(self):
+        s1 = 'cbcb'
+        s2 = 'bbcbcbca'
+        self.assertEqual(levenshtein(s1, s2, readingframe=2), 2)
+        self.assertEqual(levenshtein(s2, s1, readingframe=2), 2)
+
+    def test_maxdistance(self):
+        self.assertEqual(levenshtein('aaaa', 'bbbbbb', max_distance=2), 3)
+        self.assertEqual(levenshtein('aaaa', 'aaab', max_distance=2), 1)
+
+    def test_longstrings(self):
+        s1 = 'ab' * 50
+        s2 = 'ba' * 50
+        self.assertEqual(levenshtein(s1, s2), 2)
+
+    def test_matrix(self):
+        strings_a = ['kitten', 'ab' * 40, 'a']
+        strings_b = ['sitting', 'ba' * 40, 'abab']
+        matrix = levenshtein_matrix(strings_a, strings_b)
+        expected = [[levenshtein(sa, sb) for sb in strings_b]
+                    for sa in strings_a]
+        self.assertEqual(matrix.tolist(), expected)
+
+
+class TestCrosscorrelate(TestCase):
+
+    def test_counts(self):
+        ccf, ccs = crosscorrelate('abc', 'xbcab')
+        self.assertEqual(ccf.tolist(), [0, 0, 2, 0, 0, 2, 0])
+        self.assertEqual(ccs[2], ['', 'b', 'c'])
+        self.assertEqual(crosscorrelationcounts('abc', 'xbcab').tolist(),
+                         ccf.tolist())
+
+    def test_readingframe2(self):
+        ccf, ccs = crosscorrelate('a1b1', 'b1a1b1', readingframe=2)
+        self.assertEqual(ccf.tolist(), [1, 0, 2, 0])
+        self.assertEqual(ccs[2], ['a1', 'b1'])
+        self.assertEqual(crosscorrelationmax('a1b1', 'b1a1b1',
+                                             readingframe=2), 2)
+
+    def test_notfull(self):
+        ccf, ccs = crosscorrelate('bc', 'abcd', full=False)
+        self.assertEqual(ccf.tolist(), [0, 2, 0])
+        self.assertEqual(ccs, [['', ''], ['b', 'c'], ['', '']])
+
+    def test_maxmatches(self):
+        self.assertEqual(crosscorrelationmaxmatches('abc', 'xbcab'),
+                         [['', 'b', 'c'], ['a', 'b', '']])
+
+
+class TestTokenEncoder(TestCase):
+
+    def test_roundtrip(self):
+        te = TokenEncoder.from_strings(['a1a2', 'b1a1'], readingframe=2)
+        self.assertEqual(te.tokens, ['a1', 'a2', 'b1'])
+        self.assertEqual(te.encode('b1a2').tolist(), [2, 1])
+        self.assertEqual(te.decode(te.encode('b1a2')), 'b1a2')
+
+    def test_newtoken(self):
+        te = TokenEncoder(['a', 'b'])
+        self.assertEqual(te.encode('bca').tolist(), [1, 2, 0])
+        self.assertEqual(len(te), 3)
+
+
+class TestCommonStart(TestCase):
+
+    def test_commonstart(self):
+        self.assertEqual(commonstart('abcde', 'abcef'), 'abc')
+        self.assertEqual(commonstart('abc', 'abcd'), 'abc')
+        self.assertEqual(commonstart('abc', 'bc'), '')
+        self.assertEqual(commonstart('a1a2b1', 'a1a2b2', readingframe=2),
+                         'a1a2')
+
+    def test_matrix(self):
+        strings_a = ['abcd', 'abd', 'b', 'abcd', 'bcd', 'abcde']
+        strings_b = ['abce', 'a', 'abd', 'bc', 'abcd', 'ab', 'c']
+        lengths = commonstartlength_matrix(strings_a, strings_b)
+        self.assertEqual(lengths.tolist(),
+                         [[commonstartlength(s1, s2) for s2 in strings_b]
+                          for s1 in strings_a])
+
+    def test_matrixreadingframe2(self):
+        strings = ['a1a2b1', 'a1a2b2', 'a1b1', 'b1']
+        lengths = commonstartlength_matrix(strings, strings, readingframe=2)
+        self.assertEqual(lengths.tolist(), [[3, 2, 1, 0], [2, 3, 1, 0],
+                                            [1, 1, 2, 0], [0, 0, 0, 1]])
+
+    def test_durationmatrix(self):
+        tokendurations = {'a': 1., 'b': 2., 'c': 3.}
+        strings = ['abc', 'ab', 'ca']
+        durations = commonstartduration_matrix(strings, strings,
+                                               tokendurations, 0.5)
+        for i, s1 in enumerate(strings):
+            for j, s2 in enumerate(strings):
+                self.assertAlmostEqual(
+                    durations[i, j],
+                    commonstartduration(s1, s2, tokendurations, 0.5))
+
+
+class TestDurations(TestCase):
+
+    tokendurations = {'a1': 1., 'b1': 2., 'c1': .5}
+
+    def test_cumulativedurations(self):
+        c = cumulativedurations('a1b1c1', self.tokendurations, readingframe=2)
+        self.assertEqual(c.tolist(), [0., 1., 3., 3.5])
+
+    def test_longestsharedsubstringduration(self):
+        # 'b1c1' and 'a1b1' are both longest shared substrings
+        d = longestsharedsubstringduration('a1b1c1', 'b1c1a1b1',
+                                           self.tokendurations, .1,
+                                           readingframe=2)
+        self.assertAlmostEqual(d, 3.1)
+        self.assertEqual(longestsharedsubstringduration(
+            'a1', 'b1', self.tokendurations, .1, readingframe=2), 0.)
+
+    def test_cumdurations(self):
+        # precomputed cumulative durations are used instead of tokendurations
+        cumdurations = {'a1b1c1': np.array([0., 10., 20., 30.])}
+        d = longestsharedsubstringduration('a1b1c1', 'b1c1', {}, 0.,
+                                           readingframe=2,
+                                           cumdurations=cumdurations)
+        self.assertEqual(d, 20.)
+        d = commonstartduration('a1b1c1', 'a1b1', {}, 0., readingframe=2,
+                                cumdurations=cumdurations)
+        self.assertEqual(d, 20.)
+
+
+class TestMemo(TestCase):
+
+    def test_reuse(self):
+        clearmemo()
+        sharedlengthnsubstrings('abcd', 'bcde', n=2)
+        sharedlengthnsubstrings('cdef', 'bcde', n=2)
+        info = memoinfo()['_stringngramindex']
+        self.assertEqual((info.hits, info.misses), (1, 1))
+        clearmemo()
+        self.assertEqual(memoinfo()['_stringngramindex'].currsize, 0)
+
+    def test_invalidstring(self):
+        for i in range(2):
+            self.assertRaises(ValueError, levenshtein, 'abc', 'ab',
+                              readingframe=2)
+
+    def test_growingalphabet(self):
+        # the alphabet of the shared encoder grows beyond 256 tokens after
+        # 'a00b00' has been memoized
+        ss = sharedlengthnsubstrings('a00b00', 'b00a00', n=1, readingframe=3)
+        many = ''.join('{:03d}'.format(i) for i in range(300))
+        ss = sharedlengthnsubstrings(many + 'a00b00', 'a00b00', n=2,
+                                     readingframe=3)
+        self.assertEqual(ss, (('a00b00', ((300, 0),)),))
+        self.assertEqual(novellengthnsubstrings('a00b00', many + 'a00b00',
+                                                n=2, readingframe=3), ())
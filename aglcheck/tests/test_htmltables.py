@@ -0,0 +1,113 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from aglcheck.htmltables import iter_htmltable, htmltable, save_html, \
+    longestsharedsubstringstable, save_htmlviewer
+from aglcheck.stringdata import StringData
+from aglcheck.stringsetcomparison import _analyze_stringbystring
+
+
+def get_stringdata():
+    return StringData([{'E1': 'abcd'}, {'E2': 'bcda'}, {'T1': 'abda'}],
+                      stringcategories={'Exposure': ['E1', 'E2'],
+                                        'Test': ['T1']})
+
+
+class TestStreaming(TestCase):
+
+    def test_chunks(self):
+        sd = get_stringdata()
+        cm = _analyze_stringbystring(
+            sd, lambda s1, s2, readingframe: [s1 + s2], lambda item: item,
+            title='Pairs', comparison=('Test', 'Exposure'))
+        for transpose in (False, True):
+            chunks = list(iter_htmltable(cm, transpose=transpose))
+            self.assertEqual(''.join(chunks),
+                             htmltable(cm, transpose=transpose))
+        # without transposing, there is a row for every exposure string
+        rows = [c for c in iter_htmltable(cm) if c.startswith('<tr>')]
+        self.assertEqual(len(rows), 2)
+        self.assertIn('>E1<', rows[0])
+        self.assertIn('abdaabcd<br>', rows[0])
+
+    def test_formatcell(self):
+        sd = get_stringdata()
+        cm = _analyze_stringbystring(
+            sd, lambda s1, s2, readingframe: len(s1 + s2),
+            lambda item: item, comparison=('Test', 'Exposure'))
+        calls = []
+
+        def formatcell(s1, s2, value):
+            calls.append((s1, s2))
+            return ['{}:{}'.format(s1, value)]
+
+        chunks = iter_htmltable(cm, transpose=True, formatcell=formatcell)
+        self.assertEqual(calls, [])
+        html = ''.join(chunks)
+        self.assertEqual(calls, [('abda', 'abcd'), ('abda', 'bcda')])
+        self.assertIn('<td>abda:8<br></td>', html)
+
+    def test_save_html(self):
+        sd = get_stringdata()
+        html = longestsharedsubstringstable(sd)
+        chunks = longestsharedsubstringstable(sd, stream=True)
+        self.assertEqual(''.join(chunks), html)
+        f = io.StringIO()
+        save_html(longestsharedsubstringstable(sd, stream=True), f)
+        self.assertTrue(f.getvalue().startswith('<!DOCTYPE html>'))
+        self.assertIn(html, f.getvalue())
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, 'table.html.gz')
+            save_html(longestsharedsubstringstable(sd, stream=True),
+                      filename)
+            with gzip.open(filename, 'rt', encoding='utf-8') as g:
+                self.assertEqual(g.read(), f.getvalue())
+            filename = os.path.join(dirname, 'table.html')
+            save_html(html, filename)
+            with open(filename, encoding='utf-8') as g:
+                self.assertEqual(g.read(), f.getvalue())
+
+
+class TestViewer(TestCase):
+
+    def test_save_htmlviewer(self):
+        sd = get_stringdata()
+        cm = _analyze_stringbystring(
+            sd, lambda s1, s2, readingframe: [s1 + s2] if s1 < s2 else '',
+            lambda item: item, title='Pairs')
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, 'table.html')
+            save_htmlviewer(cm, filename, rowsperchunk=2)
+            with open(filename, encoding='utf-8') as f:
+                page = f.read()
+            self.assertIn('"datadir":"table_files"', page)
+            self.assertNotIn('/*AGLCHECKMETA*/', page)
+            datadir = os.path.join(dirname, 'table_files')
+            self.assertEqual(sorted(os.listdir(datadir)),
+                             ['rows_00000.js', 'rows_00001.js'])
+            with open(os.path.join(datadir, 'rows_00001.js'),
+                      encoding='utf-8') as f:
+                text = f.read()
+            self.assertTrue(text.startswith('aglcheckrows(1,'))
+            rows = json.loads(text[len('aglcheckrows(1,'):-len(');\n')])
+            # the row of T1, with a cell for every column string
+            self.assertEqual(rows, [[['abcdabda'], 0, 0]])
+            with open(os.path.join(datadir, 'rows_00000.js'),
+                      encoding='utf-8') as f:
+                text = f.read()
+            rows = json.loads(text[len('aglcheckrows(0,'):-len(');\n')])
+            self.assertEqual(rows, [[0, 0, 0],
+                                    [['abcdbcda'], 0, ['abdabcda']]])
+
+    def test_tablefunction(self):
+        sd = get_stringdata()
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, 'lss.html')
+            self.assertIsNone(longestsharedsubstringstable(sd,
+                                                           viewer=filename))
+            self.assertTrue(os.path.exists(os.path.join(
+                dirname, 'lss_files', 'rows_00000.js')))
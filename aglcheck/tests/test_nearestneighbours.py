@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+import numpy as np
+
+from aglcheck.nearestneighbours import BKTree, nearest
+from aglcheck.stringcomparison import levenshtein
+from aglcheck.stringdata import StringData
+from aglcheck.stringsetcomparison import availableanalysisfunctions
+from aglcheck.tests.testdata import random_strings
+
+
+def get_stringdata(readingframe=1, seed=1):
+    labels = ['s{}'.format(i) for i in range(40)]
+    strings = [{l: s} for l, s in zip(labels, random_strings(
+        40, readingframe=readingframe, seed=seed, maxlength=7))]
+    stringcategories = {'A': labels[:15], 'B': labels[10:]}
+    return StringData(strings, readingframe=readingframe,
+                      stringcategories=stringcategories)
+
+
+def bruteforce(stringdata, metric, comparison, k, largest, excludeself):
+    cm = availableanalysisfunctions[metric](stringdata, comparison=comparison)
+    matrix = np.asarray(cm.get_matrix()).tolist()
+    labels0 = stringdata.stringcategories[comparison[0]]
+    labels1 = stringdata.stringcategories[comparison[1]]
+    results = {}
+    for l, row in zip(labels0, matrix):
+        ranked = sorted((-v if largest else v, j) for j, v in enumerate(row)
+                        if not (excludeself and labels1[j] == l))
+        results[l] = [(labels1[j], -v if largest else v)
+                      for v, j in ranked[:k]]
+    return results
+
+
+class TestNearest(TestCase):
+
+    def test_bruteforce(self):
+        comparison = ('A', 'B')
+        for readingframe in (1, 2):
+            sd = get_stringdata(readingframe=readingframe)
+            for metric, largest in (('levenshtein', False),
+                                    ('longestsharedsubstringlength', True),
+                                    ('crosscorrelationmax', True)):
+                for excludeself in (False, True):
+                    self.assertEqual(
+                        nearest(sd, metric, comparison=comparison, k=3,
+                                excludeself=excludeself),
+                        bruteforce(sd, metric, comparison, 3, largest,
+                                   excludeself))
+
+    def test_longstrings(self):
+        # long shared substrings, found through the substring index
+        labels = ['s{}'.format(i) for i in range(30)]
+        strings = random_strings(30, seed=2, maxlength=24)
+        strings[5:10] = [s + strings[0] for s in strings[5:10]]
+        sd = StringData([{l: s} for l, s in zip(labels, strings)])
+        for metric, largest in (('levenshtein', False),
+                                ('longestsharedsubstringlength', True),
+                                ('crosscorrelationmax', True)):
+            self.assertEqual(nearest(sd, metric, k=4, excludeself=True),
+                             bruteforce(sd, metric, ('All', 'All'), 4,
+                                        largest, True))
+
+    def test_largek(self):
+        sd = get_stringdata()
+        result = nearest(sd, 'crosscorrelationmax', comparison=('A', 'A'),
+                         k=100)
+        self.assertEqual(len(result['s0']), 15)
+
+    def test_unknownmetric(self):
+        self.assertRaises(ValueError, nearest, get_stringdata(), 'issame')
+
+
+class TestBKTree(TestCase):
+
+    def test_nearest(self):
+        words = ['abcd', 'abdc', 'dcba', 'abc', 'bcd', 'aaaa', 'abcde']
+        tree = BKTree(words, levenshtein)
+        for query in ('abce', 'dddd', 'bc'):
+            expected = sorted((levenshtein(query, w), i)
+                              for i, w in enumerate(words))
+            self.assertEqual(tree.nearest(query, k=3), expected[:3])
+        self.assertEqual(tree.nearest('abcd', k=2, exclude=0), [(1, 3), (1, 4)])
@@ -0,0 +1,95 @@
+from unittest import TestCase
+
+from aglcheck.ngramindex import NgramIndex, novelsubstringcounts, \
+    novelsubstrings
+from aglcheck.stringcomparison import novellengthnsubstrings, \
+    sharedlengthnsubstrings
+from aglcheck.stringdata import StringData
+from aglcheck.tests.testdata import random_strings
+
+
+class TestNgramIndex(TestCase):
+
+    def test_postings(self):
+        index = NgramIndex(['abcab', 'cabd', 'dab'], n=2)
+        self.assertEqual(index.postings('ca'), [('abcab', (2,)),
+                                                ('cabd', (0,))])
+        self.assertEqual(index.postings('dd'), [])
+        self.assertEqual(index.postings('abc'), [])
+
+    def test_from_stringdata(self):
+        sd = StringData([{'E1': 'abcab'}, {'E2': 'cabd'}, {'T1': 'dab'}],
+                        stringcategories={'Exposure': ['E1', 'E2'],
+                                          'Test': ['T1']})
+        index = NgramIndex.from_stringdata(sd, n=2, category='Exposure')
+        self.assertEqual(index.postings('ab'), [('E1', (0, 3)),
+                                                ('E2', (1,))])
+
+    def test_counts(self):
+        for rf in (1, 2):
+            strings_a = random_strings(25, readingframe=rf, seed=1)
+            strings_b = random_strings(25, readingframe=rf, seed=2)
+            for n in (1, 2, 3):
+                index = NgramIndex(strings_b, n=n, readingframe=rf)
+                shared = index.sharedcounts(strings_a)
+                novel = index.novelcounts(strings_a)
+                for i, s1 in enumerate(strings_a):
+                    for j, s2 in enumerate(strings_b):
+                        self.assertEqual(
+                            shared[i, j],
+                            sum(len(m[1]) for m in sharedlengthnsubstrings(
+                                s1, s2, n=n, readingframe=rf)))
+                        self.assertEqual(
+                            novel[i, j],
+                            len(novellengthnsubstrings(
+                                s2, s1, n=n, readingframe=rf)))
+
+    def test_sharingcounts(self):
+        strings = random_strings(25, seed=4, maxlength=12)
+        index = NgramIndex(strings, n=3)
+        for s in random_strings(10, seed=5, maxlength=12):
+            indices, counts = index.sharingcounts(s)
+            keys = [s[i:i + 3] for i in range(len(s) - 2)]
+            expected = [(j, sum(key in t for key in keys))
+                        for j, t in enumerate(strings)]
+            self.assertEqual(list(zip(indices.tolist(), counts.tolist())),
+                             [(j, c) for j, c in expected if c])
+
+    def test_newtokens(self):
+        index = NgramIndex(['ab', 'ba'], n=1)
+        self.assertEqual(index.sharedcounts(['xyab']).tolist(), [[2, 2]])
+        self.assertEqual(index.novelcounts(['xy']).tolist(), [[2, 2]])
+
+
+class TestNovelSubstrings(TestCase):
+
+    def test_againstpairs(self):
+        for rf in (1, 2):
+            strings = random_strings(30, readingframe=rf, seed=3)
+            labels = ['s{}'.format(i) for i in range(len(strings))]
+            sd = StringData([{l: s} for l, s in zip(labels, strings)],
+                            readingframe=rf,
+                            stringcategories={'Exposure': labels[:20],
+                                              'Test': labels[20:]})
+            comparison = ('Test', 'Exposure')
+            hits = novelsubstrings(sd, [1, 2, 3], comparison=comparison)
+            counts = novelsubstringcounts(sd, [1, 2, 3],
+                                          comparison=comparison)
+            for n in (1, 2, 3):
+                for l in labels[20:]:
+                    s = sd.stringdict[l]
+                    expected = set(novellengthnsubstrings(
+                        s, sd.stringdict[labels[0]], n=n, readingframe=rf))
+                    for e in labels[1:20]:
+                        expected &= set(novellengthnsubstrings(
+                            s, sd.stringdict[e], n=n, readingframe=rf))
+                    self.assertEqual(set(hits[n][l]), expected)
+                    self.assertEqual(counts[n][l], len(expected))
+
+    def test_short(self):
+        sd = StringData([{'E1': 'ab'}, {'T1': 'a'}, {'T2': 'abc'}],
+                        stringcategories={'Exposure': ['E1'],
+                                          'Test': ['T1', 'T2']})
+        self.assertEqual(novelsubstrings(sd, 3, comparison=('Test',
+                                                            'Exposure')),
+                         {3: {'T1': (), 'T2': (('abc', 0),)}})
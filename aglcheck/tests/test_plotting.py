@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+import numpy as np
+
+from aglcheck.plotting import _blockreduce, _categoryreduce, \
+    _comparisonarray
+from aglcheck.stringdata import StringData
+from aglcheck.stringsetcomparison import levenshtein
+
+
+class TestReduce(TestCase):
+
+    def test_blockreduce(self):
+        m = np.arange(35).reshape(5, 7)
+        self.assertEqual(_blockreduce(m, 3, 'max').tolist(),
+                         [[9, 12, 13], [23, 26, 27], [30, 33, 34]])
+        self.assertEqual(_blockreduce(m, 3, 'mean').tolist(),
+                         [[4.5, 7.5, 9.5], [18.5, 21.5, 23.5],
+                          [29., 32., 34.]])
+        self.assertIs(_blockreduce(m, 7, 'max'), m)
+
+    def test_categoryreduce(self):
+        m = np.arange(12).reshape(3, 4)
+        categories = {'A': ['x0', 'x1', 'y0'], 'B': ['x2', 'x3', 'y1', 'y2'],
+                      'C': []}
+        xlabels = ['x0', 'x1', 'x2', 'x3']
+        ylabels = ['y0', 'y1', 'y2']
+        mean = _categoryreduce(m, xlabels, ylabels, categories,
+                               ['A', 'B', 'C'], 'mean')
+        np.testing.assert_equal(mean, [[0.5, 2.5, np.nan],
+                                       [6.5, 8.5, np.nan],
+                                       [np.nan, np.nan, np.nan]])
+        maximum = _categoryreduce(m, xlabels, ylabels, categories,
+                                  ['A', 'B', 'C'], 'max')
+        np.testing.assert_equal(maximum, [[1, 3, np.nan],
+                                          [9, 11, np.nan],
+                                          [np.nan, np.nan, np.nan]])
+
+
+class TestComparisonArray(TestCase):
+
+    def test_comparisonarray(self):
+        sd = StringData(['abc', 'abd', 'bcd'],
+                        stringcategories={'A': ['abc', 'abd'],
+                                          'B': ['abd', 'bcd']})
+        cm = levenshtein(sd, comparison=('A', 'B'))
+        matrix = _comparisonarray(cm)
+        self.assertTrue(np.shares_memory(matrix, cm.values))
+        self.assertEqual(matrix.tolist(), [[1, 0], [2, 2]])
+        self.assertEqual(_comparisonarray(cm.get_matrix()).tolist(),
+                         matrix.tolist())
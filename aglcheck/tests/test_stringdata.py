@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from aglcheck.stringcomparison import _tokenarray
+from aglcheck.stringdata import read_stringdata, StringData
+from aglcheck.stringsetcomparison import analyze_many, \
+    availableanalysisfunctions, longestsharedsubstringduration
+
+
+yamltext = """\
+strings:
+  - E1: abcd
+  - E2: abdc
+stringcategories:
+  Exposure: [E1, E2]
+"""
+
+
+class TestReadStringData(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'strings.yaml')
+        with open(self.filename, 'w') as f:
+            f.write(yamltext)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_read(self):
+        sd = read_stringdata(self.filename)
+        self.assertEqual(sd.stringdict, {'E1': 'abcd', 'E2': 'abdc'})
+        self.assertFalse(os.path.exists(self.filename + '.aglcache'))
+
+    def test_cache(self):
+        sd = read_stringdata(self.filename, cache=True)
+        self.assertTrue(os.path.exists(self.filename + '.aglcache'))
+        self.assertEqual(sd.stringcategories['Exposure'], ['E1', 'E2'])
+        # the sidecar is used as long as the file is unchanged
+        os.utime(self.filename + '.aglcache')
+        sd = read_stringdata(self.filename, cache=True)
+        self.assertEqual(sd.stringdict, {'E1': 'abcd', 'E2': 'abdc'})
+
+    def test_cacheinvalidation(self):
+        read_stringdata(self.filename, cache=True)
+        with open(self.filename, 'w') as f:
+            f.write(yamltext.replace('abdc', 'dcbae'))
+        sd = read_stringdata(self.filename, cache=True)
+        self.assertEqual(sd.stringdict['E2'], 'dcbae')
+        # same contents, new modification time
+        stat = os.stat(self.filename)
+        os.utime(self.filename, ns=(stat.st_atime_ns,
+                                    stat.st_mtime_ns + 10 ** 9))
+        sd = read_stringdata(self.filename, cache=True)
+        self.assertEqual(sd.stringdict['E2'], 'dcbae')
+
+    def test_corruptcache(self):
+        with open(self.filename + '.aglcache', 'wb') as f:
+            f.write(b'no json')
+        sd = read_stringdata(self.filename, cache=True)
+        self.assertEqual(sd.stringdict['E1'], 'abcd')
+        with open(self.filename + '.aglcache', 'rb') as f:
+            self.assertEqual(json.load(f)['data']['strings'],
+                             [{'E1': 'abcd'}, {'E2': 'abdc'}])
+
+    def test_nonjsoncontents(self):
+        # integer labels would become strings in JSON
+        with open(self.filename, 'w') as f:
+            f.write(yamltext.replace('E1', '1'))
+        sd = read_stringdata(self.filename, cache=True)
+        self.assertEqual(sd.stringdict[1], 'abcd')
+        self.assertFalse(os.path.exists(self.filename + '.aglcache'))
+
+
+class TestFromColumns(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_columns(self):
+        sd = StringData.from_columns(['abcd', 'abdc', 'dcba'],
+                                     stringlabels=['E1', 'E2', 'T1'],
+                                     categories=['Exposure', 'Exposure',
+                                                 None])
+        self.assertEqual(sd.stringlabels, ['E1', 'E2', 'T1'])
+        self.assertEqual(sd.stringdict['T1'], 'dcba')
+        self.assertEqual(sd.stringcategories['Exposure'], ['E1', 'E2'])
+        self.assertEqual(sd.stringcategories['All'], ['E1', 'E2', 'T1'])
+        self.assertEqual(sd.alphabet, ('a', 'b', 'c', 'd'))
+
+    def test_samestringdata(self):
+        sd0 = StringData([{'E1': 'a1b1'}, {'T1': 'b1a1'}], readingframe=2,
+                         stringcategories={'Test': ['T1']})
+        sd1 = StringData.from_columns(['a1b1', 'b1a1'],
+                                      stringlabels=['E1', 'T1'],
+                                      categories=[None, 'Test'],
+                                      readingframe=2)
+        for attr in ('stringdict', 'stringlabels', 'strings', 'alphabet',
+                     'stringcategories', 'stringlabelcolors'):
+            self.assertEqual(getattr(sd0, attr), getattr(sd1, attr))
+
+    def test_lengthmismatch(self):
+        self.assertRaises(ValueError, StringData.from_columns, ['ab', 'ba'],
+                          stringlabels=['E1'])
+
+    def test_csv(self):
+        filename = os.path.join(self.tempdir, 'strings.tsv')
+        with open(filename, 'w') as f:
+            f.write('label\tstring\tcategory\n'
+                    'E1\tabcd\tExposure\n'
+                    'T1\tdcba\t\n')
+        sd = StringData.from_csv(filename, labelcolumn='label',
+                                 categorycolumn='category')
+        self.assertEqual(sd.stringdict, {'E1': 'abcd', 'T1': 'dcba'})
+        self.assertEqual(sd.stringcategories,
+                         {'Exposure': ['E1'], 'All': ['E1', 'T1']})
+
+    def test_dataframe(self):
+        try:
+            import pandas as pd
+        except ImportError:
+            self.skipTest('pandas is not available')
+        df = pd.DataFrame({'label': ['E1', 'T1'], 'string': ['abcd', 'dcba'],
+                           'category': ['Exposure', float('nan')]})
+        sd = StringData.from_dataframe(df, labelcolumn='label',
+                                       categorycolumn='category')
+        self.assertEqual(sd.stringdict, {'E1': 'abcd', 'T1': 'dcba'})
+        self.assertEqual(sd.stringcategories['Exposure'], ['E1'])
+
+    def test_arrow(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            self.skipTest('pyarrow is not available')
+        # labels are converted to strings, as in from_dataframe
+        table = pa.table({'label': [1, 2], 'string': ['abcd', 'dcba'],
+                          'category': ['Exposure', None]})
+        sd = StringData.from_arrow(table, labelcolumn='label',
+                                   categorycolumn='category')
+        self.assertEqual(sd.stringdict, {'1': 'abcd', '2': 'dcba'})
+        self.assertEqual(sd.stringcategories['Exposure'], ['1'])
+
+
+class TestCompact(TestCase):
+
+    def get_stringdata(self, compact):
+        return StringData([{'E1': 'a1b1c1'}, {'E2': 'b1a1'}, {'T1': 'c1c1'}],
+                          readingframe=2, compact=compact,
+                          stringcategories={'Exposure': ['E1', 'E2']},
+                          labelcolors={'Exposure': 'red'},
+                          tokendurations={'a1': 1., 'b1': 2., 'c1': .5},
+                          isiduration=.1)
+
+    def test_views(self):
+        sd = self.get_stringdata(compact=False)
+        sc = self.get_stringdata(compact=True)
+        self.assertEqual(list(sc.strings), sd.strings)
+        self.assertEqual(sc.strings[-1], 'c1c1')
+        self.assertEqual(dict(sc.stringdict), sd.stringdict)
+        self.assertEqual(dict(sc.stringcategories), sd.stringcategories)
+        self.assertEqual(dict(sc.stringlabelcolors), sd.stringlabelcolors)
+        for label in sd.stringlabels:
+            self.assertEqual(sc.tokenarrays[label].tolist(),
+                             sd.tokenarrays[label].tolist())
+            self.assertEqual(sc.cumulativedurations[label].tolist(),
+                             sd.cumulativedurations[label].tolist())
+
+    def test_buffer(self):
+        sc = self.get_stringdata(compact=True)
+        self.assertEqual(sc.offsets.tolist(), [0, 3, 5, 7])
+        self.assertEqual(len(sc.tokenbuffer), 7)
+        self.assertEqual(sc.categoryindices['Exposure'].tolist(), [0, 1])
+        self.assertFalse(sc.tokenarrays['E2'].flags.writeable)
+
+    def test_decodeonce(self):
+        # every string is decoded at most once per analysis
+        sd = self.get_stringdata(compact=False)
+        sc = self.get_stringdata(compact=True)
+        # the token encoder is shared by the whole process
+        with mock.patch.object(sc.tokenencoder, 'decode',
+                               wraps=sc.tokenencoder.decode) as decode:
+            for metric in ('issame', 'longestsharedsubstringduration',
+                           'commonstartduration'):
+                decode.reset_mock()
+                f = availableanalysisfunctions[metric]
+                self.assertEqual(f(sc).get_matrix().tolist(),
+                                 f(sd).get_matrix().tolist())
+                self.assertEqual(decode.call_count, 3)
+            decode.reset_mock()
+            analyze_many(sc, ['issame', 'longestsharedsubstringduration'],
+                         comparison=('Exposure', 'All'))
+            self.assertEqual(decode.call_count, 3)
+
+
+class TestDurations(TestCase):
+
+    def test_missingduration(self):
+        # only tokens in matched substrings need a duration
+        tokendurations = {'a': 1., 'b': 2., 'c': 1.}
+        for compact in (False, True):
+            sd = StringData(['abc', 'abd'], tokendurations=tokendurations,
+                            isiduration=.1, compact=compact,
+                            stringcategories={'E': ['abc'], 'T': ['abd']})
+            self.assertEqual(list(sd.cumulativedurations), ['abc'])
+            self.assertEqual(sd.cumulativedurations['abc'].tolist(),
+                             [0., 1., 3., 4.])
+            self.assertNotIn('abd', sd.cumulativedurations)
+            self.assertRaises(KeyError, lambda: sd.cumulativedurations['abd'])
+            cm = longestsharedsubstringduration(sd, comparison=('T', 'E'))
+            self.assertAlmostEqual(cm.get_value('abd', 'abc'), 3.1)
+
+
+class TestTokenArrays(TestCase):
+
+    def test_shared(self):
+        sd = StringData([{'E1': 'a1b1'}, {'E2': 'b1c1'}], readingframe=2)
+        self.assertEqual(sorted(sd.tokenarrays), ['E1', 'E2'])
+        self.assertIs(sd.tokenarrays['E1'],
+                      _tokenarray('a1b1', readingframe=2))
+        self.assertEqual(len(sd.tokenarrays['E2']), 2)
@@ -0,0 +1,227 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+
+from aglcheck.resultcache import ResultCache
+from aglcheck.stringdata import StringData
+from aglcheck.stringcomparison import levenshtein as levenshtein_distance, \
+    crosscorrelationmax as crosscorrelation_max, \
+    commonstartduration as commonstart_duration, \
+    longestsharedsubstringduration as longestsharedsubstring_duration
+from aglcheck.stringsetcomparison import levenshtein, crosscorrelationmax, \
+    longestsharedsubstringlength, sharedlengthnsubstringcount, \
+    commonstartduration, longestsharedsubstringduration, \
+    analyze_many, availableanalysisfunctions, _analyze_stringbystring, \
+    _ntokens
+from aglcheck.tests.testdata import get_stringdata
+
+
+class TestParallel(TestCase):
+
+    def test_processes(self):
+        sd = get_stringdata()
+        serial = sharedlengthnsubstringcount(sd, n=2)
+        parallel = sharedlengthnsubstringcount(sd, n=2, n_jobs=2)
+        self.assertEqual(parallel.get_matrix().tolist(),
+                         serial.get_matrix().tolist())
+
+    def test_executor(self):
+        sd = get_stringdata()
+        comparison = ('Test', 'Exposure')
+        serial = longestsharedsubstringlength(sd, comparison=comparison)
+        with ThreadPoolExecutor(2) as executor:
+            parallel = longestsharedsubstringlength(sd, comparison=comparison,
+                                                    executor=executor)
+        self.assertEqual(parallel.get_matrix().tolist(),
+                         serial.get_matrix().tolist())
+
+    def test_batch(self):
+        sd = get_stringdata()
+        serial = levenshtein(sd)
+        parallel = levenshtein(sd, n_jobs=2)
+        self.assertEqual(parallel.get_matrix().tolist(),
+                         serial.get_matrix().tolist())
+
+
+class TestSymmetry(TestCase):
+
+    def test_pairsanalyzed(self):
+        sd = get_stringdata()
+        pairs = []
+
+        def analysisf(s1, s2, readingframe):
+            pairs.append((s1, s2))
+            return len(set(s1) & set(s2))
+
+        def dataaccessf(item): return item
+
+        cm = _analyze_stringbystring(sd, analysisf, dataaccessf,
+                                     symmetric=True, diagonal=_ntokens)
+        self.assertEqual(len(pairs), 10)
+        matrix = cm.get_matrix()
+        self.assertEqual(matrix, [list(row) for row in zip(*matrix)])
+        self.assertEqual([matrix[i][i] for i in range(5)], [4] * 5)
+
+    def test_overlappingcategories(self):
+        sd = get_stringdata()
+        comparison = ('Exposure', 'All')
+        cm = levenshtein(sd, comparison=comparison)
+        self.assertEqual(cm.get_matrix().tolist(),
+                         [[levenshtein_distance(sd.stringdict[l0],
+                                                sd.stringdict[l1])
+                           for l1 in sd.stringcategories['All']]
+                          for l0 in sd.stringcategories['Exposure']])
+        cm = crosscorrelationmax(sd, comparison=comparison)
+        self.assertEqual(cm.get_matrix().tolist(),
+                         [[crosscorrelation_max(sd.stringdict[l0],
+                                                sd.stringdict[l1])
+                           for l1 in sd.stringcategories['All']]
+                          for l0 in sd.stringcategories['Exposure']])
+
+
+class TestDurations(TestCase):
+
+    def test_cumulativedurations(self):
+        tokendurations = {'a': 1., 'b': 2., 'c': .5, 'd': .25}
+        strings = [{l: s} for l, s in get_stringdata().stringdict.items()]
+        sd = StringData(strings, tokendurations=tokendurations,
+                        isiduration=.1)
+        self.assertEqual(sd.cumulativedurations['E1'].tolist(),
+                         [0., 1., 3., 3.5, 3.75])
+        for setf, pairf in ((commonstartduration, commonstart_duration),
+                            (longestsharedsubstringduration,
+                             longestsharedsubstring_duration)):
+            matrix = setf(sd).get_matrix()
+            for i, s1 in enumerate(sd.strings):
+                for j, s2 in enumerate(sd.strings):
+                    self.assertAlmostEqual(
+                        matrix[i][j], pairf(s1, s2, tokendurations, .1))
+
+
+class TestComparisonMatrix(TestCase):
+
+    def test_values(self):
+        sd = get_stringdata()
+        cm = levenshtein(sd, comparison=('Test', 'Exposure'))
+        matrix = cm.get_matrix()
+        self.assertEqual(matrix.shape, (2, 3))
+        self.assertIs(cm.get_matrix(), matrix)
+        self.assertFalse(matrix.flags.writeable)
+        self.assertEqual(cm.get_value('T2', 'E1'), matrix[1, 0])
+        self.assertEqual(cm.resultsdict['T2']['E1'], matrix[1, 0])
+
+    def test_resultsdict(self):
+        sd = get_stringdata()
+
+        def analysisf(s1, s2, readingframe):
+            return [c for c in s1 if c in s2]
+
+        cm = _analyze_stringbystring(sd, analysisf, len,
+                                     comparison=('Test', 'Test'))
+        self.assertIsNone(cm.values)
+        self.assertEqual(cm.resultsdict['T1']['T2'], ['a', 'b', 'c', 'c'])
+        self.assertEqual(cm.get_matrix(), [[4, 4], [3, 4]])
+
+
+class TestAnalyzeMany(TestCase):
+
+    def test_samevalues(self):
+        sd = get_stringdata()
+        metrics = ['longestsharedsubstringlength', 'crosscorrelationmax',
+                   ('sharedlengthnsubstringcount', {'n': 2}),
+                   ('novellengthnsubstringcount', {'n': 2}), 'levenshtein']
+        comparison = ('Test', 'All')
+        cms = analyze_many(sd, metrics, comparison=comparison)
+        for metric, cm in zip(metrics, cms):
+            if isinstance(metric, str):
+                metric = (metric, {})
+            name, params = metric
+            expected = availableanalysisfunctions[name](
+                sd, comparison=comparison, **params)
+            self.assertEqual(cm.name, name)
+            self.assertEqual(cm.title, expected.title)
+            self.assertEqual(cm.get_matrix().tolist(),
+                             expected.get_matrix().tolist())
+
+    def test_unknownmetric(self):
+        self.assertRaises(ValueError, analyze_many, get_stringdata(),
+                          ['nosuchmetric'])
+
+
+class TestResultCache(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_cachedoutcomes(self):
+        sd = get_stringdata()
+        expected = sharedlengthnsubstringcount(sd, n=2).get_matrix().tolist()
+        with ResultCache(self.filename) as cache:
+            cm = sharedlengthnsubstringcount(sd, n=2, cache=cache)
+            self.assertEqual(cm.get_matrix().tolist(), expected)
+            self.assertEqual(len(cache), 15)
+            cm = sharedlengthnsubstringcount(sd, n=3, cache=cache)
+            self.assertEqual(len(cache), 30)
+        pairs = []
+
+        def analysisf(s1, s2, readingframe):
+            pairs.append((s1, s2))
+
+        with ResultCache(self.filename) as cache:
+            cm = _analyze_stringbystring(
+                sd, analysisf, len, cache=cache, symmetric=True,
+                cachekey=('sharedlengthnsubstringcount', {'n': 2}))
+        self.assertEqual(pairs, [])
+
+    def test_levenshtein(self):
+        sd = get_stringdata()
+        expected = levenshtein(sd).get_matrix().tolist()
+        with ResultCache(self.filename) as cache:
+            cm = levenshtein(sd, cache=cache)
+            self.assertEqual(cm.get_matrix().tolist(), expected)
+            cm = levenshtein(sd, cache=cache)
+            self.assertEqual(cm.get_matrix().tolist(), expected)
+
+    def test_eviction(self):
+        sd = get_stringdata()
+        with ResultCache(self.filename, maxbytes=100) as cache:
+            levenshtein(sd, cache=cache)
+            self.assertLess(cache.connection.execute(
+                'SELECT SUM(size) FROM outcomes').fetchone()[0], 101)
+            cache.clear()
+            self.assertEqual(len(cache), 0)
+
+    def test_jsonvalues(self):
+        sd = get_stringdata()
+        with ResultCache(self.filename) as cache:
+            cms = analyze_many(sd, ['issame', 'crosscorrelationmax',
+                                    'longestsharedsubstringlength'],
+                               cache=cache)
+            values = [row[0] for row in cache.connection.execute(
+                'SELECT value FROM outcomes')]
+            self.assertTrue(all(isinstance(v, str) for v in values))
+            self.assertIn('[false,1,1]', values)
+            cached = analyze_many(sd, ['issame', 'crosscorrelationmax',
+                                       'longestsharedsubstringlength'],
+                                  cache=cache)
+        for cm, cachedcm in zip(cms, cached):
+            self.assertEqual(cachedcm.get_matrix().tolist(),
+                             cm.get_matrix().tolist())
+
+    def test_paramorder(self):
+        with ResultCache(self.filename) as cache:
+            params = [{'n': 2, 'x': 1}, {'x': 1, 'n': 2}, {'n': 3, 'x': 1}]
+            keys = [cache.makekey('ab', 'ba', ('m', p), 1) for p in params]
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], keys[2])
+
+    def test_cachekeyrequired(self):
+        with ResultCache(self.filename) as cache:
+            self.assertRaises(ValueError, _analyze_stringbystring,
+                              get_stringdata(), len, len, cache=cache)
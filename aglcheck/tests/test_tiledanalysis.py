@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from aglcheck.ngramindex import NgramIndex
+from aglcheck.stringsetcomparison import availableanalysisfunctions
+from aglcheck.tests.testdata import get_stringdata
+from aglcheck.tiledanalysis import iter_tiles, save_npy, reduce_tiles, \
+    RowMax, Histogram, TopK
+
+
+def get_matrix(sd, metric, comparison=('All', 'All')):
+    if isinstance(metric, str):
+        metric = (metric, {})
+    name, params = metric
+    cm = availableanalysisfunctions[name](sd, comparison=comparison,
+                                          **params)
+    return np.asarray(cm.get_matrix())
+
+
+def assemble(tiles, shape):
+    matrix = None
+    for i, j, block in tiles:
+        if matrix is None:
+            matrix = np.empty(shape, dtype=block.dtype)
+        matrix[i:i + block.shape[0], j:j + block.shape[1]] = block
+    return matrix
+
+
+class TestIterTiles(TestCase):
+
+    def test_metrics(self):
+        sd = get_stringdata()
+        comparison = ('Exposure', 'All')
+        for metric in ['levenshtein', 'longestsharedsubstringlength',
+                       ('sharedlengthnsubstringcount', {'n': 2}),
+                       ('novellengthnsubstringcount', {'n': 2}),
+                       'commonstartlength', 'issubstring']:
+            tiles = iter_tiles(sd, metric, comparison=comparison,
+                               tileshape=(2, 2))
+            self.assertEqual(assemble(tiles, (3, 5)).tolist(),
+                             get_matrix(sd, metric, comparison).tolist())
+
+    def test_columnindex(self):
+        # the n-gram index of a column of tiles is built once
+        sd = get_stringdata()
+        expected = get_matrix(sd, ('sharedlengthnsubstringcount', {'n': 2}))
+        with mock.patch('aglcheck.ngramindex.NgramIndex',
+                        wraps=NgramIndex) as index:
+            tiles = iter_tiles(sd, ('sharedlengthnsubstringcount', {'n': 2}),
+                               tileshape=(1, 2))
+            self.assertEqual(assemble(tiles, (5, 5)).tolist(),
+                             expected.tolist())
+        self.assertEqual(index.call_count, 3)
+
+    def test_parallel(self):
+        sd = get_stringdata()
+        expected = get_matrix(sd, 'crosscorrelationmax').tolist()
+        tiles = iter_tiles(sd, 'crosscorrelationmax', tileshape=(2, None),
+                           n_jobs=2)
+        self.assertEqual(assemble(tiles, (5, 5)).tolist(), expected)
+        with ThreadPoolExecutor(2) as executor:
+            tiles = iter_tiles(sd, 'crosscorrelationmax', tileshape=(1, 2),
+                               n_jobs=2, executor=executor)
+            self.assertEqual(assemble(tiles, (5, 5)).tolist(), expected)
+
+
+class TestSaveNpy(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_save(self):
+        sd = get_stringdata()
+        filename = os.path.join(self.tempdir, 'levenshtein.npy')
+        values = save_npy(sd, 'levenshtein', filename, tileshape=(2, 3))
+        del values
+        loaded = np.load(filename, mmap_mode='r')
+        self.assertEqual(loaded.tolist(),
+                         get_matrix(sd, 'levenshtein').tolist())
+
+
+class TestReducers(TestCase):
+
+    def test_reducers(self):
+        sd = get_stringdata()
+        metric = ('sharedlengthnsubstringcount', {'n': 2})
+        matrix = get_matrix(sd, metric)
+        rowmax, (counts, edges), (columns, values) = reduce_tiles(
+            sd, metric, [RowMax(), Histogram(4, range=(0, 4)), TopK(2)],
+            tileshape=(2, 2))
+        self.assertEqual(rowmax.tolist(), matrix.max(axis=1).tolist())
+        self.assertEqual(counts.tolist(),
+                         np.histogram(matrix, bins=edges)[0].tolist())
+        order = np.lexsort((np.broadcast_to(np.arange(5), (5, 5)), -matrix))
+        self.assertEqual(columns.tolist(), order[:, :2].tolist())
+        self.assertEqual(values.tolist(),
+                         np.take_along_axis(matrix, order[:, :2],
+                                            axis=1).tolist())
+
+    def test_topksmallest(self):
+        sd = get_stringdata()
+        (columns, values), = reduce_tiles(sd, 'levenshtein',
+                                          [TopK(10, largest=False)],
+                                          comparison=('Test', 'Exposure'))
+        self.assertEqual(columns.shape, (2, 3))
+        self.assertEqual(values.tolist(),
+                         np.sort(get_matrix(sd, 'levenshtein',
+                                            ('Test', 'Exposure'))).tolist())
+
+    def test_histogrambins(self):
+        self.assertRaises(ValueError, Histogram, 4)
@@ -0,0 +1,28 @@
+"""String data that is shared by the tests of the analysis modules."""
+
+import random
+
+from aglcheck.stringdata import StringData
+
+
+def get_stringdata():
+    strings = [{'E1': 'abcd'}, {'E2': 'abdc'}, {'E3': 'bcda'},
+               {'T1': 'abcc'}, {'T2': 'dcba'}]
+    stringcategories = {'Exposure': ['E1', 'E2', 'E3'],
+                        'Test': ['T1', 'T2']}
+    return StringData(strings, stringcategories=stringcategories)
+
+
+def random_strings(nstrings, readingframe=1, seed=1, maxlength=8):
+    """
+    Returns nstrings reproducible random strings of 1 to maxlength tokens
+    from a four-token alphabet.
+
+    """
+    rng = random.Random(seed)
+    tokens = ['a1', 'b1', 'c1', 'd1'] if readingframe == 2 else 'abcd'
+    strings = []
+    for j in range(nstrings):
+        length = rng.randint(1, maxlength)
+        strings.append(''.join(rng.choice(tokens) for i in range(length)))
+    return strings
@@ -0,0 +1,308 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .stringsetcomparison import metricproperties, _columnblockfunction, \
+    _comparisonstringdict, _metricspec
+
+__all__ = ['iter_tiles', 'save_npy', 'reduce_tiles', 'RowMax', 'Histogram',
+           'TopK']
+
+
+def _comparisonshape(stringdata, comparison):
+    return tuple(len(stringdata.stringcategories[c]) for c in comparison)
+
+
+def _analyzetile(tile):
+    columnf, strings0 = tile
+    return columnf(strings0)
+
+
+def _imapbounded(f, items, executor, window):
+    """
+    Maps f over items in executor, in order, while keeping at most `window`
+    items submitted but not yet consumed, so that results do not pile up
+    when they are consumed more slowly than they are computed.
+
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(f, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_tiles(stringdata, metric, comparison=('All', 'All'),
+               tileshape=(1024, 1024), n_jobs=1, executor=None):
+    """
+    Computes a metric for the string pairs of `comparison` one tile of the
+    comparison grid at a time, so that comparisons of sets that are too
+    large to hold all outcomes in memory can be analyzed, reduced or written
+    to disk in bounded memory.
+
+    For the n-gram and common start metrics, the structures that only
+    depend on the strings of a column of tiles (an n-gram index, the sorted
+    strings) are built once and used for every tile in that column; they
+    are sent along with every tile to worker processes.
+
+    Parameters
+    ----------
+    stringdata : StringData
+    metric : str or two-tuple
+        Name of a metric in `stringsetcomparison.availableanalysisfunctions`,
+        or a two-tuple of such a name and a dict with its parameters, e.g.
+        `('sharedlengthnsubstringcount', {'n': 2})`.
+    comparison : two-tuple of category names, default ('All', 'All')
+    tileshape : two-tuple, default (1024, 1024)
+        Maximum number of rows and columns of a tile. None means all rows or
+        all columns.
+    n_jobs : int, default 1
+        Number of worker processes that compute tiles. -1 means as many as
+        there are CPUs. At most 2 * n_jobs tiles are computed ahead of the
+        one that is yielded.
+    executor : concurrent.futures.Executor, optional
+        Executor to compute tiles in, instead of a process pool. Set n_jobs
+        to its number of workers to keep them all busy.
+
+    Yields
+    ------
+    Three-tuples (rowstart, colstart, block), in which block is a 2D array
+    with the outcomes of the strings from position rowstart in the first
+    category with the strings from position colstart in the second
+    category. Tiles are yielded in row-major order.
+
+    Examples
+    --------
+    >>> from aglcheck import StringData
+    >>> from aglcheck.tiledanalysis import iter_tiles
+    >>> sd = StringData(['abc', 'abd', 'bcd'])
+    >>> for rowstart, colstart, block in iter_tiles(sd, 'levenshtein',
+    ...                                             tileshape=(2, 2)):
+    ...     print(rowstart, colstart, block.tolist())
+    0 0 [[0, 1], [1, 0]]
+    0 2 [[2], [2]]
+    2 0 [[2, 2]]
+    2 2 [[0]]
+
+    """
+    stringdict = _comparisonstringdict(stringdata, comparison)
+    strings0, strings1 = ([stringdict[l] for l in
+                           stringdata.stringcategories[c]]
+                          for c in comparison)
+    nrows, ncols = tileshape
+    nrows = max(1, len(strings0)) if nrows is None else nrows
+    ncols = max(1, len(strings1)) if ncols is None else ncols
+    starts = [(i, j) for i in range(0, len(strings0), nrows)
+              for j in range(0, len(strings1), ncols)]
+    # structures that only depend on the strings of a column block, such as
+    # n-gram indexes, are built once and used for all tiles in that column
+    columnfs = {}
+
+    def columnf(j):
+        if j not in columnfs:
+            columnfs[j] = _columnblockfunction(stringdata, metric, stringdict,
+                                               strings1[j:j + ncols])
+        return columnfs[j]
+
+    blocks = ((columnf(j), strings0[i:i + nrows]) for i, j in starts)
+    f = _analyzetile
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if executor is not None:
+        outcomes = _imapbounded(f, blocks, executor, window=2 * n_jobs)
+    elif n_jobs == 1:
+        outcomes = map(f, blocks)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            for (i, j), block in zip(starts, _imapbounded(
+                    f, blocks, pool, window=2 * n_jobs)):
+                yield i, j, block
+        return
+    for (i, j), block in zip(starts, outcomes):
+        yield i, j, block
+
+
+def save_npy(stringdata, metric, filename, comparison=('All', 'All'),
+             tileshape=(256, None), n_jobs=1, executor=None):
+    """
+    Computes a metric for the string pairs of `comparison` tile by tile (see
+    `iter_tiles`) and writes the outcomes to a memory-mapped .npy file, with
+    a row for every string in the first category.
+
+    Returns
+    -------
+    The memory-mapped array, which can also be loaded later with
+    `numpy.load(filename, mmap_mode='r')`.
+
+    """
+    name, params = _metricspec(metric)
+    values = np.lib.format.open_memmap(
+        filename, mode='w+', dtype=metricproperties[name]['dtype'],
+        shape=_comparisonshape(stringdata, comparison))
+    for i, j, block in iter_tiles(stringdata, (name, params),
+                                  comparison=comparison, tileshape=tileshape,
+                                  n_jobs=n_jobs, executor=executor):
+        values[i:i + block.shape[0], j:j + block.shape[1]] = block
+    values.flush()
+    return values
+
+
+class RowMax(object):
+    """
+    Reducer (see `reduce_tiles`) that finds the maximum outcome in every
+    row of the comparison grid.
+
+    """
+
+    def start(self, shape):
+        self.values = None
+        self.shape = shape
+
+    def update(self, rowstart, colstart, block):
+        if self.values is None:
+            if np.issubdtype(block.dtype, np.floating):
+                initial = -np.inf
+            elif np.issubdtype(block.dtype, np.integer):
+                initial = np.iinfo(block.dtype).min
+            else:
+                initial = False
+            self.values = np.full(self.shape[0], initial, dtype=block.dtype)
+        rows = self.values[rowstart:rowstart + block.shape[0]]
+        if block.shape[1]:
+            np.maximum(rows, block.max(axis=1), out=rows)
+
+    def result(self):
+        """Returns an array with the maximum of every row."""
+        return self.values
+
+
+class Histogram(object):
+    """
+    Reducer (see `reduce_tiles`) that counts outcomes in bins.
+
+    Parameters
+    ----------
+    bins : int or sequence of scalars
+        Bin edges, or the number of equal-width bins in `range`.
+    range : two-tuple, optional
+        Lower and upper edge of the bins, required if `bins` is an int.
+
+    """
+
+    def __init__(self, bins, range=None):
+        if np.ndim(bins) == 0:
+            if range is None:
+                raise ValueError('a range is needed with a number of bins')
+            bins = np.linspace(range[0], range[1], int(bins) + 1)
+        self.edges = np.asarray(bins, dtype=np.float64)
+
+    def start(self, shape):
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, rowstart, colstart, block):
+        self.counts += np.histogram(block, bins=self.edges)[0]
+
+    def result(self):
+        """Returns the counts per bin and the bin edges."""
+        return self.counts, self.edges
+
+
+class TopK(object):
+    """
+    Reducer (see `reduce_tiles`) that finds, for every row of the comparison
+    grid, the k columns with the largest (or smallest) outcomes.
+
+    Parameters
+    ----------
+    k : positive int
+    largest : bool, default True
+        Whether to find the largest outcomes, or the smallest ones (e.g. for
+        distances).
+
+    """
+
+    def __init__(self, k, largest=True):
+        self.k = k
+        self.largest = largest
+
+    def start(self, shape):
+        self.shape = shape
+        k = min(self.k, shape[1])
+        # sort keys, which are smallest for the best outcomes
+        self.keys = np.full((shape[0], k), np.inf)
+        self.columns = np.full((shape[0], k), -1, dtype=np.intp)
+        self.values = None
+
+    def update(self, rowstart, colstart, block):
+        if self.values is None:
+            self.values = np.zeros(self.keys.shape, dtype=block.dtype)
+        rows = slice(rowstart, rowstart + block.shape[0])
+        keys = block.astype(np.float64)
+        if self.largest:
+            keys = -keys
+        columns = np.broadcast_to(
+            np.arange(colstart, colstart + block.shape[1]), block.shape)
+        keys = np.concatenate([self.keys[rows], keys], axis=1)
+        values = np.concatenate([self.values[rows], block], axis=1)
+        columns = np.concatenate([self.columns[rows], columns], axis=1)
+        # the best candidates, ties broken by column
+        order = np.lexsort((columns, keys))[:, :self.keys.shape[1]]
+        self.keys[rows] = np.take_along_axis(keys, order, axis=1)
+        self.values[rows] = np.take_along_axis(values, order, axis=1)
+        self.columns[rows] = np.take_along_axis(columns, order, axis=1)
+
+    def result(self):
+        """
+        Returns two arrays of shape (number of rows, k): the column indices
+        of the best outcomes of every row, in order, and those outcomes.
+
+        """
+        return self.columns, self.values
+
+
+def reduce_tiles(stringdata, metric, reducers, comparison=('All', 'All'),
+                 tileshape=(1024, 1024), n_jobs=1, executor=None):
+    """
+    Computes a metric for the string pairs of `comparison` tile by tile (see
+    `iter_tiles`), and feeds every tile to one or more reducers, such as
+    `RowMax`, `Histogram` and `TopK`, without keeping the tiles.
+
+    A reducer is an object with a `start(shape)` method, which is called
+    with the shape of the whole comparison grid, an `update(rowstart,
+    colstart, block)` method, which is called for every tile, and a
+    `result()` method.
+
+    Returns
+    -------
+    A list with the result of every reducer.
+
+    Examples
+    --------
+    >>> from aglcheck import StringData
+    >>> from aglcheck.tiledanalysis import reduce_tiles, RowMax, TopK
+    >>> sd = StringData(['abc', 'abd', 'bcd', 'cba'])
+    >>> rowmax, (columns, distances) = reduce_tiles(
+    ...     sd, 'levenshtein', [RowMax(), TopK(2, largest=False)],
+    ...     tileshape=(2, 2))
+    >>> rowmax
+    array([2, 2, 3, 3])
+    >>> columns
+    array([[0, 1],
+           [1, 0],
+           [2, 0],
+           [3, 0]])
+
+    """
+    shape = _comparisonshape(stringdata, comparison)
+    for reducer in reducers:
+        reducer.start(shape)
+    for i, j, block in iter_tiles(stringdata, metric, comparison=comparison,
+                                  tileshape=tileshape, n_jobs=n_jobs,
+                                  executor=executor):
+        for reducer in reducers:
+            reducer.update(i, j, block)
+    return [reducer.result() for reducer in reducers]
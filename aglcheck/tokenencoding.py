@@ -0,0 +1,136 @@
+import numpy as np
+
+__all__ = ['TokenEncoder', 'get_tokenencoder', 'tokenarray', 'tokenize']
+
+
+def tokenize(s, readingframe=1):
+    """
+    Returns a tuple with the tokens of token string s.
+
+    Parameters
+    ----------
+    s : string
+        Token string.
+    readingframe : positive int, default 1
+        The number of characters that make up one string token. Normally 1,
+        so that, e.g. the string "abcd" has 4 tokens. However if there exist
+        many tokens, these can be coded with multiple ascii symbols. E.g., if
+        readingframe is 2, then "a1a2" has two tokens, namely "a1" and "a2".
+
+    Examples
+    --------
+    >>> from aglcheck.tokenencoding import tokenize
+    >>> tokenize('a1a2b1', readingframe=2)
+    ('a1', 'a2', 'b1')
+
+    """
+    if readingframe == 1:
+        return tuple(s)
+    return tuple(s[i:i + readingframe] for i in range(0, len(s), readingframe))
+
+
+class TokenEncoder(object):
+    """
+    Maps the tokens of an alphabet to compact integer codes, so that token
+    strings can be stored and compared as NumPy arrays instead of as Python
+    strings. Arrays are uint8 as long as the alphabet has at most 256 tokens,
+    and uint16 (or uint32) for larger alphabets. Tokens that are not yet in
+    the alphabet get a new code when they are first encoded.
+
+    Parameters
+    ----------
+    tokens : sequence of strings, optional
+        Initial alphabet. Codes are assigned in the order of `tokens`.
+    readingframe : positive int, default 1
+        The number of characters that make up one string token.
+
+    Examples
+    --------
+    >>> from aglcheck.tokenencoding import TokenEncoder
+    >>> te = TokenEncoder(['a1', 'a2', 'b1'], readingframe=2)
+    >>> te.encode('b1a1a2')
+    array([2, 0, 1], dtype=uint8)
+    >>> te.decode([2, 0, 1])
+    'b1a1a2'
+
+    """
+
+    def __init__(self, tokens=(), readingframe=1):
+        self.readingframe = readingframe
+        self.tokens = []
+        self.codes = {}
+        self.update(tokens)
+
+    @classmethod
+    def from_strings(cls, strings, readingframe=1):
+        """Returns an encoder with the sorted alphabet of `strings`."""
+        alphabet = set()
+        for s in strings:
+            alphabet.update(tokenize(s, readingframe=readingframe))
+        return cls(sorted(alphabet), readingframe=readingframe)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @property
+    def dtype(self):
+        """Smallest unsigned integer type that can hold every code."""
+        if len(self.tokens) <= 2 ** 8:
+            return np.uint8
+        elif len(self.tokens) <= 2 ** 16:
+            return np.uint16
+        return np.uint32
+
+    def update(self, tokens):
+        """Adds tokens that are not yet in the alphabet."""
+        codes = self.codes
+        for token in tokens:
+            if token not in codes:
+                codes[token] = len(self.tokens)
+                self.tokens.append(token)
+
+    def encode(self, s):
+        """Returns the tokens of string s as an array of integer codes."""
+        tokens = tokenize(s, readingframe=self.readingframe)
+        self.update(tokens)
+        codes = self.codes
+        return np.fromiter((codes[token] for token in tokens),
+                           dtype=self.dtype, count=len(tokens))
+
+    def decode(self, codes):
+        """Returns the token string that corresponds to integer codes."""
+        tokens = self.tokens
+        return ''.join([tokens[code] for code in codes])
+
+
+_tokenencoders = {}
+
+
+def get_tokenencoder(readingframe=1):
+    """
+    Returns the encoder that is shared by all string comparisons that use
+    `readingframe`. Using one encoder per readingframe makes sure that the
+    token arrays of different strings can be compared with each other.
+
+    """
+    encoder = _tokenencoders.get(readingframe)
+    if encoder is None:
+        encoder = _tokenencoders[readingframe] = \
+            TokenEncoder(readingframe=readingframe)
+    return encoder
+
+
+def tokenarray(s, readingframe=1):
+    """
+    Returns the tokens of string s as an array of integer codes from the
+    shared encoder of `readingframe`.
+
+    Examples
+    --------
+    >>> from aglcheck.tokenencoding import tokenarray
+    >>> a = tokenarray('abcab')
+    >>> (a[:2] == a[3:]).all()
+    True
+
+    """
+    return get_tokenencoder(readingframe).encode(s)
@@ -8,7 +8,7 @@ setup(
     version=versioneer.get_version(),
     cmdclass=versioneer.get_cmdclass(),
     packages=['aglcheck', 'aglcheck.tests'],
-    package_data={'aglcheck': ['datafiles/*.yaml']},
+    package_data={'aglcheck': ['datafiles/*.yaml', 'viewer/*.html']},
     url='',
     license='BSD',
     author='Gabriel Beckers ',